@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Columnar Store
+Compact column-per-file layout for generated telemetry, read back via mmap.
+
+A store is a directory with `_meta.json` plus one or two files per column:
+  f64   float64 values, NaN = null (`integer` marks columns of whole numbers;
+        a column mixing ints and floats adds `.int`, one byte per row, 1 = int)
+  date  int64 microseconds since the epoch (UTC), INT64_MIN = null
+  dict  uint32 codes into the dictionary kept in _meta.json, 0xFFFFFFFF = null
+  json  int64 end offsets + concatenated JSON values (anything else; empty = null)
+Each row's key order is kept too: `_layout.u32` holds one code per row into
+the `layouts` list in _meta.json (column indexes in the document's own
+order), so rebuilt documents come back key for key as they were written.
+
+Keyword strings start dictionary-encoded and switch to `json` as soon as they
+pass DICT_LIMIT distinct values; a column that sees a value its kind can't
+hold losslessly is rewritten as `json` the same way, streaming the values
+written so far across, so documents always round-trip (150 stays 150 next to
+0.5 in the same column).
+
+Usage:
+  python3 data/columnar_store.py generated-data/columnar/metrics            # schema + row count
+  python3 data/columnar_store.py generated-data/columnar/metrics --head 3   # rebuild docs
+"""
+
+import os
+import sys
+import json
+import mmap
+import shutil
+import argparse
+from array import array
+from datetime import datetime, timedelta, timezone
+
+FORMAT = "opsguard-columnar"
+VERSION = 1
+META_FILE = "_meta.json"
+LAYOUT_FILE = "_layout.u32"
+DICT_LIMIT = 65536
+FLUSH_ITEMS = 65536
+
+NULL_CODE = 0xFFFFFFFF
+NULL_DATE = -(1 << 63)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+def date_to_micros(value):
+    """ISO-8601 UTC string → epoch microseconds, or None unless it round-trips exactly."""
+    if len(value) < 19 or value[4] != "-" or value[10] != "T":
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.utcoffset() != timedelta(0):
+        return None
+    micros = (dt - EPOCH) // MICROSECOND
+    return micros if micros_to_iso(micros) == value else None
+
+def micros_to_datetime(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+def micros_to_iso(micros):
+    return micros_to_datetime(micros).isoformat()
+
+def _native(typecode, values=()):
+    a = array(typecode, values)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+# ============================================================
+# Writer
+# ============================================================
+
+class _ColumnWriter:
+    """Append-only writer for one column; `n` is the number of rows written so far."""
+
+    def __init__(self, store_dir, index, name, kind):
+        self.store_dir = store_dir
+        self.index = index
+        self.name = name
+        self.kind = kind
+        self.n = 0
+        self.integer = True         # no float seen
+        self.ints = False           # an int seen
+        self.int_flags = None       # per-row int marks, once ints and floats mix
+        self.dictionary = {}
+        self._open()
+
+    def _path(self, ext):
+        return os.path.join(self.store_dir, f"{self.index:04d}.{ext}")
+
+    def _open(self):
+        if self.kind == "json":
+            self.offsets = array('q')
+            self.data = bytearray()
+            self.end = 0
+            self.files = (open(self._path("off"), 'wb'), open(self._path("dat"), 'wb'))
+        else:
+            typecode, ext = {"f64": ('d', "f64"), "date": ('q', "i64"), "dict": ('I', "u32")}[self.kind]
+            self.buffer = array(typecode)
+            self.files = (open(self._path(ext), 'wb'),)
+
+    def accepts(self, value):
+        """Encoded form of value for this column, or raise TypeError if it doesn't fit losslessly."""
+        if value is None:
+            return None
+        if self.kind == "json":
+            return value
+        if self.kind == "f64":
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if isinstance(value, int) and abs(value) > (1 << 53):
+                    raise TypeError
+                return value
+        elif isinstance(value, str):
+            if self.kind == "dict":
+                return value
+            micros = date_to_micros(value)
+            if micros is not None:
+                return micros
+        raise TypeError
+
+    def append(self, value):
+        encoded = self.accepts(value)
+        kind = self.kind
+        if kind == "json":
+            if value is not None:
+                blob = json.dumps(value).encode()
+                self.data += blob
+                self.end += len(blob)
+            self.offsets.append(self.end)
+            if len(self.data) >= (1 << 20) or len(self.offsets) >= FLUSH_ITEMS:
+                self._flush()
+        else:
+            if kind == "f64":
+                is_int = type(encoded) is int
+                if encoded is None:
+                    encoded = float("nan")
+                elif is_int:
+                    self.ints = True
+                else:
+                    self.integer = False
+                if self.int_flags is not None:
+                    self.int_flags.append(is_int)
+                elif self.ints and not self.integer:
+                    self._mark_ints(not is_int, self.n)
+                    self.int_flags.append(is_int)
+            elif kind == "date":
+                encoded = NULL_DATE if encoded is None else encoded
+            else:
+                if encoded is None:
+                    encoded = NULL_CODE
+                else:
+                    code = self.dictionary.get(encoded)
+                    if code is None:
+                        if len(self.dictionary) >= DICT_LIMIT:
+                            self.convert_to_json()
+                            self.append(value)
+                            return
+                        code = self.dictionary[encoded] = len(self.dictionary)
+                    encoded = code
+            self.buffer.append(encoded)
+            if len(self.buffer) >= FLUSH_ITEMS:
+                self._flush()
+        self.n += 1
+
+    def append_raw(self, column):
+        """Bulk-append a same-kind mmapped column: bytes are copied, dictionary codes remapped."""
+        self._flush()
+        if self.kind == "dict":
+            remap = [self.dictionary.setdefault(v, len(self.dictionary)) for v in column.dictionary]
+            remap = dict(enumerate(remap))
+            remap[NULL_CODE] = NULL_CODE
+            self.buffer = _native('I', map(remap.__getitem__, column.raw))
+            self._flush()
+        else:
+            if self.kind == "f64":
+                mixed = column.int_flags is not None
+                if self.int_flags is None and (mixed or (column.integer and not self.integer)
+                                               or (self.ints and not column.integer)):
+                    self._mark_ints(self.ints, self.n)
+                if self.int_flags is not None:
+                    if mixed:
+                        self.int_flags += column.int_flags
+                    else:
+                        self.int_flags += bytes([column.integer]) * column.rows
+                    self._flush()
+                self.integer = self.integer and column.integer and not mixed
+                self.ints = self.ints or column.integer or mixed
+            self.files[0].write(column.raw.cast('B') if len(column.raw) else b"")
+        self.n += column.rows
+        if self.kind == "dict" and len(self.dictionary) > DICT_LIMIT:
+            self.convert_to_json()
+
+    def _mark_ints(self, flag, rows):
+        """Start per-row int marks: the `rows` already written were all ints (flag) or all floats."""
+        self.int_flags = bytearray([flag]) * rows
+        self.files += (open(self._path("int"), 'wb'),)
+
+    def pad_to(self, rows):
+        while self.n < rows:
+            self.append(None)
+
+    def _flush(self):
+        if self.kind == "json":
+            if sys.byteorder != "little":
+                self.offsets.byteswap()
+            self.offsets.tofile(self.files[0])
+            self.files[1].write(self.data)
+            self.offsets = array('q')
+            self.data = bytearray()
+        else:
+            if sys.byteorder != "little":
+                self.buffer.byteswap()
+            self.buffer.tofile(self.files[0])
+            self.buffer = array(self.buffer.typecode)
+            if self.int_flags is not None:
+                self.files[1].write(self.int_flags)
+                self.int_flags = bytearray()
+
+    def close(self):
+        self._flush()
+        for f in self.files:
+            f.close()
+
+    def convert_to_json(self):
+        """Rewrite this column as `json`, streaming every value written so far from its old file."""
+        self._flush()
+        for f in self.files:
+            f.close()
+        old = open_column(self.store_dir, self.meta(), self.n)
+        self.kind = "json"
+        self.n = 0
+        self.int_flags = None
+        self.dictionary = {}
+        self._open()
+        try:
+            for value in old.values(dates_as_iso=True):
+                self.append(value)
+        finally:
+            old.close()
+        for ext in ("f64", "int", "i64", "u32"):
+            if os.path.exists(self._path(ext)):
+                os.remove(self._path(ext))
+
+    def meta(self):
+        meta = {"name": self.name, "kind": self.kind, "index": self.index}
+        if self.kind == "f64":
+            meta["integer"] = self.integer
+            if self.int_flags is not None:
+                meta["mixed"] = True
+        if self.kind == "dict":
+            meta["dictionary"] = list(self.dictionary)
+        return meta
+
+def infer_kind(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and abs(value) <= (1 << 53):
+        return "f64"
+    if isinstance(value, str):
+        return "date" if date_to_micros(value) is not None else "dict"
+    return "json"
+
+class ColumnarWriter:
+    """Streams documents into a columnar store directory.
+
+    Columns appear as fields are first seen (earlier rows are null-padded), so
+    documents don't need a fixed schema up front.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = str(store_dir)
+        if os.path.isdir(self.store_dir):
+            shutil.rmtree(self.store_dir)
+        os.makedirs(self.store_dir)
+        self.columns = {}
+        self.rows = 0
+        self.layouts = {}           # tuple of column indexes in key order → code
+        self.layout_codes = array('I')
+        self.layout_file = open(os.path.join(self.store_dir, LAYOUT_FILE), 'wb')
+
+    def _column(self, name, value):
+        col = self.columns.get(name)
+        if col is None:
+            col = self.columns[name] = _ColumnWriter(self.store_dir, len(self.columns), name, infer_kind(value))
+        return col
+
+    def _layout_code(self, layout):
+        code = self.layouts.get(layout)
+        if code is None:
+            if len(self.layouts) >= DICT_LIMIT:
+                return NULL_CODE        # too many shapes: such rows read back in column order
+            code = self.layouts[layout] = len(self.layouts)
+        return code
+
+    def _flush_layouts(self):
+        if sys.byteorder != "little":
+            self.layout_codes.byteswap()
+        self.layout_codes.tofile(self.layout_file)
+        self.layout_codes = array('I')
+
+    def write(self, doc):
+        row = self.rows
+        layout = []
+        for name, value in doc.items():
+            col = self.columns.get(name)
+            if col is None:
+                if value is None:
+                    continue
+                col = self._column(name, value)
+            if col.n < row:
+                col.pad_to(row)
+            try:
+                col.append(value)
+            except TypeError:
+                col.convert_to_json()
+                col.append(value)
+            if value is not None:
+                layout.append(col.index)
+        self.layout_codes.append(self._layout_code(tuple(layout)))
+        if len(self.layout_codes) >= FLUSH_ITEMS:
+            self._flush_layouts()
+        self.rows = row + 1
+
+    def extend(self, table):
+        """Append every row of another store (e.g. a scale-mode shard), column by column."""
+        start = self.rows
+        for source in table.column_meta:
+            column = table.column(source["name"])
+            col = self.columns.get(source["name"])
+            if col is None:
+                first = next((v for v in column.values(dates_as_iso=True) if v is not None), None)
+                if first is None:
+                    continue
+                col = self._column(source["name"], first)
+            col.pad_to(start)
+            if col.kind == column.kind and col.kind != "json":
+                col.append_raw(column)
+                continue
+            for value in column.values(dates_as_iso=True):
+                try:
+                    col.append(value)
+                except TypeError:
+                    col.convert_to_json()
+                    col.append(value)
+        if table.layouts is None:
+            self.layout_codes.extend([NULL_CODE] * table.rows)
+        else:
+            to_index = {c["index"]: self.columns[c["name"]].index for c in table.column_meta
+                        if c["name"] in self.columns}
+            remap = {code: self._layout_code(tuple(to_index[i] for i in layout))
+                     for code, layout in enumerate(table.layouts)}
+            remap[NULL_CODE] = NULL_CODE
+            self.layout_codes.extend(map(remap.__getitem__, table.layout_codes()))
+        self._flush_layouts()
+        self.rows = start + table.rows
+
+    def close(self):
+        for col in self.columns.values():
+            col.pad_to(self.rows)
+            col.close()
+        self._flush_layouts()
+        self.layout_file.close()
+        meta = {"format": FORMAT, "version": VERSION, "rows": self.rows,
+                "columns": [col.meta() for col in self.columns.values()],
+                "layouts": [list(layout) for layout in self.layouts]}
+        tmp_path = os.path.join(self.store_dir, META_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.store_dir, META_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ============================================================
+# Reader
+# ============================================================
+
+def _map(path):
+    """mmap a file read-only; empty files map to empty bytes."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, b""
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm)
+
+class Column:
+    """A memory-mapped column. `raw` is the typed memoryview over the file (or codes/offsets)."""
+
+    def __init__(self, store_dir, meta, rows):
+        self.name = meta["name"]
+        self.kind = meta["kind"]
+        self.rows = rows
+        self.integer = meta.get("integer", False)
+        self.dictionary = meta.get("dictionary")
+        self.int_flags = None
+        base = os.path.join(store_dir, f"{meta['index']:04d}")
+        self._maps = []
+        if self.kind == "json":
+            self.raw = self._typed(base + ".off", 'q')
+            self.data = self._mapped(base + ".dat")
+        else:
+            ext, typecode = {"f64": ("f64", 'd'), "date": ("i64", 'q'), "dict": ("u32", 'I')}[self.kind]
+            self.raw = self._typed(f"{base}.{ext}", typecode)
+            if meta.get("mixed"):
+                self.int_flags = self._mapped(base + ".int")
+
+    def _mapped(self, path):
+        mm, view = _map(path)
+        if mm is not None:
+            self._maps.append((mm, view))
+        return view
+
+    def _typed(self, path, typecode):
+        view = self._mapped(path)
+        return view.cast(typecode) if len(view) else _native(typecode)
+
+    def values(self, dates_as_iso=False):
+        """Decoded Python values in row order (None for nulls)."""
+        kind = self.kind
+        if kind == "f64":
+            if self.int_flags is not None:
+                return (None if v != v else int(v) if is_int else v for v, is_int in zip(self.raw, self.int_flags))
+            if self.integer:
+                return (None if v != v else int(v) for v in self.raw)
+            return (None if v != v else v for v in self.raw)
+        if kind == "dict":
+            lookup = dict(enumerate(self.dictionary))
+            lookup[NULL_CODE] = None
+            return map(lookup.__getitem__, self.raw)
+        if kind == "date":
+            convert = micros_to_iso if dates_as_iso else micros_to_datetime
+            return (None if v == NULL_DATE else convert(v) for v in self.raw)
+        return self._json_values()
+
+    def _json_values(self):
+        data, loads = self.data, json.loads
+        start = 0
+        for end in self.raw:
+            yield loads(bytes(data[start:end])) if end > start else None
+            start = end
+
+    def __iter__(self):
+        return self.values()
+
+    def numpy(self):
+        """Zero-copy NumPy view of the raw column (requires numpy)."""
+        import numpy as np
+        dtype = {"f64": "<f8", "date": "<i8", "dict": "<u4", "json": "<i8"}[self.kind]
+        return np.frombuffer(self.raw, dtype=dtype)
+
+    def close(self):
+        if isinstance(self.raw, memoryview):
+            self.raw.release()
+        for mm, view in self._maps:
+            view.release()
+            mm.close()
+        self._maps = []
+
+def open_column(store_dir, meta, rows):
+    return Column(store_dir, meta, rows)
+
+class ColumnarTable:
+    """Read-only view of a columnar store; columns are mmapped lazily on first use."""
+
+    def __init__(self, store_dir):
+        self.store_dir = str(store_dir)
+        with open(os.path.join(self.store_dir, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT or meta.get("version") != VERSION:
+            raise ValueError(f"{self.store_dir} is not a {FORMAT} v{VERSION} store")
+        if sys.byteorder != "little":
+            raise ValueError("columnar stores are little-endian; this host is big-endian")
+        self.rows = meta["rows"]
+        self.column_meta = meta["columns"]
+        self.layouts = meta.get("layouts")      # None for stores written before key order was kept
+        self._by_name = {c["name"]: c for c in self.column_meta}
+        self._open = {}
+        self._layout_map = None
+
+    @property
+    def names(self):
+        return [c["name"] for c in self.column_meta]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def column(self, name):
+        col = self._open.get(name)
+        if col is None:
+            col = self._open[name] = open_column(self.store_dir, self._by_name[name], self.rows)
+        return col
+
+    def scan(self, names, dates_as_iso=False):
+        """Yield one tuple per row with the requested columns (missing columns read as None)."""
+        iters = [self.column(n).values(dates_as_iso) if n in self else iter([None] * self.rows) for n in names]
+        return zip(*iters)
+
+    def layout_codes(self):
+        """Per-row codes into `layouts` (NULL_CODE: column order), as a memoryview over the layout file."""
+        if self._layout_map is None:
+            self._layout_map = _map(os.path.join(self.store_dir, LAYOUT_FILE))
+        view = self._layout_map[1]
+        return view.cast('I') if len(view) else _native('I')
+
+    def iter_docs(self, names=None):
+        """Rebuild documents (nulls dropped) — e.g. for re-ingest.
+
+        Whole documents come back in each row's original key order; with
+        `names`, only those fields are rebuilt, in the order given.
+        """
+        if names is not None or self.layouts is None:
+            names = names or self.names
+            for values in self.scan(names, dates_as_iso=True):
+                yield {n: v for n, v in zip(names, values) if v is not None}
+            return
+        names = self.names
+        position = {c["index"]: i for i, c in enumerate(self.column_meta)}
+        orders = [[(names[position[i]], position[i]) for i in layout] for layout in self.layouts]
+        for values, code in zip(self.scan(names, dates_as_iso=True), self.layout_codes()):
+            if code == NULL_CODE:
+                yield {n: v for n, v in zip(names, values) if v is not None}
+            else:
+                yield {name: values[i] for name, i in orders[code]}
+
+    def close(self):
+        for col in self._open.values():
+            col.close()
+        self._open = {}
+        if self._layout_map is not None:
+            mm, view = self._layout_map
+            if mm is not None:
+                view.release()
+                mm.close()
+            self._layout_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect an OpsGuard AI columnar store")
+    parser.add_argument("store", help="Store directory, e.g. generated-data/columnar/metrics")
+    parser.add_argument("--head", type=int, default=0, help="Print the first N rebuilt documents")
+    args = parser.parse_args()
+
+    with ColumnarTable(args.store) as table:
+        print(f"📦 {args.store}: {table.rows:,} rows, {len(table.column_meta)} columns")
+        for meta in table.column_meta:
+            extra = f" ({len(meta['dictionary'])} distinct)" if meta["kind"] == "dict" else ""
+            print(f"   {meta['kind']:<5} {meta['name']}{extra}")
+        for i, doc in enumerate(table.iter_docs()):
+            if i >= args.head:
+                break
+            print(json.dumps(doc))
+
+if __name__ == "__main__":
+    main()
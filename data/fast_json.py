@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Fast JSON Encoding
+One serialization path for the generator and the ingester.
+
+Output is compact UTF-8 JSON (no spaces after separators, non-ASCII left
+as is) with either backend:
+  orjson installed   every document is one orjson.dumps call
+  stdlib fallback    one pre-configured json.JSONEncoder
+
+The two agree on everything the generator emits, but not on every value:
+json spells large floats with an exponent sign (1e+16, orjson 1e16) and
+writes NaN/Infinity (not valid JSON), where orjson writes null.
+
+Action lines are cached per (op, index), so bulk writers never re-encode them.
+
+Usage:
+  python3 data/fast_json.py     # which backend, and docs/s on sample metrics and logs
+"""
+
+import json
+import time
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, check_circular=False)
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _encoder.encode(obj).encode('utf-8')
+
+def dumps_line(obj):
+    """dumps(obj) plus a trailing newline, ready for an NDJSON file."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (_encoder.encode(obj) + "\n").encode('utf-8')
+
+loads = orjson.loads if orjson is not None else json.loads  # both accept str or bytes
+
+@lru_cache(maxsize=None)
+def action_line(index, op="index"):
+    """The `{"<op>": {"_index": ...}}` bulk action line for an index, newline included (cached)."""
+    return dumps_line({op: {"_index": index}})
+
+def main():
+    import importlib.util, os, random
+    from datetime import datetime, timezone
+    spec = importlib.util.spec_from_file_location(
+        "generator", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample-data-generator.py"))
+    generator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(generator)
+
+    random.seed(42)
+    now = datetime.now(timezone.utc).isoformat()
+    docs = []
+    for i in range(50_000):
+        service, host = random.choice(generator.SERVICES), random.choice(generator.HOSTS)
+        docs.append(generator.generate_normal_metrics(now, service, host) if i % 2
+                    else generator.generate_normal_log(now, service, host, "v2.4.1"))
+
+    start = time.perf_counter()
+    for doc in docs:
+        (json.dumps(doc) + "\n").encode('utf-8')
+    baseline = time.perf_counter() - start
+    start = time.perf_counter()
+    for doc in docs:
+        dumps_line(doc)
+    elapsed = time.perf_counter() - start
+    print(f"backend: {BACKEND}")
+    print(f"json.dumps:  {len(docs) / baseline:>12,.0f} docs/s")
+    print(f"dumps_line:  {len(docs) / elapsed:>12,.0f} docs/s  ({baseline / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -14,13 +14,25 @@ Usage:
   python3 sample-data-generator.py --output-dir ./data  # JSON files only
 """
 
-import json
+import gzip
 import random
 import argparse
 import os
+import sys
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for --backend numpy
+    np = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from columnar_store import ColumnarTable, ColumnarWriter  # noqa: E402
+from fast_json import action_line, dumps_line  # noqa: E402
+
 # ============================================================
 # Configuration
 # ============================================================
@@ -91,6 +103,15 @@ LOG_MESSAGES = {
     ],
 }
 
+# Elasticsearch index per generated data type (bulk format)
+BULK_INDEX_MAP = {
+    "logs": "opsguard-incidents",
+    "metrics": "opsguard-metrics",
+    "business_metrics": "opsguard-business",
+    "incidents_history": "opsguard-history",
+}
+DATA_TYPES = list(BULK_INDEX_MAP)
+
 URL_PATHS = [
     "/api/v1/payments", "/api/v1/users", "/api/v1/orders",
     "/api/v1/products", "/api/v1/auth/login", "/api/v1/search",
@@ -247,8 +268,10 @@ def generate_business_metrics(timestamp, service, health_factor=1.0):
     }
 
 
-def generate_historical_incidents():
+def generate_historical_incidents(now=None):
     """Generate past incidents for vector search."""
+    if now is None:
+        now = datetime.now(timezone.utc)
     incidents = [
         {
             "incident_id": "INC-2026-001",
@@ -263,8 +286,8 @@ def generate_historical_incidents():
             "services_impacted": ["payment-service", "order-processing"],
             "resolution_time_minutes": 45,
             "revenue_impact_usd": 25000,
-            "created_at": (datetime.now(timezone.utc) - timedelta(days=30)).isoformat(),
-            "resolved_at": (datetime.now(timezone.utc) - timedelta(days=30) + timedelta(minutes=45)).isoformat(),
+            "created_at": (now - timedelta(days=30)).isoformat(),
+            "resolved_at": (now - timedelta(days=30) + timedelta(minutes=45)).isoformat(),
             "assigned_to": "sre-team",
             "tags": ["database", "connection-pool", "configuration", "payment"],
             "deployment_version": "v2.3.5",
@@ -283,8 +306,8 @@ def generate_historical_incidents():
             "services_impacted": ["auth-service", "user-api"],
             "resolution_time_minutes": 120,
             "revenue_impact_usd": 15000,
-            "created_at": (datetime.now(timezone.utc) - timedelta(days=15)).isoformat(),
-            "resolved_at": (datetime.now(timezone.utc) - timedelta(days=15) + timedelta(minutes=120)).isoformat(),
+            "created_at": (now - timedelta(days=15)).isoformat(),
+            "resolved_at": (now - timedelta(days=15) + timedelta(minutes=120)).isoformat(),
             "assigned_to": "backend-team",
             "tags": ["memory-leak", "deployment", "jwt", "cache", "auth"],
             "deployment_version": "v2.4.0",
@@ -303,8 +326,8 @@ def generate_historical_incidents():
             "services_impacted": ["search-service", "product-catalog"],
             "resolution_time_minutes": 90,
             "revenue_impact_usd": 8500,
-            "created_at": (datetime.now(timezone.utc) - timedelta(days=45)).isoformat(),
-            "resolved_at": (datetime.now(timezone.utc) - timedelta(days=45) + timedelta(minutes=90)).isoformat(),
+            "created_at": (now - timedelta(days=45)).isoformat(),
+            "resolved_at": (now - timedelta(days=45) + timedelta(minutes=90)).isoformat(),
             "assigned_to": "infrastructure-team",
             "tags": ["elasticsearch", "index-corruption", "search", "infrastructure"],
             "deployment_version": "v2.3.2",
@@ -323,8 +346,8 @@ def generate_historical_incidents():
             "services_impacted": ["order-processing", "payment-service", "inventory-service"],
             "resolution_time_minutes": 30,
             "revenue_impact_usd": 50000,
-            "created_at": (datetime.now(timezone.utc) - timedelta(days=7)).isoformat(),
-            "resolved_at": (datetime.now(timezone.utc) - timedelta(days=7) + timedelta(minutes=30)).isoformat(),
+            "created_at": (now - timedelta(days=7)).isoformat(),
+            "resolved_at": (now - timedelta(days=7) + timedelta(minutes=30)).isoformat(),
             "assigned_to": "platform-team",
             "tags": ["scaling", "capacity", "flash-sale", "hpa", "kubernetes"],
             "deployment_version": "v2.4.1",
@@ -343,8 +366,8 @@ def generate_historical_incidents():
             "services_impacted": ["notification-service"],
             "resolution_time_minutes": 20,
             "revenue_impact_usd": 2000,
-            "created_at": (datetime.now(timezone.utc) - timedelta(days=60)).isoformat(),
-            "resolved_at": (datetime.now(timezone.utc) - timedelta(days=60) + timedelta(minutes=20)).isoformat(),
+            "created_at": (now - timedelta(days=60)).isoformat(),
+            "resolved_at": (now - timedelta(days=60) + timedelta(minutes=20)).isoformat(),
             "assigned_to": "sre-team",
             "tags": ["ssl", "certificate", "expiry", "notification", "configuration"],
             "deployment_version": "v2.2.8",
@@ -354,21 +377,21 @@ def generate_historical_incidents():
     return incidents
 
 
-def generate_scenario_data(now=None):
+def iter_scenario_docs(now=None):
     """
-    Generate a complete incident scenario:
+    Stream a complete incident scenario as (data_type, doc) pairs:
     - 2 hours of normal data
     - Bad deployment at T-45min
     - Incident escalation over 45 minutes
     - All data types: logs, metrics, business metrics, incidents
+
+    Nothing is accumulated, so memory stays flat however long the scenario.
     """
     if now is None:
         now = datetime.now(timezone.utc)
 
-    all_logs = []
-    all_metrics = []
-    all_business = []
-    all_incidents = generate_historical_incidents()
+    for incident in generate_historical_incidents(now):
+        yield "incidents_history", incident
 
     # Affected services for the incident
     incident_service = SERVICES[0]  # payment-service
@@ -383,22 +406,22 @@ def generate_scenario_data(now=None):
         host = random.choice(HOSTS)
 
         # Normal metrics every minute
-        all_metrics.append(generate_normal_metrics(ts, service, host))
+        yield "metrics", generate_normal_metrics(ts, service, host)
 
         # Normal logs (3-5 per minute)
         for _ in range(random.randint(3, 5)):
             log_ts = generate_timestamp(now, -minutes_ago, jitter_seconds=25)
-            all_logs.append(generate_normal_log(log_ts, service, host, good_deploy_version))
+            yield "logs", generate_normal_log(log_ts, service, host, good_deploy_version)
 
         # Business metrics every 5 minutes
         if minutes_ago % 5 == 0:
             for svc in SERVICES:
                 biz_ts = generate_timestamp(now, -minutes_ago, jitter_seconds=5)
-                all_business.append(generate_business_metrics(biz_ts, svc, health_factor=1.0))
+                yield "business_metrics", generate_business_metrics(biz_ts, svc, health_factor=1.0)
 
     # --- Phase 2: Bad deployment (T-45min) ---
     deploy_ts = generate_timestamp(now, -45, jitter_seconds=0)
-    all_logs.append({
+    yield "logs", {
         "@timestamp": deploy_ts,
         "service.name": "payment-service",
         "service.environment": "production",
@@ -414,7 +437,7 @@ def generate_scenario_data(now=None):
         "deployment.timestamp": deploy_ts,
         "geo.location": {"lat": 45.8399, "lon": -119.7006},
         "geo.region": "us-west-2",
-    })
+    }
 
     # --- Phase 3: Incident escalation (T-40min to T-0) ---
     for minutes_ago in range(40, 0, -1):
@@ -426,30 +449,30 @@ def generate_scenario_data(now=None):
 
             # Degraded metrics for incident services
             if random.random() < 0.7:
-                all_metrics.append(generate_incident_metrics(ts, incident_service, host, severity_factor))
+                yield "metrics", generate_incident_metrics(ts, incident_service, host, severity_factor)
             if random.random() < 0.4:
-                all_metrics.append(generate_incident_metrics(ts, cascade_service, host, severity_factor * 0.6))
+                yield "metrics", generate_incident_metrics(ts, cascade_service, host, severity_factor * 0.6)
 
             # Normal metrics for other services
             other_service = random.choice([s for s in SERVICES if s != incident_service and s != cascade_service])
-            all_metrics.append(generate_normal_metrics(ts, other_service, host))
+            yield "metrics", generate_normal_metrics(ts, other_service, host)
 
             # Error logs (increasing frequency)
             error_count = int(1 + severity_factor * 2)
             for _ in range(error_count):
                 err_ts = generate_timestamp(now, -minutes_ago, jitter_seconds=20)
                 sev = "CRITICAL" if severity_factor > 2.5 and random.random() < 0.3 else "ERROR"
-                all_logs.append(generate_error_log(err_ts, incident_service, host, bad_deploy_version, sev))
+                yield "logs", generate_error_log(err_ts, incident_service, host, bad_deploy_version, sev)
 
             # Some cascading errors in order-processing
             if severity_factor > 1.5 and random.random() < 0.5:
                 err_ts = generate_timestamp(now, -minutes_ago, jitter_seconds=20)
-                all_logs.append(generate_error_log(err_ts, cascade_service, host, good_deploy_version, "ERROR"))
+                yield "logs", generate_error_log(err_ts, cascade_service, host, good_deploy_version, "ERROR")
 
             # Warning logs
             if random.random() < 0.5:
                 warn_ts = generate_timestamp(now, -minutes_ago, jitter_seconds=20)
-                all_logs.append({
+                yield "logs", {
                     "@timestamp": warn_ts,
                     "service.name": incident_service["name"],
                     "service.environment": "production",
@@ -469,7 +492,7 @@ def generate_scenario_data(now=None):
                     "deployment.version": bad_deploy_version,
                     "geo.location": {"lat": host["lat"], "lon": host["lon"]},
                     "geo.region": host["region"],
-                })
+                }
 
         # Business metrics every 5 minutes during incident
         if minutes_ago % 5 == 0:
@@ -477,63 +500,487 @@ def generate_scenario_data(now=None):
             for svc in SERVICES:
                 biz_ts = generate_timestamp(now, -minutes_ago, jitter_seconds=5)
                 hf = health_factor if svc in [incident_service, cascade_service] else random.uniform(0.9, 1.0)
-                all_business.append(generate_business_metrics(biz_ts, svc, health_factor=hf))
+                yield "business_metrics", generate_business_metrics(biz_ts, svc, health_factor=hf)
 
-    return {
-        "logs": all_logs,
-        "metrics": all_metrics,
-        "business_metrics": all_business,
-        "incidents_history": all_incidents,
-    }
 
+def generate_scenario_data(now=None):
+    """Collect iter_scenario_docs() into per-type lists (for callers that need random access)."""
+    data = {data_type: [] for data_type in DATA_TYPES}
+    for data_type, doc in iter_scenario_docs(now):
+        data[data_type].append(doc)
+    return data
 
-def save_to_files(data, output_dir):
-    """Save generated data to JSON files for manual import."""
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
 
-    for data_type, documents in data.items():
-        filepath = output_path / f"{data_type}.json"
-        with open(filepath, 'w') as f:
-            # Write as NDJSON (newline-delimited JSON) for bulk import
+def open_output(filepath, compress=False):
+    """Open an output file for binary writing, gzip-compressed when requested."""
+    if compress:
+        return gzip.open(f"{filepath}.gz", 'wb', compresslevel=6), Path(f"{filepath}.gz")
+    return open(filepath, 'wb', buffering=1 << 20), filepath
+
+
+class DocumentWriter:
+    """Single-pass fan-out of documents to their plain NDJSON and bulk files.
+
+    Each document is JSON-encoded once (fast_json: orjson when installed,
+    otherwise the stdlib encoder); the same line goes to
+    `<type>.json` and, after its cached action line, to `<type>_bulk.ndjson`. With
+    `columnar`, documents also go to a columnar store in `columnar/<type>`.
+    `part` adds a suffix for shard part files in scale mode.
+    """
+
+    def __init__(self, output_dir, data_types=DATA_TYPES, plain=True, bulk=False, compress=False, part=None,
+                 columnar=False):
+        self.output_path = Path(output_dir)
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        self.counts = dict.fromkeys(data_types, 0)
+        self.plain = {}
+        self.bulk = {}
+        self.paths = {}
+        part_suffix = f".{part}" if part is not None else ""
+        for data_type in data_types:
+            if plain:
+                self.plain[data_type], self.paths[(data_type, "plain")] = open_output(
+                    self.output_path / f"{data_type}.json{part_suffix}", compress)
+            if bulk:
+                self.bulk[data_type], self.paths[(data_type, "bulk")] = open_output(
+                    self.output_path / f"{data_type}_bulk.ndjson{part_suffix}", compress)
+        self.columnar = {}
+        if columnar:
+            for data_type in data_types:
+                store_dir = self.output_path / "columnar" / f"{data_type}{part_suffix}"
+                self.columnar[data_type] = ColumnarWriter(store_dir)
+                self.paths[(data_type, "columnar")] = store_dir
+        self.actions = {dt: action_line(BULK_INDEX_MAP[dt]) for dt in data_types}
+
+    def write(self, data_type, doc):
+        line = dumps_line(doc)
+        if self.plain:
+            self.plain[data_type].write(line)
+        if self.bulk:
+            out = self.bulk[data_type]
+            out.write(self.actions[data_type])
+            out.write(line)
+        if self.columnar:
+            self.columnar[data_type].write(doc)
+        self.counts[data_type] += 1
+
+    def write_all(self, docs):
+        for data_type, doc in docs:
+            self.write(data_type, doc)
+        return self
+
+    def close(self, report=True):
+        for f in list(self.plain.values()) + list(self.bulk.values()) + list(self.columnar.values()):
+            f.close()
+        if report:
+            order = {"plain": 0, "bulk": 1, "columnar": 2}
+            labels = {"plain": "documents", "bulk": "docs (bulk format)", "columnar": "docs (columnar)"}
+            for (data_type, kind), filepath in sorted(self.paths.items(), key=lambda kv: order[kv[0][1]]):
+                label = labels[kind]
+                print(f"✅ Wrote {self.counts[data_type]:,} {label} to {filepath}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(report=exc[0] is None)
+
+
+def save_to_files(data, output_dir, compress=False):
+    """Save generated data to JSON files for manual import."""
+    with DocumentWriter(output_dir, data_types=list(data), compress=compress) as writer:
+        for data_type, documents in data.items():
             for doc in documents:
-                f.write(json.dumps(doc) + '\n')
-        print(f"✅ Wrote {len(documents)} documents to {filepath}")
+                writer.write(data_type, doc)
 
 
-def save_bulk_format(data, output_dir):
+def save_bulk_format(data, output_dir, compress=False):
     """Save in Elasticsearch bulk API format."""
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
+    with DocumentWriter(output_dir, data_types=list(data), plain=False, bulk=True, compress=compress) as writer:
+        for data_type, documents in data.items():
+            for doc in documents:
+                writer.write(data_type, doc)
+
+
+# ============================================================
+# Scale Mode (load-test datasets)
+# ============================================================
+
+SCALE_DATA_TYPES = ["logs", "metrics", "business_metrics"]
+REPLICAS_PER_SERVICE = 3
+
+
+def build_fleet(service_count, host_count):
+    """Extend SERVICES/HOSTS with deterministic synthetic entries up to the requested counts."""
+    services = [dict(s) for s in SERVICES[:service_count]]
+    for i in range(len(services), service_count):
+        template = SERVICES[i % len(SERVICES)]
+        services.append({
+            "name": f"svc-{i + 1:04d}",
+            "tier": template["tier"],
+            "baseline_hourly_rev": template["baseline_hourly_rev"],
+        })
+    hosts = [dict(h) for h in HOSTS[:host_count]]
+    for i in range(len(hosts), host_count):
+        template = HOSTS[i % len(HOSTS)]
+        hosts.append({
+            "name": f"prod-node-{i + 1:04d}",
+            "ip": f"10.{1 + i // 65025}.{(i // 255) % 255}.{i % 255 + 1}",
+            "region": template["region"],
+            "lat": template["lat"],
+            "lon": template["lon"],
+        })
+    return services, hosts
+
 
-    index_map = {
-        "logs": "opsguard-incidents",
-        "metrics": "opsguard-metrics",
-        "business_metrics": "opsguard-business",
-        "incidents_history": "opsguard-history",
+def service_placement(services, hosts):
+    """Each service runs on REPLICAS_PER_SERVICE consecutive hosts (wrapping around)."""
+    replicas = min(REPLICAS_PER_SERVICE, len(hosts))
+    return {
+        svc["name"]: [hosts[(i + k) % len(hosts)] for k in range(replicas)]
+        for i, svc in enumerate(services)
     }
 
-    for data_type, documents in data.items():
-        index_name = index_map[data_type]
-        filepath = output_path / f"{data_type}_bulk.ndjson"
-        with open(filepath, 'w') as f:
-            for doc in documents:
-                action = {"index": {"_index": index_name}}
-                f.write(json.dumps(action) + '\n')
-                f.write(json.dumps(doc) + '\n')
-        print(f"✅ Wrote {len(documents)} docs (bulk format) to {filepath}")
 
+def scaled_count(base, multiplier):
+    """base * multiplier, with the fractional part resolved by a coin flip."""
+    expected = base * multiplier
+    count = int(expected)
+    if random.random() < expected - count:
+        count += 1
+    return count
+
+
+def incident_phase(minutes_ago):
+    """(in_incident, severity_factor) for a minute of the scaled scenario's timeline."""
+    in_incident = minutes_ago <= 40
+    return in_incident, 1.0 + (40 - minutes_ago) / 20.0 if in_incident else 1.0
+
+
+def iter_scale_minute(now, minutes_ago, services, placement, events_per_minute, include_numeric=True):
+    """Yield (data_type, doc) for one minute of the scaled scenario.
+
+    Every service emits metrics and logs on each of its hosts. The last 45
+    minutes replay the v2.4.2 bad deploy: payment-service (and
+    order-processing, if present) degrade exactly as in generate_scenario_data().
+    With include_numeric=False only logs are produced; metrics and business
+    metrics then come from the columnar backend.
+    """
+    incident_service = services[0]
+    cascade_service = services[6] if len(services) > 6 else None
+    in_incident, severity_factor = incident_phase(minutes_ago)
+
+    if minutes_ago == 45:
+        host = placement[incident_service["name"]][0]
+        ts = generate_timestamp(now, -45, jitter_seconds=0)
+        yield "logs", dict(generate_normal_log(ts, incident_service, host, "v2.4.2"),
+                           message="Deployment started: v2.4.2 — Updating payment-service to latest build",
+                           **{"url.path": "/deploy", "http.request.method": "POST", "deployment.timestamp": ts})
+
+    for service in services:
+        degraded = in_incident and service is incident_service
+        cascading = in_incident and service is cascade_service
+        version = "v2.4.2" if service is incident_service and minutes_ago <= 45 else "v2.4.1"
+        for host in placement[service["name"]]:
+            for _ in range(scaled_count(1, events_per_minute) if include_numeric else 0):
+                ts = generate_timestamp(now, -minutes_ago, jitter_seconds=10)
+                if degraded:
+                    yield "metrics", generate_incident_metrics(ts, service, host, severity_factor)
+                elif cascading:
+                    yield "metrics", generate_incident_metrics(ts, service, host, severity_factor * 0.6)
+                else:
+                    yield "metrics", generate_normal_metrics(ts, service, host)
+
+            for _ in range(scaled_count(4, events_per_minute)):
+                ts = generate_timestamp(now, -minutes_ago, jitter_seconds=25)
+                yield "logs", generate_normal_log(ts, service, host, version)
+
+            if degraded:
+                for _ in range(scaled_count(int(1 + severity_factor * 2), events_per_minute)):
+                    ts = generate_timestamp(now, -minutes_ago, jitter_seconds=20)
+                    sev = "CRITICAL" if severity_factor > 2.5 and random.random() < 0.3 else "ERROR"
+                    yield "logs", generate_error_log(ts, service, host, version, sev)
+            elif cascading and severity_factor > 1.5 and random.random() < 0.5:
+                ts = generate_timestamp(now, -minutes_ago, jitter_seconds=20)
+                yield "logs", generate_error_log(ts, service, host, version, "ERROR")
 
-def print_summary(data):
-    """Print generation summary."""
+        if minutes_ago % 5 == 0 and include_numeric:
+            ts = generate_timestamp(now, -minutes_ago, jitter_seconds=5)
+            if degraded or cascading:
+                hf = max(0.2, 1.0 - (severity_factor - 1.0) / 3.0)
+            else:
+                hf = random.uniform(0.9, 1.0) if in_incident else 1.0
+            yield "business_metrics", generate_business_metrics(ts, service, health_factor=hf)
+
+
+# ============================================================
+# Columnar NumPy Backend (scale mode)
+# ============================================================
+
+POD_SUFFIXES = ["abc12", "def34", "ghi56"]
+
+
+def block_timestamps(rng, now, minutes_ago, jitter_seconds):
+    """ISO-8601 strings for rows at the given minutes-ago offsets, with integer-second jitter."""
+    base = np.datetime64(now.replace(tzinfo=None), "us")
+    offsets = -minutes_ago * 60 + rng.integers(-jitter_seconds, jitter_seconds + 1, len(minutes_ago))
+    stamps = np.datetime_as_string(base + offsets * np.timedelta64(1, "s"), unit="us")
+    return [f"{ts}+00:00" for ts in stamps.tolist()]
+
+
+def generate_metrics_block(rng, now, minutes_ago, services, hosts, service_idx, host_idx, severity):
+    """Draw a whole block of system metrics as columns.
+
+    All arrays are row-aligned: row i is for services[service_idx[i]] on
+    hosts[host_idx[i]], minutes_ago[i] before now, with severity[i] == 0 for
+    a healthy sample or the incident severity_factor otherwise. The formulas
+    match generate_normal_metrics / generate_incident_metrics.
+    """
+    n = len(minutes_ago)
+    u = lambda lo, hi: rng.uniform(lo, hi, n)
+    ri = lambda lo, hi: rng.integers(lo, hi + 1, n)
+    sick = severity > 0
+    sf = np.where(sick, severity, 1.0)
+
+    cols = {
+        "@timestamp": block_timestamps(rng, now, minutes_ago, 10),
+        "system.cpu.usage_percent": np.where(sick, np.minimum(99, 70 + u(0, 25) * sf), u(15, 45)),
+        "system.memory.usage_percent": np.where(sick, np.minimum(98, 75 + u(0, 20) * sf), u(40, 65)),
+        "system.memory.used_bytes": ri(2_000_000_000, 6_000_000_000),
+        "system.disk.read_bytes_per_sec": u(1000, 50000),
+        "system.disk.write_bytes_per_sec": u(500, 30000),
+        "system.disk.usage_percent": u(30, 60),
+        "system.load.1m": np.where(sick, 5.0 + u(0, 10) * sf, u(0.5, 2.0)),
+        "system.load.5m": np.where(sick, 4.0 + u(0, 8) * sf, u(0.5, 1.8)),
+        "system.load.15m": u(0.5, 1.5),
+        "network.bytes_in": ri(100_000, 500_000),
+        "network.bytes_out": ri(200_000, 800_000),
+        "network.connections_active": np.where(sick, ri(400, 900), ri(50, 200)),
+        "container.cpu.usage_percent": np.where(sick, np.minimum(99, 65 + u(0, 30) * sf), u(10, 40)),
+        "container.memory.usage_percent": np.where(sick, np.minimum(98, 70 + u(0, 25) * sf), u(35, 60)),
+        "pod_suffix": rng.integers(0, len(POD_SUFFIXES), n),
+    }
+    for name in ["system.cpu.usage_percent", "system.memory.usage_percent", "system.disk.read_bytes_per_sec",
+                 "system.disk.write_bytes_per_sec", "system.disk.usage_percent", "system.load.1m",
+                 "system.load.5m", "system.load.15m", "container.cpu.usage_percent", "container.memory.usage_percent"]:
+        cols[name] = np.round(cols[name], 2)
+    cols["service_idx"] = service_idx
+    cols["host_idx"] = host_idx
+    return cols
+
+
+def iter_metric_rows(cols, services, hosts):
+    """Serialize a metrics block back into generate_normal_metrics()-shaped dicts, one row at a time."""
+    numeric = [k for k in cols if "." in k]
+    columns = [cols[k].tolist() for k in numeric]
+    for i, (ts, svc_i, host_i, pod_i) in enumerate(zip(cols["@timestamp"], cols["service_idx"].tolist(),
+                                                       cols["host_idx"].tolist(), cols["pod_suffix"].tolist())):
+        service, host = services[svc_i], hosts[host_i]
+        doc = {
+            "@timestamp": ts,
+            "service.name": service["name"],
+            "service.environment": "production",
+            "host.name": host["name"],
+            "host.ip": host["ip"],
+        }
+        for key, column in zip(numeric, columns):
+            doc[key] = column[i]
+        doc["system.memory.total_bytes"] = 8_000_000_000
+        doc["container.id"] = f"ctr-{host['name']}-{service['name'][:4]}"
+        doc["kubernetes.pod.name"] = f"{service['name']}-{POD_SUFFIXES[pod_i]}"
+        doc["kubernetes.node.name"] = host["name"]
+        doc["geo.location"] = {"lat": host["lat"], "lon": host["lon"]}
+        doc["geo.region"] = host["region"]
+        yield "metrics", doc
+
+
+def generate_business_block(rng, now, minutes_ago, services, service_idx, health):
+    """Draw a block of business metrics as columns; formulas match generate_business_metrics()."""
+    n = len(minutes_ago)
+    u = lambda lo, hi: rng.uniform(lo, hi, n)
+    ri = lambda lo, hi: rng.integers(lo, hi + 1, n)
+    baseline = np.array([s["baseline_hourly_rev"] for s in services], dtype=float)[service_idx]
+
+    txn = (ri(500, 1500) * health).astype(np.int64)
+    success = (txn * np.minimum(1.0, u(0.85, 0.99) * health)).astype(np.int64)
+    return {
+        "@timestamp": block_timestamps(rng, now, minutes_ago, 5),
+        "service_idx": service_idx,
+        "transactions.count": txn,
+        "transactions.success_count": success,
+        "transactions.failure_count": txn - success,
+        "transactions.success_rate": np.round(success / np.maximum(txn, 1) * 100, 2),
+        "revenue.amount_usd": np.round(baseline / 60 * health * u(0.8, 1.2), 2),
+        "revenue.baseline_hourly_usd": baseline.astype(np.int64),
+        "active_users": (ri(200, 800) * health).astype(np.int64),
+        "active_sessions": (ri(100, 400) * health).astype(np.int64),
+        "error_rate_percent": np.round((1 - health) * 100 * u(0.8, 1.2), 2),
+        "avg_response_time_ms": np.round(u(50, 200) / health, 2),
+        "p99_response_time_ms": np.round(u(200, 500) / health, 2),
+        "sla_compliance": health > 0.7,
+    }
+
+
+def iter_business_rows(cols, services):
+    """Serialize a business block back into generate_business_metrics()-shaped dicts."""
+    keys = [k for k in cols if k not in ("@timestamp", "service_idx")]
+    columns = [cols[k].tolist() for k in keys]
+    for i, (ts, svc_i) in enumerate(zip(cols["@timestamp"], cols["service_idx"].tolist())):
+        service = services[svc_i]
+        doc = {"@timestamp": ts, "service.name": service["name"], "service.tier": service["tier"]}
+        for key, column in zip(keys, columns):
+            doc[key] = column[i]
+        yield "business_metrics", doc
+
+
+def iter_columnar_shard(rng, now, start_minutes_ago, end_minutes_ago, services, placement, events_per_minute):
+    """Yield the metrics and business docs of one shard, drawn as whole-shard NumPy blocks.
+
+    Rows are laid out minute-major, so the output stays in time order.
+    """
+    minutes = np.arange(start_minutes_ago, end_minutes_ago, -1)
+    incident = minutes <= 40
+    severity_factor = np.where(incident, 1.0 + (40 - minutes) / 20.0, 0.0)
+    incident_i = 0
+    cascade_i = 6 if len(services) > 6 else -1
+
+    hosts = [h for name in placement for h in placement[name]]
+    host_pos = {id(h): i for i, h in enumerate(hosts)}
+    pair_service = np.array([si for si, svc in enumerate(services) for _ in placement[svc["name"]]])
+    pair_host = np.array([host_pos[id(h)] for svc in services for h in placement[svc["name"]]])
+
+    # Per (minute, service/host pair) sample counts: expected value plus a coin flip for the fraction
+    whole, frac = int(events_per_minute), events_per_minute - int(events_per_minute)
+    counts = whole + (rng.random((len(minutes), len(pair_service))) < frac)
+    flat = counts.ravel()
+    row_minute = np.repeat(np.repeat(np.arange(len(minutes)), len(pair_service)), flat)
+    row_pair = np.repeat(np.tile(np.arange(len(pair_service)), len(minutes)), flat)
+    row_service = pair_service[row_pair]
+    severity = np.where(row_service == incident_i, severity_factor[row_minute],
+                        np.where(row_service == cascade_i, severity_factor[row_minute] * 0.6, 0.0))
+    cols = generate_metrics_block(rng, now, minutes[row_minute], services, hosts,
+                                  row_service, pair_host[row_pair], severity)
+    yield from iter_metric_rows(cols, services, hosts)
+
+    biz_minutes = minutes[minutes % 5 == 0]
+    if len(biz_minutes):
+        b_minute = np.repeat(biz_minutes, len(services))
+        b_service = np.tile(np.arange(len(services)), len(biz_minutes))
+        b_incident = b_minute <= 40
+        b_sf = 1.0 + (40 - b_minute) / 20.0
+        affected = (b_service == incident_i) | (b_service == cascade_i)
+        health = np.where(b_incident & affected, np.maximum(0.2, 1.0 - (b_sf - 1.0) / 3.0),
+                          np.where(b_incident, rng.uniform(0.9, 1.0, len(b_minute)), 1.0))
+        yield from iter_business_rows(generate_business_block(rng, now, b_minute, services, b_service, health), services)
+
+
+def generate_shard(task):
+    """Generate one time shard into its own part files and return per-type doc counts.
+
+    The shard reseeds `random` (and the NumPy generator) from (seed, shard
+    index), so its output does not depend on which worker runs it or how
+    many workers there are. With the numpy backend, metrics and business
+    metrics are drawn as columns for the whole shard and only turned into
+    rows as they are written.
+    """
+    random.seed(f"{task['seed']}:{task['shard']}")
+    now = datetime.fromisoformat(task["now"])
+    services, hosts = build_fleet(task["services"], task["hosts"])
+    placement = service_placement(services, hosts)
+    columnar = task.get("backend") == "numpy"
+    writer = DocumentWriter(task["parts_dir"], data_types=SCALE_DATA_TYPES, bulk=task["bulk"],
+                            compress=task["compress"], part=f"{task['shard']:06d}",
+                            columnar=task.get("columnar", False))
+    try:
+        for minutes_ago in range(task["start_minutes_ago"], task["end_minutes_ago"], -1):
+            writer.write_all(iter_scale_minute(now, minutes_ago, services, placement, task["events_per_minute"],
+                                               include_numeric=not columnar))
+        if columnar:
+            rng = np.random.default_rng([task["seed"], task["shard"]])
+            writer.write_all(iter_columnar_shard(rng, now, task["start_minutes_ago"], task["end_minutes_ago"],
+                                                 services, placement, task["events_per_minute"]))
+    finally:
+        writer.close(report=False)
+    return writer.counts
+
+
+def generate_scale_data(output_dir, hours=24.0, service_count=8, host_count=6, events_per_minute=1.0,
+                        shard_minutes=60, workers=None, seed=42, now=None, bulk=False, compress=False,
+                        backend="python", columnar=False):
+    """Generate a large dataset by splitting the time range into shards run in a process pool.
+
+    Shards write part files in parallel; they are then concatenated in shard
+    order (gzip members concatenate into a valid stream), so the final files
+    are identical for any worker count given the same seed and anchor time.
+    Columnar shard stores are merged column by column in the same order.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    output_path = Path(output_dir)
+    parts_dir = output_path / ".shards"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    total_minutes = max(1, int(hours * 60))
+    tasks = []
+    for shard, start in enumerate(range(total_minutes, 0, -shard_minutes)):
+        tasks.append({
+            "shard": shard, "seed": seed, "now": now.isoformat(),
+            "start_minutes_ago": start, "end_minutes_ago": max(0, start - shard_minutes),
+            "services": service_count, "hosts": host_count, "events_per_minute": events_per_minute,
+            "parts_dir": str(parts_dir), "bulk": bulk, "compress": compress, "backend": backend,
+            "columnar": columnar,
+        })
+
+    counts = dict.fromkeys(SCALE_DATA_TYPES, 0)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard_counts in pool.map(generate_shard, tasks):
+            for data_type, n in shard_counts.items():
+                counts[data_type] += n
+
+    suffix = ".gz" if compress else ""
+    outputs = [(f"{dt}.json", dt) for dt in SCALE_DATA_TYPES]
+    if bulk:
+        outputs += [(f"{dt}_bulk.ndjson", dt) for dt in SCALE_DATA_TYPES]
+    for filename, data_type in outputs:
+        final_path = output_path / f"{filename}{suffix}"
+        with open(final_path, 'wb') as out:
+            for task in tasks:
+                part = parts_dir / f"{filename}.{task['shard']:06d}{suffix}"
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                part.unlink()
+        print(f"✅ Wrote {counts[data_type]:,} docs to {final_path}")
+    if columnar:
+        for data_type in SCALE_DATA_TYPES:
+            store_dir = output_path / "columnar" / data_type
+            with ColumnarWriter(store_dir) as store:
+                for task in tasks:
+                    part = parts_dir / "columnar" / f"{data_type}.{task['shard']:06d}"
+                    with ColumnarTable(part) as table:
+                        store.extend(table)
+                    shutil.rmtree(part)
+            print(f"✅ Wrote {counts[data_type]:,} docs (columnar) to {store_dir}")
+        (parts_dir / "columnar").rmdir()
+    parts_dir.rmdir()
+
+    with DocumentWriter(output_dir, data_types=["incidents_history"], bulk=bulk, compress=compress,
+                        columnar=columnar) as writer:
+        for incident in generate_historical_incidents(now):
+            writer.write("incidents_history", incident)
+    counts["incidents_history"] = writer.counts["incidents_history"]
+    return counts
+
+
+def print_summary(counts):
+    """Print generation summary from per-type document counts."""
     print("\n" + "=" * 60)
     print("🛡️  OpsGuard AI — Sample Data Generation Summary")
     print("=" * 60)
-    print(f"📊 Logs generated:           {len(data['logs']):,}")
-    print(f"📈 Metrics generated:        {len(data['metrics']):,}")
-    print(f"💰 Business metrics:         {len(data['business_metrics']):,}")
-    print(f"📋 Historical incidents:     {len(data['incidents_history']):,}")
-    print(f"📦 Total documents:          {sum(len(v) for v in data.values()):,}")
+    print(f"📊 Logs generated:           {counts['logs']:,}")
+    print(f"📈 Metrics generated:        {counts['metrics']:,}")
+    print(f"💰 Business metrics:         {counts['business_metrics']:,}")
+    print(f"📋 Historical incidents:     {counts['incidents_history']:,}")
+    print(f"📦 Total documents:          {sum(counts.values()):,}")
     print("=" * 60)
     print("\n📝 Scenario: payment-service degradation after v2.4.2 deployment")
     print("   - Normal period: T-120min to T-45min")
@@ -549,23 +996,64 @@ def main():
                         help="Directory to save generated JSON files (default: ./generated-data)")
     parser.add_argument("--bulk", action="store_true",
                         help="Also generate Elasticsearch bulk API format files")
+    parser.add_argument("--gzip", action="store_true",
+                        help="Write gzip-compressed output (.json.gz / .ndjson.gz)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Also write mmap-able columnar stores to <output-dir>/columnar/")
+    parser.add_argument("--scale", action="store_true",
+                        help="Generate a large load-test dataset in parallel (see --hours, --services, ...)")
+    parser.add_argument("--hours", type=float, default=24.0,
+                        help="Scale mode: time span to generate, ending now (default: 24)")
+    parser.add_argument("--services", type=int, default=len(SERVICES),
+                        help="Scale mode: number of services, synthesised beyond the built-in 8")
+    parser.add_argument("--hosts", type=int, default=len(HOSTS),
+                        help="Scale mode: number of hosts, synthesised beyond the built-in 6")
+    parser.add_argument("--events-per-minute", type=float, default=1.0,
+                        help="Scale mode: multiplier on per-host metrics/logs per minute (default: 1.0)")
+    parser.add_argument("--shard-minutes", type=int, default=60,
+                        help="Scale mode: minutes of data per shard (default: 60)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Scale mode: generator processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Scale mode: base random seed (default: 42)")
+    parser.add_argument("--anchor", default=None,
+                        help="Scale mode: ISO end timestamp instead of now, for reproducible output")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python",
+                        help="Scale mode: draw metrics with pure Python or as NumPy column blocks")
     args = parser.parse_args()
 
-    print("🛡️  OpsGuard AI — Generating sample data...")
-    data = generate_scenario_data()
-    print_summary(data)
+    if args.backend == "numpy" and np is None:
+        print("⚠️  NumPy is not installed — falling back to the pure-Python backend (pip install numpy)")
+        args.backend = "python"
 
-    save_to_files(data, args.output_dir)
+    if args.scale:
+        now = datetime.fromisoformat(args.anchor) if args.anchor else None
+        if now is not None and now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        print(f"🛡️  OpsGuard AI — Generating scale dataset: {args.hours:g}h, {args.services} services, "
+              f"{args.hosts} hosts, x{args.events_per_minute:g} events/min")
+        counts = generate_scale_data(
+            args.output_dir, hours=args.hours, service_count=args.services, host_count=args.hosts,
+            events_per_minute=args.events_per_minute, shard_minutes=args.shard_minutes,
+            workers=args.workers, seed=args.seed, now=now, bulk=args.bulk, compress=args.gzip,
+            backend=args.backend, columnar=args.columnar)
+        print(f"\n📦 Total documents: {sum(counts.values()):,}")
+        return
 
-    if args.bulk:
-        save_bulk_format(data, args.output_dir)
+    print("🛡️  OpsGuard AI — Generating sample data...")
+    with DocumentWriter(args.output_dir, bulk=args.bulk, compress=args.gzip, columnar=args.columnar) as writer:
+        writer.write_all(iter_scenario_docs())
+    print_summary(writer.counts)
 
     print(f"\n🎉 Data generation complete! Files saved to: {args.output_dir}")
     print("\nTo ingest into Elasticsearch:")
+    suffix = ".gz" if args.gzip else ""
     print("  curl -X POST '<ES_URL>/_bulk' \\")
     print("    -H 'Content-Type: application/x-ndjson' \\")
+    if args.gzip:
+        print("    -H 'Content-Encoding: gzip' \\")
     print("    -H 'Authorization: ApiKey <API_KEY>' \\")
-    print(f"    --data-binary @{args.output_dir}/logs_bulk.ndjson")
+    print(f"    --data-binary @{args.output_dir}/logs_bulk.ndjson{suffix}")
     print()
 
 
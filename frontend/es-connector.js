@@ -18,6 +18,7 @@ const ES_CONFIG = {
         metrics: 'opsguard-metrics',
         incidents: 'opsguard-history',
         business: 'opsguard-business',
+        rollup: 'opsguard-rollup-1m',
     }
 };
 
@@ -79,6 +80,16 @@ async function esqlQuery(query) {
     });
 }
 
+/**
+ * Prefer the per-minute rollup index (O(minutes × services) rows, written by
+ * `ingest_to_elastic.py --rollup`); fall back to the raw query when it is empty.
+ */
+async function esqlRollupOrRaw(rollupQuery, rawQuery) {
+    const rollup = await esqlQuery(rollupQuery);
+    if (rollup && rollup.values && rollup.values.length) return rollup;
+    return esqlQuery(rawQuery);
+}
+
 /**
  * Fetch live data from Elasticsearch and update dashboard
  */
@@ -100,12 +111,23 @@ async function refreshLiveData() {
         }
 
         // 2. Get service health via ES|QL
-        const healthData = await esqlQuery(`
+        const healthData = await esqlRollupOrRaw(`
+            FROM opsguard-rollup-1m
+            | WHERE rollup.source == "metrics"
+            | STATS cpu_sum = SUM(cpu.sum), cpu_n = SUM(cpu.count),
+                    memory_sum = SUM(memory.sum), memory_n = SUM(memory.count),
+                    max_cpu = MAX(cpu.max)
+              BY service.name
+            | EVAL avg_cpu = cpu_sum / cpu_n, avg_memory = memory_sum / memory_n
+            | KEEP service.name, avg_cpu, avg_memory, max_cpu
+            | SORT max_cpu DESC
+        `, `
             FROM opsguard-metrics
             | STATS avg_cpu = AVG(system.cpu.usage_percent), 
                     avg_memory = AVG(system.memory.usage_percent),
                     max_cpu = MAX(system.cpu.usage_percent)
               BY service.name
+            | KEEP service.name, avg_cpu, avg_memory, max_cpu
             | SORT max_cpu DESC
         `);
         if (healthData) {
@@ -114,12 +136,20 @@ async function refreshLiveData() {
         }
 
         // 3. Get error distribution
-        const errorData = await esqlQuery(`
+        const errorData = await esqlRollupOrRaw(`
+            FROM opsguard-rollup-1m
+            | WHERE rollup.source == "logs"
+            | STATS error_count = SUM(logs.errors) BY service.name
+            | WHERE error_count > 0
+            | KEEP service.name, error_count
+            | SORT error_count DESC
+        `, `
             FROM opsguard-incidents
             | WHERE log.level IN ("ERROR", "CRITICAL")
             | STATS error_count = COUNT(*), 
                     unique_codes = COUNT_DISTINCT(error.code)
               BY service.name
+            | KEEP service.name, error_count
             | SORT error_count DESC
         `);
         if (errorData) {
@@ -128,14 +158,29 @@ async function refreshLiveData() {
         }
 
         // 4. Get business impact
-        const bizData = await esqlQuery(`
+        const bizData = await esqlRollupOrRaw(`
+            FROM opsguard-rollup-1m
+            | WHERE rollup.source == "business"
+            | STATS total_revenue = SUM(revenue.sum),
+                    baseline_sum = SUM(baseline_hourly.sum), baseline_n = SUM(baseline_hourly.count),
+                    total_failures = SUM(failures.sum),
+                    total_txns = SUM(transactions.sum),
+                    users_sum = SUM(active_users.sum), users_n = SUM(active_users.count),
+                    samples = SUM(revenue.count)
+              BY service.name
+            | EVAL avg_baseline = baseline_sum / baseline_n, avg_users = users_sum / users_n
+            | KEEP service.name, total_revenue, avg_baseline, total_failures, total_txns, avg_users, samples
+            | SORT total_failures DESC
+        `, `
             FROM opsguard-business
             | STATS total_revenue = SUM(revenue.amount_usd),
                     avg_baseline = AVG(revenue.baseline_hourly_usd),
                     total_failures = SUM(transactions.failure_count),
                     total_txns = SUM(transactions.count),
-                    avg_users = AVG(active_users)
+                    avg_users = AVG(active_users),
+                    samples = COUNT(*)
               BY service.name
+            | KEEP service.name, total_revenue, avg_baseline, total_failures, total_txns, avg_users, samples
             | SORT total_failures DESC
         `);
         if (bizData) {
@@ -235,19 +280,27 @@ function updateErrorCounts(data) {
 function updateBusinessMetrics(data) {
     if (!data || !data.values) return;
 
-    let totalRevenue = 0;
-    let totalBaseline = 0;
+    let hourlyLoss = 0;
+    let hourlySurplus = 0;
     let totalFailures = 0;
     let totalTxns = 0;
 
+    // revenue.amount_usd is a per-minute rate sampled every few minutes, so each
+    // service's hourly revenue is its mean sample × 60 (not total ÷ number of services).
+    // Each service's loss is floored at zero and revenue above baseline counted as surplus,
+    // as BusinessImpact.service() does, so one service running ahead never hides another's loss
     data.values.forEach(row => {
-        totalRevenue += row[1] || 0;
-        totalBaseline += row[2] || 0;
+        const samples = row[6] || 0;
+        if (samples > 0) {
+            const shortfall = (row[2] || 0) - (row[1] || 0) * 60 / samples;
+            hourlyLoss += Math.max(0, shortfall);
+            hourlySurplus += Math.max(0, -shortfall);
+        }
         totalFailures += row[3] || 0;
         totalTxns += row[4] || 0;
     });
-
-    const hourlyLoss = Math.round(totalBaseline - (totalRevenue * 60 / data.values.length));
+    hourlyLoss = Math.round(hourlyLoss);
+    hourlySurplus = Math.round(hourlySurplus);
     const failureRate = totalTxns > 0 ? Math.round(totalFailures * 100 / totalTxns) : 0;
 
     const revenueEl = document.getElementById('revenueImpact');
@@ -257,7 +310,8 @@ function updateBusinessMetrics(data) {
 
     const revenueDetailEl = document.getElementById('revenueDetail');
     if (revenueDetailEl && hourlyLoss > 0) {
-        revenueDetailEl.textContent = `Projected 4hr loss: $${(hourlyLoss * 4).toLocaleString()}`;
+        revenueDetailEl.textContent = `Projected 4hr loss: $${(hourlyLoss * 4).toLocaleString()}`
+            + (hourlySurplus > 0 ? ` (+$${hourlySurplus.toLocaleString()}/hr above baseline elsewhere)` : '');
     }
 }
 
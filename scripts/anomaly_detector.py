@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Streaming Anomaly Detector
+Flags metric and error-rate anomalies relative to each service/host's own
+baseline, instead of the fixed cutoffs in detect-anomalies.esql and
+detect-error-spikes.esql.
+
+Per (service, host, signal) it keeps O(1) state: an EWMA mean/variance and a
+P² estimate of the 99th percentile. A sample is anomalous when it is both
+z_threshold standard deviations above the EWMA mean and above the P99
+estimate. Metrics arrive about every 5 minutes per host, so a host series
+needs hours to reach `warmup` samples; until it does, its samples are
+scored against a per-service baseline over all of the service's hosts,
+which is usable after `service_warmup` samples. Error counts are per
+minute and only use the host series. Events reuse the tools' severity
+vocabulary:
+  metrics (CPU, memory, disk, load)   CRITICAL / HIGH / MEDIUM
+  errors per minute (ERROR+CRITICAL)  SPIKE / ELEVATED / MODERATE
+
+Used inline by `ingest_to_elastic.py --detect`, or replayed over generated files:
+  python3 scripts/anomaly_detector.py --data-dir generated-data
+  python3 scripts/anomaly_detector.py --output generated-data/anomalies.ndjson --z-threshold 4
+  python3 scripts/anomaly_detector.py --service-warmup 0      # host baselines only
+"""
+
+import os, json, gzip, math, time, argparse, collections
+from datetime import datetime
+
+from rollup import minute_bucket
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+# signal → (field, std floor); the floor keeps near-constant series from alerting on noise
+METRIC_SIGNALS = {
+    "cpu": ("system.cpu.usage_percent", 2.0),
+    "memory": ("system.memory.usage_percent", 2.0),
+    "disk": ("system.disk.usage_percent", 2.0),
+    "load_1m": ("system.load.1m", 0.25),
+}
+ERROR_SIGNAL = "errors_per_minute"
+ERROR_STD_FLOOR = 1.0
+ERROR_LEVELS = {"ERROR", "CRITICAL"}
+MAX_GAP_MINUTES = 60
+SERVICE_HOST = "*"        # host.name of the per-service fallback series
+
+# (min z-score, severity), highest first
+METRIC_SEVERITIES = [(6.0, "CRITICAL"), (4.5, "HIGH"), (3.0, "MEDIUM")]
+ERROR_SEVERITIES = [(6.0, "SPIKE"), (4.5, "ELEVATED"), (3.0, "MODERATE")]
+SEVERITY_RANK = {s: i for i, s in enumerate(["MEDIUM", "HIGH", "CRITICAL", "MODERATE", "ELEVATED", "SPIKE"])}
+
+INPUTS = [("opsguard-metrics", "metrics"), ("opsguard-incidents", "logs")]
+
+class P2Quantile:
+    """Jain & Chlamtac's P² streaming quantile estimate: five markers, no stored samples."""
+    __slots__ = ("p", "q", "n", "desired", "step")
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.n = [0, 1, 2, 3, 4]
+        self.desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x):
+        q = self.q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        n = self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired, step = self.desired, self.step
+        for i in range(5):
+            desired[i] += step[i]
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        q = self.q
+        if not q:
+            return None
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(self.p * len(q)))]
+        return q[2]
+
+class Baseline:
+    """EWMA mean/variance plus a P² tail quantile for one series.
+
+    During warm-up the weight is max(alpha, 1/n), i.e. a plain running mean,
+    so the baseline converges quickly before EWMA smoothing takes over.
+    Anomalous samples only nudge the mean (scaled by `weight`) and leave the
+    variance and tail alone, so an incident doesn't widen the band it is judged by
+    while a lasting level shift is still absorbed over time.
+    """
+    __slots__ = ("alpha", "n", "mean", "var", "tail")
+
+    def __init__(self, alpha, quantile):
+        self.alpha = alpha
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.tail = P2Quantile(quantile)
+
+    def score(self, x, std_floor):
+        return (x - self.mean) / max(math.sqrt(self.var), std_floor)
+
+    def update(self, x, weight=1.0, anomalous=False):
+        self.n += 1
+        alpha = max(self.alpha, 1.0 / self.n) * weight
+        diff = x - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        if not anomalous:
+            self.var = (1 - alpha) * (self.var + diff * incr)
+            self.tail.add(x)
+
+class ErrorCounter:
+    """Errors in the current minute for one (service, host)."""
+    __slots__ = ("minute", "errors", "timestamp")
+
+    def __init__(self, minute):
+        self.minute = minute
+        self.errors = 0
+        self.timestamp = minute
+
+class AnomalyDetector:
+    """Consumes raw docs via add(index, doc) and reports anomaly events to `sink`.
+
+    Error counts are scored when their minute closes (the next minute's first
+    log for that service/host, or flush()). A series stays anomalous until
+    its z-score drops below half the threshold, and repeated events are
+    suppressed for `cooldown` seconds unless the severity escalates.
+    """
+
+    def __init__(self, sink=None, alpha=0.05, quantile=0.99, z_threshold=3.0, warmup=30, service_warmup=5,
+                 anomaly_weight=0.1, cooldown=300):
+        self.sink = sink
+        self.alpha = alpha
+        self.quantile = quantile
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.service_warmup = service_warmup
+        self.anomaly_weight = anomaly_weight
+        self.cooldown = cooldown
+        self.baselines = {}
+        self.error_counters = {}
+        self.last_event = {}
+        self.active = set()
+        self.docs_seen = 0
+        self.counts = collections.Counter()
+
+    def _baseline(self, key):
+        baseline = self.baselines.get(key)
+        if baseline is None:
+            baseline = self.baselines[key] = Baseline(self.alpha, self.quantile)
+        return baseline
+
+    def _observe(self, key, value, std_floor, severities, timestamp, fallback=None):
+        baseline = self._baseline(key)
+        shared = self._baseline(fallback) if fallback is not None and self.service_warmup else None
+        scorer = baseline
+        if baseline.n < self.warmup:
+            # a cold host series borrows its service's baseline, once that has warmed up
+            scorer = shared if shared is not None and shared.n >= self.service_warmup else None
+        if scorer is not None:
+            z = scorer.score(value, std_floor)
+            p99 = scorer.tail.value()
+            if key in self.active:
+                # Hysteresis: stay in the anomaly until z falls below half the threshold
+                anomalous = z >= self.z_threshold / 2
+            else:
+                anomalous = z >= self.z_threshold and value > p99
+            if anomalous:
+                self.active.add(key)
+                if z >= self.z_threshold:
+                    severity = next((s for threshold, s in severities if z >= threshold), severities[-1][1])
+                    self._emit(key, value, scorer, z, p99, severity, timestamp)
+                baseline.update(value, self.anomaly_weight, anomalous=True)
+                if shared is not None:
+                    shared.update(value, self.anomaly_weight, anomalous=True)
+                return
+            self.active.discard(key)
+        baseline.update(value)
+        if shared is not None:
+            shared.update(value)
+
+    def _emit(self, key, value, baseline, z, p99, severity, timestamp):
+        service, host, signal = key
+        when = _epoch(timestamp)
+        last = self.last_event.get(key)
+        if last is not None and when - last[0] < self.cooldown and SEVERITY_RANK[severity] <= SEVERITY_RANK[last[1]]:
+            return
+        self.last_event[key] = (when, severity)
+        self.counts[severity] += 1
+        if self.sink is not None:
+            self.sink({
+                "@timestamp": timestamp,
+                "service.name": service,
+                "host.name": host,
+                "signal": signal,
+                "value": round(value, 2),
+                "baseline.mean": round(baseline.mean, 2),
+                "baseline.std": round(math.sqrt(baseline.var), 2),
+                "baseline.p99": round(p99, 2),
+                "z_score": round(z, 2),
+                "severity": severity,
+            })
+
+    def add(self, index, doc):
+        if index == "opsguard-metrics":
+            self.docs_seen += 1
+            service, host, timestamp = doc.get("service.name"), doc.get("host.name"), doc.get("@timestamp")
+            for signal, (field, std_floor) in METRIC_SIGNALS.items():
+                value = doc.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._observe((service, host, signal), value, std_floor, METRIC_SEVERITIES, timestamp,
+                                  fallback=(service, SERVICE_HOST, signal))
+        elif index == "opsguard-incidents":
+            self.docs_seen += 1
+            minute = minute_bucket(doc.get("@timestamp"))
+            if minute is None:
+                return
+            series = (doc.get("service.name"), doc.get("host.name"))
+            counter = self.error_counters.get(series)
+            if counter is None:
+                counter = self.error_counters[series] = ErrorCounter(minute)
+            elif minute > counter.minute:
+                self._close_minute(series, counter, minute)
+            if doc.get("log.level") in ERROR_LEVELS:
+                counter.errors += 1
+                counter.timestamp = max(counter.timestamp, doc["@timestamp"])
+
+    def _close_minute(self, series, counter, next_minute):
+        key = series + (ERROR_SIGNAL,)
+        self._observe(key, counter.errors, ERROR_STD_FLOOR, ERROR_SEVERITIES, counter.timestamp)
+        # Quiet minutes in between count as zero errors (bounded, so a long gap can't stall the stream)
+        gap = int((_epoch(next_minute) - _epoch(counter.minute)) // 60) - 1
+        baseline = self._baseline(key)
+        for _ in range(min(max(gap, 0), MAX_GAP_MINUTES)):
+            baseline.update(0)
+        counter.minute = counter.timestamp = next_minute
+        counter.errors = 0
+
+    def flush(self):
+        """Score every still-open minute (end of stream)."""
+        for series, counter in self.error_counters.items():
+            self._observe(series + (ERROR_SIGNAL,), counter.errors, ERROR_STD_FLOOR, ERROR_SEVERITIES,
+                          counter.timestamp)
+            counter.errors = 0
+
+    def summary(self):
+        if not self.counts:
+            return f"no anomalies in {self.docs_seen:,} docs ({len(self.baselines):,} series)"
+        found = ", ".join(f"{n} {s}" for s, n in sorted(self.counts.items(), key=lambda kv: -SEVERITY_RANK[kv[0]]))
+        return f"{found} across {len(self.baselines):,} series ({self.docs_seen:,} docs)"
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+def iter_docs(data_dir, stem):
+    """Docs from `<stem>.json` (or .gz), in file order."""
+    path = os.path.join(data_dir, f"{stem}.json")
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        path += ".gz"
+    if not os.path.exists(path):
+        print(f"  ⚠️  {os.path.basename(path)} not found, skipping")
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI streaming anomaly detector")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="Generator output directory (default: generated-data)")
+    parser.add_argument("--output", default=None,
+                        help="Write events as NDJSON here instead of printing them")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="EWMA smoothing factor (default: 0.05)")
+    parser.add_argument("--z-threshold", type=float, default=3.0,
+                        help="Standard deviations above baseline to flag (default: 3)")
+    parser.add_argument("--warmup", type=int, default=30,
+                        help="Samples per host series before it is scored on its own baseline (default: 30)")
+    parser.add_argument("--service-warmup", type=int, default=5,
+                        help="Samples per service before its cold host metric series are scored against it; "
+                             "0 waits for the host series (default: 5)")
+    parser.add_argument("--cooldown", type=float, default=300,
+                        help="Seconds to suppress repeats of the same severity per series (default: 300)")
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else None
+
+    def sink(event):
+        if out is not None:
+            out.write(json.dumps(event) + "\n")
+        else:
+            print(f"  🚨 {event['severity']:<8} {event['@timestamp'][:19]}  {event['service.name']} @ "
+                  f"{event['host.name']}  {event['signal']}={event['value']} "
+                  f"(baseline {event['baseline.mean']} ± {event['baseline.std']}, z={event['z_score']})")
+
+    detector = AnomalyDetector(sink=sink, alpha=args.alpha, z_threshold=args.z_threshold,
+                               warmup=args.warmup, service_warmup=args.service_warmup, cooldown=args.cooldown)
+    start = time.time()
+    for index, stem in INPUTS:
+        for doc in iter_docs(args.data_dir, stem):
+            detector.add(index, doc)
+    detector.flush()
+    elapsed = time.time() - start
+    if out is not None:
+        out.close()
+        print(f"✅ Events written to {args.output}")
+    rate = detector.docs_seen / elapsed if elapsed > 0 else 0
+    print(f"📈 {detector.summary()} — {rate:,.0f} docs/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Generation & Ingestion Benchmarks
+Times the data generator at several scales, then ingests each dataset into a
+local mock `_bulk` server (scripts/mock_es.py) with configurable latency and
+rejection rates. For every run it records docs/s, MB/s, wall time and the
+peak RSS of the largest process, plus p50/p99 `_bulk` latency for ingestion.
+
+Both tools run as child processes exactly as a user would start them, so the
+numbers include interpreter start-up and peak RSS is measured per run. A run
+is saved as JSON; pass an earlier file to --compare to flag regressions
+beyond --tolerance (exit status 1 if any).
+
+Usage:
+  python3 scripts/benchmark.py                                   # scales 1,4,12 hours
+  python3 scripts/benchmark.py --scales 0.5,2 --latency 0.02 --reject-rate 0.01
+  python3 scripts/benchmark.py --compare generated-data/benchmarks/<earlier run>.json
+"""
+
+import os, sys, json, time, shutil, platform, argparse, tempfile, subprocess
+from datetime import datetime, timezone
+from mock_es import MockElasticsearch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+GENERATOR = os.path.join(BASE_DIR, "data", "sample-data-generator.py")
+INGESTER = os.path.join(BASE_DIR, "scripts", "ingest_to_elastic.py")
+RESULTS_DIR = os.path.join(DATA_DIR, "benchmarks")
+
+ANCHOR = "2026-01-01T00:00:00+00:00"   # fixed end time, so every run generates the same documents
+DOC_FILES = ["logs.json", "metrics.json", "business_metrics.json", "incidents_history.json"]
+
+# metric → True if higher is better; everything else in a result is informational
+METRICS = {
+    "docs_per_sec": True,
+    "mb_per_sec": True,
+    "p50_latency_ms": False,
+    "p99_latency_ms": False,
+    "peak_rss_mb": False,
+}
+
+def run_measured(cmd, env=None):
+    """Run cmd to completion; return (seconds, peak RSS in MB, output). Raises if it fails."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+    output = proc.stdout.read().decode('utf-8', errors='replace')
+    proc.stdout.close()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(cmd[1])} exited with {proc.returncode}:\n{output[-2000:]}")
+    # ru_maxrss covers the child and the descendants it waited for (the generator's process pool)
+    rss_mb = usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+    return elapsed, rss_mb, output
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+def bench_generate(hours, output_dir, workers=None):
+    cmd = [sys.executable, GENERATOR, "--scale", "--bulk", "--hours", str(hours),
+           "--anchor", ANCHOR, "--output-dir", output_dir]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    elapsed, rss_mb, _ = run_measured(cmd)
+    docs = sum(count_lines(os.path.join(output_dir, name)) for name in DOC_FILES)
+    size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir)
+               if os.path.isfile(os.path.join(output_dir, name)))
+    return {
+        "docs": docs,
+        "bytes_written": size,
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(docs / elapsed, 1),
+        "mb_per_sec": round(size / 1e6 / elapsed, 2),
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+def bench_ingest(data_dir, latency=0.0, reject_rate=0.0, workers=4, compress=False):
+    with MockElasticsearch(latency=latency, reject_rate=reject_rate) as es:
+        env = dict(os.environ, ES_URL=es.url, ES_API_KEY="benchmark", PYTHONUNBUFFERED="1")
+        cmd = [sys.executable, INGESTER, "--data-dir", data_dir, "--workers", str(workers),
+               "--dead-letter", os.path.join(data_dir, "dead-letter.ndjson")]
+        if compress:
+            cmd.append("--gzip")
+        elapsed, rss_mb, _ = run_measured(cmd, env=env)
+        stats = es.stats
+    return {
+        "docs": stats.docs_indexed,
+        "bytes_sent": stats.bytes_received,
+        "bulk_requests": stats.bulk_requests,
+        "items_rejected": stats.items_rejected,
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(stats.docs_indexed / elapsed, 1),
+        "mb_per_sec": round(stats.bytes_received / 1e6 / elapsed, 2),
+        "p50_latency_ms": round(percentile(stats.bulk_latencies, 50) * 1000, 2),
+        "p99_latency_ms": round(percentile(stats.bulk_latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(current, baseline, tolerance):
+    """Return (name, metric, baseline, current, change) for every metric that got worse by more than tolerance."""
+    previous = {(r["phase"], r["hours"]): r for r in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        old = previous.get((run["phase"], run["hours"]))
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in run or not old.get(metric):
+                continue
+            change = (run[metric] - old[metric]) / old[metric]
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((f"{run['phase']} {run['hours']:g}h", metric, old[metric], run[metric], change))
+    return regressions
+
+def print_run(run):
+    line = (f"  {run['phase']:<8} {run['hours']:>5g}h  {run['docs']:>10,} docs  {run['seconds']:>7.2f}s  "
+            f"{run['docs_per_sec']:>10,.0f} docs/s  {run['mb_per_sec']:>7.2f} MB/s  RSS {run['peak_rss_mb']:>6.1f} MB")
+    if "p50_latency_ms" in run:
+        line += f"  _bulk p50 {run['p50_latency_ms']:.1f} ms / p99 {run['p99_latency_ms']:.1f} ms"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI generation & ingestion benchmarks")
+    parser.add_argument("--scales", default="1,4,12",
+                        help="Comma-separated dataset sizes in hours of scale-mode data (default: 1,4,12)")
+    parser.add_argument("--gen-workers", type=int, default=None,
+                        help="Generator processes (default: CPU count)")
+    parser.add_argument("--workers", type=int, default=4, help="Ingester --workers (default: 4)")
+    parser.add_argument("--gzip", action="store_true", help="Ingest with gzip-compressed _bulk bodies")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds the mock server waits before answering each _bulk (default: 0)")
+    parser.add_argument("--reject-rate", type=float, default=0.0,
+                        help="Fraction of _bulk items the mock server rejects with 429 (default: 0)")
+    parser.add_argument("--skip-ingest", action="store_true", help="Only benchmark the generator")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default: generated-data/benchmarks/bench-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative slowdown before a metric counts as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    scales = [float(s) for s in args.scales.split(",") if s.strip()]
+    started = datetime.now(timezone.utc)
+    results = {
+        "started_at": started.isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {"scales": scales, "gen_workers": args.gen_workers, "workers": args.workers,
+                   "gzip": args.gzip, "latency": args.latency, "reject_rate": args.reject_rate},
+        "runs": [],
+    }
+
+    print("⏱️  OpsGuard AI — Benchmarks")
+    workdir = tempfile.mkdtemp(prefix="opsguard-bench-")
+    try:
+        for hours in scales:
+            data_dir = os.path.join(workdir, f"{hours:g}h")
+            run = {"phase": "generate", "hours": hours, **bench_generate(hours, data_dir, args.gen_workers)}
+            results["runs"].append(run)
+            print_run(run)
+            if not args.skip_ingest:
+                run = {"phase": "ingest", "hours": hours,
+                       **bench_ingest(data_dir, args.latency, args.reject_rate, args.workers, args.gzip)}
+                results["runs"].append(run)
+                print_run(run)
+            shutil.rmtree(data_dir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print(f"⚠️  {args.compare} was run with different settings: {baseline.get('config')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if not regressions:
+            print(f"✅ No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+            return
+        print(f"❌ {len(regressions)} regression(s) against {args.compare}:")
+        for name, metric, old, new, change in regressions:
+            print(f"    {name:<16} {metric:<16} {old:>12,.2f} → {new:>12,.2f}  ({change:+.1%})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Streaming Business Impact
+Keeps revenue, transaction and SLA figures per service (and per tier) up to
+date as opsguard-business docs arrive, so loss-per-hour, SLA breach and
+projected loss are available on demand without re-aggregating an hour of
+documents the way business-impact.esql does.
+
+Each business doc carries a per-minute revenue rate (the generator emits
+baseline / 60 × health) and is sampled every few minutes (five in
+generate_scenario_data()). Every sample is weighted by the time it covers —
+the gap since the service's previous sample — so hourly figures stay
+correct whatever the sampling interval, and a missing sample does not
+inflate the average:
+  loss/hour       (baseline − revenue) accrued over the window ÷ minutes covered × 60,
+                  floored at zero; revenue above baseline is surplus/hour instead,
+                  so one service running ahead never offsets another's loss
+  current loss    the same over the last few minutes only
+  projected loss  current loss/hour × horizon
+  SLA breach      minutes covered by non-compliant samples; breached while
+                  the latest sample is non-compliant
+Per service, samples live in a fixed-size ring buffer with running sums, so
+an update and every query are O(1); tier figures add up their services.
+
+Used inline by `ingest_to_elastic.py --impact`, or replayed over generated files:
+  python3 scripts/business_impact.py --data-dir generated-data
+  python3 scripts/business_impact.py --window 30 --horizon 2 --json
+"""
+
+import os, json, time, argparse
+from datetime import datetime
+
+from anomaly_detector import iter_docs
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+BUSINESS_INDEX = "opsguard-business"
+SAMPLE_MINUTES = 5        # generate_scenario_data() writes business metrics every 5 minutes
+MAX_GAP_MINUTES = 15      # a longer silence is not assumed to have run at the last seen rate
+SLA_TARGETS = {"critical": 99.9, "high": 99.5, "medium": 99.0}   # success rate %, used when a doc has no SLA flag
+
+# (min current loss per hour, priority), highest first — the cutoffs of business-impact.esql
+PRIORITIES = [(10000, "P0-CRITICAL"), (1000, "P1-HIGH"), (100, "P2-MEDIUM")]
+
+def impact_priority(loss_per_hour):
+    return next((p for threshold, p in PRIORITIES if loss_per_hour > threshold), "P3-LOW")
+
+class ImpactWindow:
+    """Ring buffer of the samples in the last `minutes`, with running sums of each column.
+
+    push() evicts samples that fell out of the window (or the oldest one
+    when the buffer is full) and subtracts them from the sums, so it and
+    every read are O(1). Sums are rebuilt from the buffer once per
+    `capacity` pushes, which keeps float drift from accumulating.
+    """
+    __slots__ = ("minutes", "capacity", "ts", "cols", "sums", "head", "size", "pushes")
+
+    # covered minutes, revenue, baseline revenue, transactions, failures, breach minutes
+    COLUMNS = 6
+
+    def __init__(self, minutes, capacity):
+        self.minutes = minutes
+        self.capacity = capacity
+        self.ts = [0.0] * capacity
+        self.cols = [[0.0] * capacity for _ in range(self.COLUMNS)]
+        self.sums = [0.0] * self.COLUMNS
+        self.head = 0
+        self.size = 0
+        self.pushes = 0
+
+    def push(self, ts, values):
+        cutoff = ts - self.minutes * 60
+        while self.size and (self.size == self.capacity or self.ts[self.head] <= cutoff):
+            self._evict()
+        slot = (self.head + self.size) % self.capacity
+        self.ts[slot] = ts
+        sums = self.sums
+        for i, value in enumerate(values):
+            self.cols[i][slot] = value
+            sums[i] += value
+        self.size += 1
+        self.pushes += 1
+        if self.pushes % self.capacity == 0:
+            self._resum()
+
+    def _evict(self):
+        head = self.head
+        sums = self.sums
+        for i, col in enumerate(self.cols):
+            sums[i] -= col[head]
+        self.head = (head + 1) % self.capacity
+        self.size -= 1
+
+    def _resum(self):
+        slots = [(self.head + i) % self.capacity for i in range(self.size)]
+        self.sums = [sum(col[s] for s in slots) for col in self.cols]
+
+class ServiceImpact:
+    """Per-service state: tier, last sample and the long and recent windows."""
+    __slots__ = ("name", "tier", "last_ts", "last_timestamp", "compliant", "samples", "window", "recent")
+
+    def __init__(self, name, tier, window_minutes, recent_minutes, capacity):
+        self.name = name
+        self.tier = tier
+        self.last_ts = None
+        self.last_timestamp = None
+        self.compliant = True
+        self.samples = 0
+        self.window = ImpactWindow(window_minutes, capacity)
+        self.recent = ImpactWindow(recent_minutes, capacity)
+
+class BusinessImpact:
+    """Consumes raw docs via add(index, doc) and answers impact queries per service and tier."""
+
+    def __init__(self, window_minutes=60, recent_minutes=15, horizon_hours=4.0,
+                 sample_minutes=SAMPLE_MINUTES, max_gap_minutes=MAX_GAP_MINUTES):
+        self.window_minutes = window_minutes
+        self.recent_minutes = recent_minutes
+        self.horizon_hours = horizon_hours
+        self.sample_minutes = sample_minutes
+        self.max_gap_minutes = max_gap_minutes
+        # at most one sample per minute is expected; more just evicts early
+        self.capacity = max(16, int(window_minutes) + 1)
+        self.services = {}
+        self.docs_seen = 0
+
+    def add(self, index, doc):
+        if index != BUSINESS_INDEX:
+            return
+        name = doc.get("service.name")
+        ts = _epoch(doc.get("@timestamp"))
+        if name is None or ts is None:
+            return
+        self.docs_seen += 1
+        state = self.services.get(name)
+        if state is None:
+            state = self.services[name] = ServiceImpact(name, doc.get("service.tier", "unknown"),
+                                                        self.window_minutes, self.recent_minutes, self.capacity)
+        latest = state.last_ts is None or ts > state.last_ts
+        if state.last_ts is None or not latest:
+            covered = self.sample_minutes      # first (or out-of-order) sample: assume the usual interval
+        else:
+            covered = min((ts - state.last_ts) / 60, self.max_gap_minutes)
+        if latest:
+            state.last_ts = ts
+            state.last_timestamp = doc.get("@timestamp")
+
+        txns = _number(doc.get("transactions.count"))
+        failures = _number(doc.get("transactions.failure_count"))
+        compliant = doc.get("sla_compliance", doc.get("sla.compliant"))
+        if not isinstance(compliant, bool):
+            target = SLA_TARGETS.get(state.tier, 99.0)
+            compliant = txns <= 0 or (txns - failures) * 100 / txns >= target
+        if latest:
+            state.compliant = compliant
+        state.samples += 1
+        values = (
+            covered,
+            _number(doc.get("revenue.amount_usd")) * covered,
+            _number(doc.get("revenue.baseline_hourly_usd")) / 60 * covered,
+            txns,
+            failures,
+            0.0 if compliant else covered,
+        )
+        state.window.push(ts, values)
+        state.recent.push(ts, values)
+
+    def service(self, name):
+        """Impact figures for one service (None if it has not been seen)."""
+        state = self.services.get(name)
+        if state is None:
+            return None
+        covered, revenue, baseline, txns, failures, breach = state.window.sums
+        recent = state.recent.sums
+        per_hour = 60 / covered if covered > 0 else 0.0
+        current_loss = max((recent[2] - recent[1]) * 60 / recent[0], 0.0) if recent[0] > 0 else 0.0
+        return {
+            "service.name": state.name,
+            "service.tier": state.tier,
+            "@timestamp": state.last_timestamp,
+            "window_minutes": round(covered, 1),
+            "samples": state.window.size,
+            "revenue_per_hour": round(revenue * per_hour, 2),
+            "baseline_per_hour": round(baseline * per_hour, 2),
+            "loss_per_hour": round(max(baseline - revenue, 0.0) * per_hour, 2),
+            "loss_usd": round(max(baseline - revenue, 0.0), 2),
+            "surplus_per_hour": round(max(revenue - baseline, 0.0) * per_hour, 2),
+            "current_loss_per_hour": round(current_loss, 2),
+            "projected_loss_usd": round(current_loss * self.horizon_hours, 2),
+            "failure_rate_percent": round(failures * 100 / txns, 2) if txns > 0 else 0.0,
+            "sla.breach_minutes": round(breach, 1),
+            "sla.breached": not state.compliant,
+            "impact_priority": impact_priority(current_loss),
+        }
+
+    def snapshot(self):
+        """Figures for every service, largest current loss first."""
+        rows = [self.service(name) for name in self.services]
+        return sorted(rows, key=lambda r: -r["current_loss_per_hour"])
+
+    def tiers(self):
+        """Per-tier totals: hourly and projected figures of a tier's services add up."""
+        totals = {}
+        for row in self.snapshot():
+            tier = totals.setdefault(row["service.tier"], {
+                "service.tier": row["service.tier"], "services": 0, "services_breached": 0,
+                "loss_per_hour": 0.0, "surplus_per_hour": 0.0, "current_loss_per_hour": 0.0,
+                "projected_loss_usd": 0.0})
+            tier["services"] += 1
+            tier["services_breached"] += row["sla.breached"]
+            for key in ("loss_per_hour", "surplus_per_hour", "current_loss_per_hour", "projected_loss_usd"):
+                tier[key] = round(tier[key] + row[key], 2)
+        for tier in totals.values():
+            tier["impact_priority"] = impact_priority(tier["current_loss_per_hour"])
+        return sorted(totals.values(), key=lambda t: -t["current_loss_per_hour"])
+
+    def summary(self):
+        if not self.services:
+            return f"no business docs in {self.docs_seen:,} docs"
+        rows = self.snapshot()
+        current = sum(r["current_loss_per_hour"] for r in rows)
+        projected = sum(r["projected_loss_usd"] for r in rows)
+        breached = sum(r["sla.breached"] for r in rows)
+        return (f"${current:,.0f}/hr current loss, ${projected:,.0f} projected over {self.horizon_hours:g}h, "
+                f"{breached} of {len(rows)} services breaching SLA")
+
+    def report(self, limit=10):
+        """Human-readable table of the services losing the most, then tier totals."""
+        lines = [f"{'service':<22} {'tier':<9} {'loss/hr':>10} {'now/hr':>10} {'projected':>11} "
+                 f"{'fail %':>7} {'SLA':>9}  priority"]
+        for r in self.snapshot()[:limit]:
+            sla = f"✗ {r['sla.breach_minutes']:.0f}m" if r["sla.breached"] else f"{r['sla.breach_minutes']:.0f}m"
+            lines.append(f"{r['service.name']:<22} {r['service.tier']:<9} {r['loss_per_hour']:>10,.0f} "
+                         f"{r['current_loss_per_hour']:>10,.0f} {r['projected_loss_usd']:>11,.0f} "
+                         f"{r['failure_rate_percent']:>7.1f} {sla:>9}  {r['impact_priority']}")
+        for t in self.tiers():
+            lines.append(f"  tier {t['service.tier']:<9} {t['services']} services, {t['services_breached']} breaching SLA, "
+                         f"${t['current_loss_per_hour']:,.0f}/hr now, ${t['projected_loss_usd']:,.0f} projected "
+                         f"({t['impact_priority']})")
+        return "\n".join(lines)
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI streaming business impact")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="Generator output directory (default: generated-data)")
+    parser.add_argument("--window", type=float, default=60,
+                        help="Minutes of samples behind loss/hour and SLA breach (default: 60)")
+    parser.add_argument("--recent", type=float, default=15,
+                        help="Minutes behind the current loss rate used for projection (default: 15)")
+    parser.add_argument("--horizon", type=float, default=4,
+                        help="Hours to project the current loss over (default: 4)")
+    parser.add_argument("--json", action="store_true",
+                        help="Print services and tiers as JSON instead of a table")
+    args = parser.parse_args()
+
+    impact = BusinessImpact(window_minutes=args.window, recent_minutes=args.recent, horizon_hours=args.horizon)
+    start = time.time()
+    for doc in iter_docs(args.data_dir, "business_metrics"):
+        impact.add(BUSINESS_INDEX, doc)
+    elapsed = time.time() - start
+    if args.json:
+        print(json.dumps({"services": impact.snapshot(), "tiers": impact.tiers()}, indent=2))
+        return
+    print(impact.report())
+    rate = impact.docs_seen / elapsed if elapsed > 0 else 0
+    print(f"💰 {impact.summary()} — {rate:,.0f} docs/s")
+
+if __name__ == "__main__":
+    main()
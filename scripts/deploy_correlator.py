@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Deployment Change-Point Correlator
+Answers the question check-deployments.esql cannot: did errors or latency
+start right after a rollout? Logs are streamed once; nothing is rescanned
+per query.
+
+Per service, logs are folded into per-minute buckets (error rate, mean
+response_time_ms), and every closed minute feeds a one-sided CUSUM per
+signal:
+  S = max(0, S + (x − μ) / σ − k)      alarm when S > h
+μ and σ are learned from every minute outside a suspected step (so a
+change is not absorbed into its own baseline). The onset is the first
+minute of the alarming run that sat at least `min_shift` σ above the
+baseline (a run can start on noise well before the step), and after an
+alarm the baseline moves to the new level. Alarms whose run averages less
+than `min_shift` σ above the baseline are slow drift, not a step, and are
+dropped.
+
+Deployments are logs with url.path /deploy (or a "Deployment started"
+message), plus the first log of a service carrying a new
+deployment.version. Each change point is matched to deployments at most
+`max_lag` minutes before its onset and scored:
+  confidence = scope × exp(−lag / lag_scale) × (1 − exp(−(shift − min_shift) / 3))
+where scope is 1 for the deployed service itself and, only with
+`cross_links` (--cross-service N), `cross_service` for the N nearest
+deployments of other services (a downstream cascade). shift is the change
+size in baseline standard deviations, so a change barely past the
+reporting threshold — what noise looks like across a large fleet — scores
+near zero. A deployment's signals combine as 1 − Π(1 − confidence). State
+is O(1) per service and signal, so thousands of services stream at the
+cost of the docs themselves.
+
+Used inline by `ingest_to_elastic.py --correlate`, or over generated files:
+  python3 scripts/deploy_correlator.py --data-dir generated-data
+  python3 scripts/deploy_correlator.py --max-lag 60 --json
+  python3 scripts/deploy_correlator.py --cross-service 3    # also link downstream cascades
+"""
+
+import os, json, math, time, bisect, argparse, collections
+from datetime import datetime, timezone
+
+from anomaly_detector import iter_docs
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+LOG_INDEX = "opsguard-incidents"
+ERROR_LEVELS = {"ERROR", "CRITICAL"}
+LATE_MINUTES = 2          # a minute closes once a log 2 minutes newer arrives for its service
+MAX_CHANGE_POINTS = 10000
+MAX_DEPLOYS = 10000
+MAX_VERSIONS_PER_SERVICE = 8
+
+# signal → (σ floor as an absolute value, σ floor as a fraction of the mean)
+SIGNALS = {
+    "error_rate": (0.05, 0.0),
+    "response_time_ms": (10.0, 0.25),
+}
+
+class Cusum:
+    """One-sided (upward) CUSUM over a baseline learned while no step is suspected."""
+    __slots__ = ("n", "mean", "m2", "s", "run_start", "run_sum", "run_count")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.s = 0.0
+        self.run_start = None
+        self.run_sum = 0.0
+        self.run_count = 0
+
+    def std(self, floors):
+        absolute, relative = floors
+        var = self.m2 / (self.n - 1) if self.n > 1 else 0.0
+        return max(math.sqrt(var), absolute, relative * abs(self.mean))
+
+    def learn(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def restart(self, mean):
+        """Move the baseline to the post-change level, keeping the learned spread (no second warmup)."""
+        self.mean = mean
+        self.s, self.run_start, self.run_sum, self.run_count = 0.0, None, 0.0, 0
+
+class ServiceState:
+    __slots__ = ("buckets", "newest", "cusums", "versions")
+
+    def __init__(self):
+        self.buckets = {}          # open minute → [logs, errors, response time sum, response time count]
+        self.newest = None
+        self.cusums = {signal: Cusum() for signal in SIGNALS}
+        self.versions = collections.OrderedDict()
+
+class DeployCorrelator:
+    """Consumes raw docs via add(index, doc); ranked() links change points to deployments."""
+
+    def __init__(self, k=0.5, h=5.0, min_shift=3.0, warmup=5, max_lag=30, lag_scale=15.0, cross_service=0.3,
+                 cross_links=0):
+        self.k = k
+        self.h = h
+        self.min_shift = min_shift
+        self.warmup = warmup
+        self.max_lag = max_lag
+        self.lag_scale = lag_scale
+        self.cross_service = cross_service
+        self.cross_links = cross_links     # other services' deployments linked per change, nearest first (0: none)
+        self.services = {}
+        self.deploys = collections.deque(maxlen=MAX_DEPLOYS)   # {"service.name", "deployment.version", "minute", ...}
+        self.change_points = collections.deque(maxlen=MAX_CHANGE_POINTS)
+        self.docs_seen = 0
+        self._ranked = None
+
+    def add(self, index, doc):
+        if index != LOG_INDEX:
+            return
+        name = doc.get("service.name")
+        ts = _epoch(doc.get("@timestamp"))
+        if name is None or ts is None:
+            return
+        self.docs_seen += 1
+        minute = int(ts // 60)
+        state = self.services.get(name)
+        if state is None:
+            state = self.services[name] = ServiceState()
+        self._track_deploy(name, state, doc, minute)
+
+        if state.newest is None or minute > state.newest:
+            state.newest = minute
+            for open_minute in sorted(m for m in state.buckets if m < minute - LATE_MINUTES):
+                self._close(name, state, open_minute)
+        elif minute < state.newest - LATE_MINUTES and minute not in state.buckets:
+            return                         # later than the reorder allowance: its minute is already scored
+        bucket = state.buckets.get(minute)
+        if bucket is None:
+            bucket = state.buckets[minute] = [0, 0, 0.0, 0]
+        bucket[0] += 1
+        if doc.get("log.level") in ERROR_LEVELS:
+            bucket[1] += 1
+        latency = doc.get("response_time_ms")
+        if isinstance(latency, (int, float)) and not isinstance(latency, bool):
+            bucket[2] += latency
+            bucket[3] += 1
+
+    def _track_deploy(self, name, state, doc, minute):
+        version = doc.get("deployment.version")
+        explicit = doc.get("url.path") == "/deploy" or str(doc.get("message", "")).startswith("Deployment started")
+        if version is None or version in state.versions:
+            return
+        # A version seen first on an ordinary log is a rollout only if the service ran another version before
+        if explicit or state.versions:
+            self._ranked = None
+            self.deploys.append({"service.name": name, "deployment.version": version, "minute": minute,
+                                 "@timestamp": doc.get("@timestamp"),
+                                 "previous_version": next(reversed(state.versions), None)})
+        state.versions[version] = minute
+        if len(state.versions) > MAX_VERSIONS_PER_SERVICE:
+            state.versions.popitem(last=False)
+
+    def _close(self, name, state, minute):
+        logs, errors, latency_sum, latency_count = state.buckets.pop(minute)
+        self._observe(name, state, "error_rate", minute, errors / logs)
+        if latency_count:
+            self._observe(name, state, "response_time_ms", minute, latency_sum / latency_count)
+
+    def _observe(self, name, state, signal, minute, x):
+        cusum = state.cusums[signal]
+        if cusum.n < self.warmup:
+            cusum.learn(x)
+            return
+        sigma = cusum.std(SIGNALS[signal])
+        s = cusum.s + (x - cusum.mean) / sigma - self.k
+        if s <= 0:
+            cusum.s, cusum.run_start, cusum.run_sum, cusum.run_count = 0.0, None, 0.0, 0
+            cusum.learn(x)
+            return
+        cusum.s = s
+        if cusum.run_start is None and (x - cusum.mean) / sigma >= self.min_shift:
+            cusum.run_start = minute
+        if cusum.run_start is not None:
+            cusum.run_sum += x
+            cusum.run_count += 1
+        else:
+            cusum.learn(x)
+        if s > self.h:
+            if cusum.run_start is None:
+                # small steady excess, never a step: drift, not a change point
+                cusum.s = 0.0
+                return
+            after = cusum.run_sum / cusum.run_count
+            if (after - cusum.mean) / sigma < self.min_shift:
+                cusum.restart(cusum.mean)
+                return
+            self._ranked = None
+            self.change_points.append({
+                "service.name": name,
+                "signal": signal,
+                "onset_minute": cusum.run_start,
+                "detected_minute": minute,
+                "before": cusum.mean,
+                "after": after,
+                "shift_sigma": (after - cusum.mean) / sigma,
+            })
+            cusum.restart(after)
+
+    def flush(self):
+        """Score every still-open minute (end of stream)."""
+        for name, state in self.services.items():
+            for minute in sorted(state.buckets):
+                self._close(name, state, minute)
+
+    def ranked(self):
+        """One entry per (deployment, affected service), most confident first; unexplained changes last.
+
+        Deployments are indexed by service and minute, so each change only
+        looks at its own service's rollouts in the lag window, plus (with
+        `cross_links`) the nearest few elsewhere. The result is cached until
+        a new change point or deployment arrives.
+        """
+        if self._ranked is not None:
+            return self._ranked
+        by_service = collections.defaultdict(list)
+        for deploy in sorted(self.deploys, key=lambda d: d["minute"]):
+            by_service[deploy["service.name"]].append(deploy)
+        service_minutes = {name: [d["minute"] for d in deploys] for name, deploys in by_service.items()}
+        everywhere = sorted(self.deploys, key=lambda d: d["minute"]) if self.cross_links else []
+        minutes = [d["minute"] for d in everywhere]
+
+        by_link = {}
+        unexplained = []
+        for cp in self.change_points:
+            strength = 1 - math.exp(-max(cp["shift_sigma"] - self.min_shift, 0.0) / 3)
+            # the onset can land a minute early: minute buckets and log timestamps are jittered
+            low, high = cp["onset_minute"] - self.max_lag, cp["onset_minute"] + 1
+            own = by_service.get(cp["service.name"], [])
+            own_minutes = service_minutes.get(cp["service.name"], [])
+            candidates = [(deploy, 1.0) for deploy in
+                          own[bisect.bisect_left(own_minutes, low):bisect.bisect_right(own_minutes, high)]]
+            if self.cross_links:
+                others = 0
+                i = bisect.bisect_right(minutes, high)
+                while i > 0 and others < self.cross_links and minutes[i - 1] >= low:
+                    i -= 1
+                    if everywhere[i]["service.name"] != cp["service.name"]:
+                        candidates.append((everywhere[i], self.cross_service))
+                        others += 1
+            for deploy, scope in candidates:
+                lag = cp["onset_minute"] - deploy["minute"]
+                confidence = scope * math.exp(-max(lag, 0) / self.lag_scale) * strength
+                key = (deploy["service.name"], deploy["deployment.version"], cp["service.name"])
+                link = by_link.get(key)
+                if link is None:
+                    link = by_link[key] = {
+                        "deployment.version": deploy["deployment.version"],
+                        "deployment.service": deploy["service.name"],
+                        "previous_version": deploy["previous_version"],
+                        "deployed_at": _iso(deploy["minute"]),
+                        "service.name": cp["service.name"],
+                        "changes": [],
+                        "miss": 1.0,
+                    }
+                link["changes"].append({
+                    "signal": cp["signal"],
+                    "change_at": _iso(cp["onset_minute"]),
+                    "detected_at": _iso(cp["detected_minute"]),
+                    "lag_minutes": lag,
+                    "before": round(cp["before"], 3),
+                    "after": round(cp["after"], 3),
+                    "shift_sigma": round(cp["shift_sigma"], 1),
+                    "confidence": round(confidence, 3),
+                })
+                link["miss"] *= 1 - confidence
+            if not candidates:
+                unexplained.append({"deployment.version": None, "service.name": cp["service.name"],
+                                    "changes": [{"signal": cp["signal"], "change_at": _iso(cp["onset_minute"]),
+                                                 "shift_sigma": round(cp["shift_sigma"], 1)}],
+                                    "confidence": 0.0})
+        ranked = []
+        for link in by_link.values():
+            link["confidence"] = round(1 - link.pop("miss"), 3)
+            link["changes"].sort(key=lambda c: c["change_at"])
+            ranked.append(link)
+        ranked.sort(key=lambda r: -r["confidence"])
+        self._ranked = ranked + unexplained
+        return self._ranked
+
+    def summary(self):
+        ranked = self.ranked()
+        if not ranked:
+            return (f"no change points in {self.docs_seen:,} docs "
+                    f"({len(self.services):,} services, {len(self.deploys)} deployments)")
+        top = ranked[0]
+        head = (f"top: {top['deployment.version']} → {top['service.name']} ({top['confidence']:.2f})"
+                if top["deployment.version"] else "none linked to a deployment")
+        return (f"{len(self.change_points)} change points, {len(self.deploys)} deployments across "
+                f"{len(self.services):,} services; {head}")
+
+    def report(self, limit=10):
+        lines = []
+        for r in self.ranked()[:limit]:
+            first = r["changes"][0]
+            shown = {}
+            for c in r["changes"]:
+                shown.setdefault(c["signal"], c)         # first change per signal; later ones are escalation
+            signals = ", ".join(f"{c['signal']} {c['before']:g}→{c['after']:g}" if "before" in c else c["signal"]
+                                for c in shown.values())
+            if r["deployment.version"] is None:
+                lines.append(f"  ❔ {r['service.name']}: change at {first['change_at'][11:16]} ({signals}), "
+                             f"no deployment before it")
+                continue
+            where = ("" if r["deployment.service"] == r["service.name"]
+                     else f" (deployed to {r['deployment.service']})")
+            lines.append(f"  {r['confidence']:.2f}  deploy {r['deployment.version']}{where} at "
+                         f"{r['deployed_at'][11:16]} → {r['service.name']} changed at {first['change_at'][11:16]} "
+                         f"({first['lag_minutes']:+d}m): {signals}")
+        return "\n".join(lines) if lines else "  no change points"
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _iso(minute):
+    return datetime.fromtimestamp(minute * 60, timezone.utc).isoformat()
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI deployment change-point correlator")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="Generator output directory (default: generated-data)")
+    parser.add_argument("--k", type=float, default=0.5,
+                        help="CUSUM slack in standard deviations (default: 0.5)")
+    parser.add_argument("--h", type=float, default=5.0,
+                        help="CUSUM alarm threshold (default: 5)")
+    parser.add_argument("--min-shift", type=float, default=3.0,
+                        help="Smallest change worth reporting, in baseline standard deviations (default: 3)")
+    parser.add_argument("--warmup", type=int, default=5,
+                        help="Minutes per service and signal before scoring starts (default: 5)")
+    parser.add_argument("--max-lag", type=int, default=30,
+                        help="Latest a change may start after a deployment, in minutes (default: 30)")
+    parser.add_argument("--cross-service", type=int, default=0, metavar="N",
+                        help="Also link each change to the N nearest deployments of other services "
+                             "(downstream cascades; default: 0 = same service only)")
+    parser.add_argument("--json", action="store_true",
+                        help="Print the ranked list as JSON")
+    args = parser.parse_args()
+
+    correlator = DeployCorrelator(k=args.k, h=args.h, min_shift=args.min_shift, warmup=args.warmup,
+                                  max_lag=args.max_lag, cross_links=args.cross_service)
+    start = time.time()
+    for doc in iter_docs(args.data_dir, "logs"):
+        correlator.add(LOG_INDEX, doc)
+    correlator.flush()
+    elapsed = time.time() - start
+    if args.json:
+        print(json.dumps(correlator.ranked(), indent=2))
+        return
+    print(correlator.report())
+    rate = correlator.docs_seen / elapsed if elapsed > 0 else 0
+    print(f"🚀 {correlator.summary()} — {rate:,.0f} docs/s")
+
+if __name__ == "__main__":
+    main()
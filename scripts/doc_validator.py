@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Mapping-Driven Document Validator
+Checks documents against elastic/index-mappings/*.json before they are sent,
+so docs that would bounce as per-item `_bulk` failures (mapper_parsing_exception,
+illegal_argument_exception) are caught locally instead of after a round trip.
+
+Each mapping is compiled once into a flat table of per-field checkers keyed
+by dotted path; documents may use dotted keys ("host.ip") or nested objects
+({"host": {"ip": ...}}). Streams repeat a handful of document shapes, so each
+(key layout, value types) combination is compiled again into the short list
+of checks its values still need (dates, IPs, ranges); fields whose type
+alone settles it cost nothing. Checkers follow what Elasticsearch accepts:
+  keyword/text    strings, numbers and booleans (no objects)
+  date            strict_date_optional_time strings or epoch_millis numbers
+  ip              IPv4/IPv6 strings
+  integer/long/…  numbers in range, or numeric strings (ES coerces them)
+  float/double/…  finite numbers, or numeric strings
+  boolean         true/false (or "true"/"false")
+  geo_point       {"lat", "lon"} (numbers or numeric strings), "lat,lon", [lon, lat],
+                  geohash or WKT POINT
+Arrays are checked element by element. Unmapped fields follow the
+mapping's `dynamic` setting: "strict" rejects them, "false" ignores them,
+and the default learns each new field's type from its first value the way
+dynamic mapping does, flagging later values that would conflict with it.
+
+In repair mode, fixable values are normalised (booleans in numeric fields →
+0/1, "2026-01-01 10:00:00" → ISO-8601, " 10.0.0.1:443" → "10.0.0.1", …) and
+unfixable fields are dropped, as `ignore_malformed` would. A document is
+only rejected if its @timestamp cannot be repaired.
+
+Used inline by `ingest_to_elastic.py --validate reject|repair`, or over files:
+  python3 scripts/doc_validator.py                      # check generated-data/*_bulk.ndjson
+  python3 scripts/doc_validator.py --repair             # what repair mode would fix or drop
+  python3 scripts/doc_validator.py --bench              # docs/s on the generated files
+"""
+
+import os, re, sys, json, math, time, argparse, ipaddress
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+MAPPINGS_DIR = os.path.join(BASE_DIR, "elastic", "index-mappings")
+
+_MISSING = object()
+REQUIRED_FIELD = "@timestamp"     # a doc whose timestamp can't be repaired is rejected, not trimmed
+IP_CACHE_SIZE = 65536
+MAX_PLANS = 4096
+
+INT_RANGES = {
+    "byte": (-(1 << 7), (1 << 7) - 1),
+    "short": (-(1 << 15), (1 << 15) - 1),
+    "integer": (-(1 << 31), (1 << 31) - 1),
+    "long": (-(1 << 63), (1 << 63) - 1),
+    "unsigned_long": (0, (1 << 64) - 1),
+}
+FLOAT_TYPES = {"float", "double", "half_float", "scaled_float"}
+STRING_TYPES = {"keyword", "text", "semantic_text", "match_only_text", "wildcard", "constant_keyword"}
+
+# strict_date_optional_time: yyyy[-MM[-dd['T'HH[:mm[:ss[.S…]]][zone]]]]
+ISO_DATE = re.compile(r"\d{4}(-\d{2}(-\d{2}(T\d{2}(:\d{2}(:\d{2}([.,]\d{1,9})?)?)?(Z|[+-]\d{2}(:?\d{2})?)?)?)?)?")
+GEOHASH = re.compile(r"[0-9b-hjkmnp-z]{1,12}")
+WKT_POINT = re.compile(r"POINT\s*\(\s*(\S+)\s+(\S+)\s*\)", re.IGNORECASE)
+TRUTHY = {"true": True, "false": False, "1": True, "0": False, "yes": True, "no": False, "": False}
+
+class Invalid(ValueError):
+    """A value Elasticsearch would refuse for its field; `repaired` is set when repair is possible."""
+
+    def __init__(self, reason, repaired=None, fixable=False):
+        super().__init__(reason)
+        self.repaired = repaired
+        self.fixable = fixable
+
+def _describe(value):
+    text = repr(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+# ------------------------------------------------------------
+# Per-type checkers: return None when the value is fine as is,
+# raise Invalid (with a repair if there is one) otherwise.
+# ------------------------------------------------------------
+
+def check_string(value):
+    kind = type(value)
+    if kind is str or kind is int or kind is float or kind is bool:
+        return None
+    raise Invalid(f"expected a string, got {type(value).__name__}")
+check_string.type_only = frozenset({str, int, float, bool})
+
+def _parse_date(value):
+    """Best-effort repair of a date string to ISO-8601, or None."""
+    text = value.strip().replace(" ", "T", 1)
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(text).isoformat()
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return int(number) if math.isfinite(number) else None
+
+def check_date(value):
+    kind = type(value)
+    if kind is str:
+        if value[10:11] == "T" and value[4:5] == value[7:8] == "-":
+            # the usual full timestamp: fromisoformat alone settles it (microseconds at most, else the regex path)
+            try:
+                datetime.fromisoformat(value)
+                return None
+            except ValueError:
+                pass
+        if ISO_DATE.fullmatch(value):
+            try:
+                # also rejects 2026-13-45; fromisoformat handles every shape the regex admits except bare years/months
+                if len(value) > 7:
+                    datetime.fromisoformat(value if value[-1] != "Z" else value[:-1] + "+00:00")
+                return None
+            except ValueError:
+                pass
+        repaired = _parse_date(value)
+        raise Invalid(f"not a strict_date_optional_time date: {_describe(value)}", repaired, repaired is not None)
+    if kind is int:
+        return None
+    if kind is float and math.isfinite(value):
+        return None
+    raise Invalid(f"not a date: {_describe(value)}")
+check_date.type_only = frozenset({int})
+
+class IPChecker:
+    """IPv4/IPv6 check with a cache of recently seen valid addresses (host.ip repeats a lot)."""
+    type_only = frozenset()
+
+    def __init__(self):
+        self.seen = set()
+
+    def __call__(self, value):
+        if type(value) is str:
+            if value in self.seen:
+                return None
+            try:
+                ipaddress.ip_address(value)
+            except ValueError:
+                raise Invalid(f"not an IP address: {_describe(value)}", *self._repair(value)) from None
+            if len(self.seen) >= IP_CACHE_SIZE:
+                self.seen.clear()
+            self.seen.add(value)
+            return None
+        raise Invalid(f"not an IP address: {_describe(value)}")
+
+    @staticmethod
+    def _repair(value):
+        text = value.strip()
+        if text.count(":") == 1:                       # IPv4 with a port
+            text = text.split(":", 1)[0]
+        elif text.startswith("[") and "]" in text:     # [IPv6]:port
+            text = text[1:text.index("]")]
+        try:
+            return str(ipaddress.ip_address(text)), True
+        except ValueError:
+            pass
+        try:                                           # leading zeros: 010.000.001.010
+            parts = [int(p) for p in text.split(".")]
+            if len(parts) == 4 and all(0 <= p <= 255 for p in parts):
+                return ".".join(map(str, parts)), True
+        except ValueError:
+            pass
+        return None, False
+
+def integer_checker(es_type):
+    low, high = INT_RANGES[es_type]
+
+    def check(value):
+        kind = type(value)
+        if kind is int:
+            if low <= value <= high:
+                return None
+            raise Invalid(f"out of range for {es_type}: {value}")
+        if kind is float:
+            if math.isfinite(value) and low <= value <= high:
+                return None          # ES truncates (coerce)
+            raise Invalid(f"not a finite {es_type}: {value}")
+        if kind is str:
+            try:
+                number = float(value.strip())
+            except ValueError:
+                raise Invalid(f"not a number: {_describe(value)}") from None
+            if math.isfinite(number) and low <= number <= high:
+                return None
+            raise Invalid(f"out of range for {es_type}: {_describe(value)}")
+        if kind is bool:
+            raise Invalid(f"boolean in a numeric ({es_type}) field", int(value), True)
+        raise Invalid(f"expected a number, got {type(value).__name__}")
+    check.type_only = frozenset()
+    return check
+
+def check_float(value):
+    kind = type(value)
+    if kind is float:
+        if math.isfinite(value):
+            return None
+        raise Invalid(f"non-finite number: {value}")
+    if kind is int:
+        return None
+    if kind is str:
+        try:
+            number = float(value.strip())
+        except ValueError:
+            raise Invalid(f"not a number: {_describe(value)}") from None
+        if math.isfinite(number):
+            return None
+        raise Invalid(f"non-finite number: {_describe(value)}")
+    if kind is bool:
+        raise Invalid("boolean in a numeric field", float(value), True)
+    raise Invalid(f"expected a number, got {type(value).__name__}")
+check_float.type_only = frozenset({int})
+
+def check_boolean(value):
+    kind = type(value)
+    if kind is bool:
+        return None
+    if kind is str:
+        if value in ("true", "false", ""):
+            return None
+        repaired = TRUTHY.get(value.strip().lower())
+        raise Invalid(f"not a boolean: {_describe(value)}", repaired, repaired is not None)
+    if kind is int and value in (0, 1):
+        raise Invalid(f"not a boolean: {value}", bool(value), True)
+    raise Invalid(f"not a boolean: {_describe(value)}")
+check_boolean.type_only = frozenset({bool})
+
+def _lat_lon_ok(lat, lon):
+    return (type(lat) in (int, float) and type(lon) in (int, float)
+            and -90 <= lat <= 90 and -180 <= lon <= 180)
+
+def _coordinate(value):
+    """A lat/lon as ES reads it: numeric strings are parsed, anything else is left as is."""
+    if type(value) is str:
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return value
+
+def check_geo_point(value):
+    kind = type(value)
+    if kind is dict:
+        lat, lon = value.get("lat"), value.get("lon")
+        if len(value) == 2 and _lat_lon_ok(_coordinate(lat), _coordinate(lon)):
+            return None             # ES parses numeric strings in the object form
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            raise Invalid(f"not a geo_point: {_describe(value)}") from None
+        if _lat_lon_ok(lat, lon):
+            raise Invalid(f"geo_point needs numeric lat/lon: {_describe(value)}", {"lat": lat, "lon": lon}, True)
+        raise Invalid(f"geo_point out of range: {_describe(value)}")
+    if kind is list:
+        if len(value) in (2, 3) and _lat_lon_ok(value[1], value[0]):
+            return None
+        raise Invalid(f"not a [lon, lat] geo_point: {_describe(value)}")
+    if kind is str:
+        parts = value.split(",")
+        if len(parts) == 2:
+            try:
+                lat, lon = float(parts[0]), float(parts[1])
+            except ValueError:
+                lat = lon = None
+            if lat is not None and _lat_lon_ok(lat, lon):
+                return None
+        elif GEOHASH.fullmatch(value):
+            return None
+        else:
+            point = WKT_POINT.fullmatch(value.strip())
+            if point:
+                try:
+                    lon, lat = float(point.group(1)), float(point.group(2))
+                except ValueError:
+                    lon = lat = None
+                if lat is not None and _lat_lon_ok(lat, lon):
+                    return None
+        raise Invalid(f"not a geo_point: {_describe(value)}")
+    raise Invalid(f"not a geo_point: {_describe(value)}")
+check_geo_point.type_only = frozenset()
+
+def checker_for(es_type):
+    if es_type in STRING_TYPES:
+        return check_string
+    if es_type == "date" or es_type == "date_nanos":
+        return check_date
+    if es_type == "ip":
+        return IPChecker()
+    if es_type in INT_RANGES:
+        return integer_checker(es_type)
+    if es_type in FLOAT_TYPES:
+        return check_float
+    if es_type == "boolean":
+        return check_boolean
+    if es_type == "geo_point":
+        return check_geo_point
+    return None        # types we don't model (flattened, dense_vector, ...) are passed through
+
+# ------------------------------------------------------------
+# Dynamic mapping: learn each unmapped field's type from its first value
+# ------------------------------------------------------------
+
+def dynamic_kind(value):
+    kind = type(value)
+    if kind is str:
+        return "date" if len(value) >= 10 and ISO_DATE.fullmatch(value) else "string"
+    if kind is bool:
+        return "boolean"
+    if kind is int or kind is float:
+        return "number"
+    if kind is dict:
+        return "object"
+    if kind is list:
+        return dynamic_kind(value[0]) if value else None
+    return None
+
+DYNAMIC_CHECKERS = {
+    "string": check_string,
+    "date": check_date,
+    "number": check_float,
+    "boolean": check_boolean,
+}
+
+# ------------------------------------------------------------
+# Compiled per-index validator
+# ------------------------------------------------------------
+
+def flatten_properties(properties, prefix=""):
+    """{dotted path: field mapping} for every leaf, plus the set of object paths."""
+    fields, objects = {}, set()
+    for name, spec in properties.items():
+        path = prefix + name
+        parts = path.split(".")
+        objects.update(".".join(parts[:i]) for i in range(1, len(parts)))
+        if "properties" in spec and spec.get("type", "object") in ("object", "nested"):
+            objects.add(path)
+            sub_fields, sub_objects = flatten_properties(spec["properties"], path + ".")
+            fields.update(sub_fields)
+            objects.update(sub_objects)
+        else:
+            fields[path] = spec
+    return fields, objects
+
+class IndexValidator:
+    """Validates (and optionally repairs) documents for one index's mapping."""
+
+    def __init__(self, index, mapping):
+        self.index = index
+        mappings = mapping.get("mappings", mapping)
+        self.dynamic = str(mappings.get("dynamic", "true")).lower()
+        fields, self.objects = flatten_properties(mappings.get("properties", {}))
+        self.checkers = {path: checker_for(spec.get("type", "object")) for path, spec in fields.items()}
+        self.learned = {}          # unmapped path → kind, as dynamic mapping would have fixed it
+        self._plans = {}           # (keys, value types) → [(key, checker)] still needed, or None: use _walk
+        self.stats = {"checked": 0, "valid": 0, "repaired": 0, "rejected": 0, "fields_dropped": 0}
+
+    def problems(self, doc):
+        """(path, reason) for everything Elasticsearch would refuse; empty when the doc is fine."""
+        found = []
+        self._walk(doc, "", found, False)
+        return [(path, reason) for path, reason, _ in found]
+
+    def validate(self, doc, repair=False):
+        """Return (doc, problems). doc is unchanged, repaired in place, or None when it must be rejected.
+
+        problems lists (path, reason, repaired) for every field that was
+        repaired, dropped (repair mode) or refused.
+        """
+        self.stats["checked"] += 1
+        shape = (tuple(doc), tuple(map(type, doc.values())))
+        plan = self._plans.get(shape, _MISSING)
+        if plan is _MISSING:
+            if len(self._plans) >= MAX_PLANS:
+                self._plans.clear()
+            plan = self._plans[shape] = self._plan(shape)
+        if plan is not None:
+            finite, checks = plan
+            try:
+                # one C-level sum covers every float field: nan/inf anywhere makes it non-finite
+                if finite and not math.isfinite(sum(map(doc.__getitem__, finite))):
+                    raise Invalid("non-finite number")
+                for key, check in checks:
+                    check(doc[key])
+                self.stats["valid"] += 1
+                return doc, []
+            except Invalid:
+                pass
+        found = []
+        self._walk(doc, "", found, repair)
+        if not found:
+            self.stats["valid"] += 1
+            return doc, found
+        if repair:
+            dropped = [path for path, _, fixed in found if not fixed]
+            if REQUIRED_FIELD not in dropped:
+                self.stats["repaired"] += 1
+                self.stats["fields_dropped"] += len(dropped)
+                return doc, found
+        self.stats["rejected"] += 1
+        return None, found
+
+    def _plan(self, shape):
+        """(float keys to check for finiteness, [(key, checker)]) a doc of this shape still needs, or None for _walk."""
+        finite, plan = [], []
+        for key, kind in zip(*shape):
+            check = self.checkers.get(key, _MISSING)
+            if check is _MISSING:
+                return None            # nested object, unmapped field or conflict: take the full walk
+            if check is None or kind in check.type_only:
+                continue
+            if kind is list:
+                return None
+            if kind is float and (check is check_float or check is check_date):
+                finite.append(key)
+            else:
+                plan.append((key, check))
+        return tuple(finite), plan
+
+    def _walk(self, obj, prefix, found, repair):
+        checkers = self.checkers
+        drop = None
+        for key, value in obj.items():
+            path = prefix + key if prefix else key
+            check = checkers.get(path, _MISSING)
+            if check is _MISSING:
+                if path in self.objects:
+                    if type(value) is dict:
+                        self._walk(value, path + ".", found, repair)
+                        continue
+                    reason = f"object field given a {type(value).__name__}"
+                else:
+                    reason = self._unmapped(path, value, found, repair)
+                    if reason is None:
+                        continue
+                found.append((path, reason, False))
+                drop = (drop or []) + [key]
+                continue
+            if check is None:
+                continue
+            try:
+                if type(value) is list and check is not check_geo_point:
+                    for i, element in enumerate(value):
+                        try:
+                            check(element)
+                        except Invalid as e:
+                            if not (repair and e.fixable):
+                                raise
+                            value[i] = e.repaired
+                            found.append((path, str(e), True))
+                else:
+                    check(value)
+            except Invalid as e:
+                if repair and e.fixable:
+                    obj[key] = e.repaired
+                    found.append((path, str(e), True))
+                else:
+                    found.append((path, str(e), False))
+                    drop = (drop or []) + [key]
+        if repair and drop:
+            for key in drop:
+                del obj[key]
+
+    def _unmapped(self, path, value, found, repair):
+        """Why an unmapped field would be refused, or None. Under dynamic mapping the first value fixes the type."""
+        if self.dynamic == "strict":
+            return "unmapped field (dynamic: strict)"
+        if self.dynamic in ("false", "runtime"):
+            return None
+        kind = dynamic_kind(value)
+        if kind == "object":
+            self.learned[path] = kind
+            self.objects.add(path)
+            self._walk(value, path + ".", found, repair)
+        elif kind is not None:
+            # later values are checked against the learned type, as a dynamically mapped field would be
+            self.learned[path] = kind
+            self.checkers[path] = DYNAMIC_CHECKERS[kind]
+            self._plans.clear()
+        return None
+
+def load_validators(index_mappings, mappings_dir=MAPPINGS_DIR):
+    """{index: IndexValidator} for every index with a mapping file (index → file name or None)."""
+    validators = {}
+    for index, mapping_file in index_mappings.items():
+        if mapping_file is None:
+            continue
+        with open(os.path.join(mappings_dir, mapping_file)) as f:
+            validators[index] = IndexValidator(index, json.load(f))
+    return validators
+
+def main():
+    sys.path.insert(0, os.path.join(BASE_DIR, "data"))
+    import fast_json
+    from ingest_to_elastic import INDEX_MAPPINGS
+
+    parser = argparse.ArgumentParser(description="Validate generated bulk files against the index mappings")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Generator output directory (default: generated-data)")
+    parser.add_argument("--repair", action="store_true", help="Count what repair mode would fix or drop")
+    parser.add_argument("--bench", action="store_true", help="Report validation throughput on parsed docs")
+    parser.add_argument("--show", type=int, default=5, help="Print up to this many problems per index (default: 5)")
+    args = parser.parse_args()
+
+    files = {
+        "opsguard-incidents": "logs_bulk.ndjson",
+        "opsguard-metrics": "metrics_bulk.ndjson",
+        "opsguard-business": "business_metrics_bulk.ndjson",
+        "opsguard-history": "incidents_history_bulk.ndjson",
+    }
+    validators = load_validators(INDEX_MAPPINGS)
+    for index, filename in files.items():
+        path = os.path.join(args.data_dir, filename)
+        if not os.path.exists(path):
+            print(f"  ⚠️  {filename} not found, skipping")
+            continue
+        with open(path, 'rb') as f:
+            docs = [fast_json.loads(line) for i, line in enumerate(f) if i % 2]
+        validator = validators[index]
+        shown = 0
+        start = time.perf_counter()
+        for doc in docs:
+            _, found = validator.validate(doc, repair=args.repair)
+            for path, reason, fixed in found:
+                if shown < args.show:
+                    print(f"    {index}: {path}: {reason}{' (repaired)' if fixed else ''}")
+                    shown += 1
+        elapsed = time.perf_counter() - start
+        st = validator.stats
+        line = (f"  {'✅' if not st['rejected'] and st['valid'] == st['checked'] else '⚠️ '} {index}: "
+                f"{st['checked']:,} docs, {st['valid']:,} valid, {st['repaired']:,} repaired, {st['rejected']:,} rejected")
+        if args.bench:
+            line += f"  ({len(docs) / elapsed:,.0f} docs/s)"
+        print(line)
+        if validator.learned:
+            print(f"     unmapped fields (dynamic): {', '.join(sorted(validator.learned))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1248 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Offline ES|QL Engine
+Runs the ES|QL tool definitions in elastic/tools/*.esql against the
+generator's NDJSON output, with no cluster required.
+
+Supported subset (what the tools use):
+  FROM, WHERE, STATS ... BY, EVAL, SORT, LIMIT, KEEP, DROP
+  AND / OR / NOT, == != < <= > >=, IN (...), IS [NOT] NULL, + - * / %
+  NOW(), ROUND(), CASE(), ABS(), TO_LOWER(), TO_UPPER(), `1 hour`-style durations
+  COUNT, COUNT_DISTINCT, SUM, AVG, MIN, MAX, MEDIAN, PERCENTILE
+  ?param placeholders
+
+Rows are streamed from disk straight into a hash aggregation, so memory is
+bounded by the number of groups. Literal equality filters are checked on
+the raw line before it is parsed, and --workers splits plain NDJSON files
+into byte ranges aggregated in parallel and merged afterwards. With
+--columnar, rows come from the generator's mmapped columnar stores and only
+the columns the query references are read.
+
+Usage:
+  python3 scripts/esql_engine.py elastic/tools/detect-anomalies.esql --data-dir generated-data
+  python3 scripts/esql_engine.py elastic/tools/correlate-logs.esql --param service_name=payment-service
+  python3 scripts/esql_engine.py --query 'FROM opsguard-metrics | STATS n = COUNT(*) BY service.name'
+  python3 scripts/esql_engine.py elastic/tools/detect-anomalies.esql --columnar
+"""
+
+import os, re, sys, json, gzip, math, heapq, argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+sys.path.insert(0, os.path.join(BASE_DIR, "data"))
+from columnar_store import ColumnarTable  # noqa: E402
+
+# Index name → generator output file stem (plain NDJSON preferred, bulk format as fallback)
+INDEX_FILES = {
+    "opsguard-incidents": "logs",
+    "opsguard-metrics": "metrics",
+    "opsguard-business": "business_metrics",
+    "opsguard-history": "incidents_history",
+    "opsguard-rollup-1m": "rollup_1m",
+    "opsguard-log-templates-1m": "log_templates_1m",
+}
+
+DEFAULT_LIMIT = 1000
+
+class ESQLError(Exception):
+    """Raised for queries outside the supported subset or malformed input."""
+
+# ============================================================
+# Tokenizer
+# ============================================================
+
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|//[^\n]*|--[^\n]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<param>\?[A-Za-z_]\w*)
+  | (?P<quoted>`[^`]+`)
+  | (?P<ident>[@A-Za-z_][\w.@]*)
+  | (?P<op>==|!=|<=|>=|[<>+\-*/%(),=|])
+""", re.X)
+
+KEYWORDS = {"AND", "OR", "NOT", "IN", "IS", "NULL", "TRUE", "FALSE", "ASC", "DESC", "NULLS", "FIRST", "LAST", "BY"}
+
+DURATION_UNITS = {
+    "millisecond": timedelta(milliseconds=1), "milliseconds": timedelta(milliseconds=1), "ms": timedelta(milliseconds=1),
+    "second": timedelta(seconds=1), "seconds": timedelta(seconds=1),
+    "minute": timedelta(minutes=1), "minutes": timedelta(minutes=1),
+    "hour": timedelta(hours=1), "hours": timedelta(hours=1),
+    "day": timedelta(days=1), "days": timedelta(days=1),
+    "week": timedelta(weeks=1), "weeks": timedelta(weeks=1),
+}
+
+class Token:
+    __slots__ = ("kind", "value", "pos")
+
+    def __init__(self, kind, value, pos):
+        self.kind = kind
+        self.value = value
+        self.pos = pos
+
+    def is_kw(self, *words):
+        return self.kind == "ident" and self.value.upper() in words
+
+    def __repr__(self):
+        return f"{self.kind}:{self.value}"
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            raise ESQLError(f"Unexpected character {text[pos]!r} at offset {pos}")
+        kind = m.lastgroup
+        if kind != "ws":
+            value = m.group(kind)
+            if kind == "string":
+                value = json.loads(value)
+            elif kind == "quoted":
+                kind, value = "ident", value[1:-1]
+            elif kind == "param":
+                value = value[1:]
+            tokens.append(Token(kind, value, pos))
+        pos = m.end()
+    return tokens
+
+def split_commands(tokens):
+    """Split a token list on top-level pipes."""
+    commands, current, depth = [], [], 0
+    for tok in tokens:
+        if tok.kind == "op" and tok.value == "(":
+            depth += 1
+        elif tok.kind == "op" and tok.value == ")":
+            depth -= 1
+        if tok.kind == "op" and tok.value == "|" and depth == 0:
+            commands.append(current)
+            current = []
+        else:
+            current.append(tok)
+    commands.append(current)
+    return [c for c in commands if c]
+
+# ============================================================
+# Expressions
+# ============================================================
+
+class Expr:
+    """AST node. `compile()` returns a closure row -> value; constants are folded."""
+    const = False
+
+    def compile(self):
+        raise NotImplementedError
+
+    def refs(self):
+        return set()
+
+class Literal(Expr):
+    const = True
+
+    def __init__(self, value):
+        self.value = value
+
+    def compile(self):
+        value = self.value
+        return lambda row: value
+
+class Field(Expr):
+    def __init__(self, name):
+        self.name = name
+
+    def refs(self):
+        return {self.name}
+
+    def compile(self):
+        name = self.name
+        parts = name.split(".")
+        if len(parts) == 1:
+            return lambda row: row.get(name)
+
+        def get(row):
+            value = row.get(name)
+            if value is None and name not in row:
+                # Fall back to nested objects ({"service": {"name": ...}})
+                value = row
+                for part in parts:
+                    if not isinstance(value, dict):
+                        return None
+                    value = value.get(part)
+            return value
+        return get
+
+class Param(Expr):
+    def __init__(self, name):
+        self.name = name
+
+def to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            dt = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    return None
+
+def _div(a, b):
+    if b == 0:
+        return None
+    if isinstance(a, int) and isinstance(b, int) and not isinstance(a, bool):
+        q = abs(a) // abs(b)
+        return q if (a >= 0) == (b >= 0) else -q
+    return a / b
+
+def _mod(a, b):
+    if b == 0:
+        return None
+    return math.fmod(a, b) if isinstance(a, float) or isinstance(b, float) else int(math.fmod(a, b))
+
+BINARY_OPS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": _div,
+    "%": _mod,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+COMPARISONS = {"==", "!=", "<", "<=", ">", ">="}
+
+class Binary(Expr):
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.const = left.const and right.const
+
+    def refs(self):
+        return self.left.refs() | self.right.refs()
+
+    def compile(self):
+        fn = BINARY_OPS[self.op]
+        left, right = self.left.compile(), self.right.compile()
+        if self.op in COMPARISONS:
+            # Compare date strings against date constants as datetimes
+            if self.right.const and isinstance(right(None), datetime):
+                raw_left = left
+                left = lambda row: to_datetime(raw_left(row))
+            elif self.left.const and isinstance(left(None), datetime):
+                raw_right = right
+                right = lambda row: to_datetime(raw_right(row))
+        if self.right.const:
+            b = right(None)
+            if b is None:
+                return lambda row: None
+
+            def apply_const(row):
+                a = left(row)
+                if a is None:
+                    return None
+                try:
+                    return fn(a, b)
+                except TypeError:
+                    return None
+            return apply_const
+
+        def apply(row):
+            a = left(row)
+            if a is None:
+                return None
+            b = right(row)
+            if b is None:
+                return None
+            try:
+                return fn(a, b)
+            except TypeError:
+                return None
+        return apply
+
+class Logical(Expr):
+    """AND / OR with SQL three-valued logic."""
+
+    def __init__(self, op, operands):
+        self.op = op
+        self.operands = operands
+        self.const = all(o.const for o in operands)
+
+    def refs(self):
+        return set().union(*(o.refs() for o in self.operands))
+
+    def compile(self):
+        fns = [o.compile() for o in self.operands]
+        if self.op == "AND":
+            def and_(row):
+                result = True
+                for fn in fns:
+                    v = fn(row)
+                    if v is False:
+                        return False
+                    if v is None:
+                        result = None
+                return result
+            return and_
+
+        def or_(row):
+            result = False
+            for fn in fns:
+                v = fn(row)
+                if v is True:
+                    return True
+                if v is None:
+                    result = None
+            return result
+        return or_
+
+class Not(Expr):
+    def __init__(self, operand):
+        self.operand = operand
+        self.const = operand.const
+
+    def refs(self):
+        return self.operand.refs()
+
+    def compile(self):
+        fn = self.operand.compile()
+
+        def not_(row):
+            v = fn(row)
+            return None if v is None else not v
+        return not_
+
+class Negate(Expr):
+    def __init__(self, operand):
+        self.operand = operand
+        self.const = operand.const
+
+    def refs(self):
+        return self.operand.refs()
+
+    def compile(self):
+        fn = self.operand.compile()
+
+        def neg(row):
+            v = fn(row)
+            return None if v is None else -v
+        return neg
+
+class InList(Expr):
+    def __init__(self, operand, options, negated=False):
+        self.operand = operand
+        self.options = options
+        self.negated = negated
+        self.const = operand.const and all(o.const for o in options)
+
+    def refs(self):
+        return self.operand.refs().union(*(o.refs() for o in self.options))
+
+    def compile(self):
+        fn = self.operand.compile()
+        negated = self.negated
+        if all(o.const for o in self.options):
+            values = frozenset(o.compile()(None) for o in self.options)
+
+            def in_const(row):
+                v = fn(row)
+                return None if v is None else (v in values) != negated
+            return in_const
+        opts = [o.compile() for o in self.options]
+
+        def in_(row):
+            v = fn(row)
+            return None if v is None else (v in {o(row) for o in opts}) != negated
+        return in_
+
+class IsNull(Expr):
+    def __init__(self, operand, negated=False):
+        self.operand = operand
+        self.negated = negated
+        self.const = operand.const
+
+    def refs(self):
+        return self.operand.refs()
+
+    def compile(self):
+        fn = self.operand.compile()
+        if self.negated:
+            return lambda row: fn(row) is not None
+        return lambda row: fn(row) is None
+
+def _case(*args):
+    raise AssertionError("CASE is compiled specially")
+
+def _round(value, digits=0):
+    if value is None or digits is None:
+        return None
+    if isinstance(value, int) and digits >= 0:
+        return value
+    result = round(value, int(digits))
+    return result if digits > 0 else int(result)
+
+SCALAR_FUNCTIONS = {
+    "ROUND": _round,
+    "ABS": abs,
+    "TO_LOWER": str.lower,
+    "TO_UPPER": str.upper,
+    "LENGTH": len,
+    "TO_DATETIME": to_datetime,
+    "TO_STRING": str,
+    "TO_DOUBLE": float,
+    "TO_INTEGER": int,
+    "TO_LONG": int,
+    "COALESCE": None,
+    "NOW": None,
+    "CASE": None,
+}
+
+AGGREGATE_FUNCTIONS = {"COUNT", "COUNT_DISTINCT", "SUM", "AVG", "MIN", "MAX", "MEDIAN", "PERCENTILE"}
+
+class Call(Expr):
+    def __init__(self, name, args, now):
+        self.name = name
+        self.args = args
+        self.now = now
+        if name in AGGREGATE_FUNCTIONS:
+            raise ESQLError(f"{name}() is only allowed as a top-level STATS aggregation")
+        if name not in SCALAR_FUNCTIONS:
+            raise ESQLError(f"Unsupported function {name}()")
+        self.const = name == "NOW" or all(a.const for a in args)
+
+    def refs(self):
+        return set().union(set(), *(a.refs() for a in self.args))
+
+    def compile(self):
+        if self.name == "NOW":
+            now = self.now
+            return lambda row: now
+        fns = [a.compile() for a in self.args]
+        if self.name == "CASE":
+            pairs = [(fns[i], fns[i + 1]) for i in range(0, len(fns) - 1, 2)]
+            default = fns[-1] if len(fns) % 2 == 1 else (lambda row: None)
+
+            def case(row):
+                for cond, value in pairs:
+                    if cond(row) is True:
+                        return value(row)
+                return default(row)
+            fn = case
+        elif self.name == "COALESCE":
+            def coalesce(row):
+                for f in fns:
+                    v = f(row)
+                    if v is not None:
+                        return v
+                return None
+            fn = coalesce
+        else:
+            impl = SCALAR_FUNCTIONS[self.name]
+
+            def call(row):
+                args = [f(row) for f in fns]
+                if args and args[0] is None:
+                    return None
+                try:
+                    return impl(*args)
+                except (TypeError, ValueError):
+                    return None
+            fn = call
+        if self.const:
+            value = fn(None)
+            return lambda row: value
+        return fn
+
+# ============================================================
+# Parser
+# ============================================================
+
+PRECEDENCE = {"OR": 1, "AND": 2, "==": 4, "!=": 4, "<": 4, "<=": 4, ">": 4, ">=": 4,
+              "IN": 4, "IS": 4, "NOT": 4, "+": 5, "-": 5, "*": 6, "/": 6, "%": 6}
+
+class ExprParser:
+    """Pratt parser over one command's tokens."""
+
+    def __init__(self, tokens, params, now, source):
+        self.tokens = tokens
+        self.pos = 0
+        self.params = params
+        self.now = now
+        self.source = source
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def next(self):
+        tok = self.peek()
+        if tok is None:
+            raise ESQLError("Unexpected end of query")
+        self.pos += 1
+        return tok
+
+    def expect_op(self, value):
+        tok = self.next()
+        if tok.kind != "op" or tok.value != value:
+            raise ESQLError(f"Expected {value!r} at offset {tok.pos}, got {tok.value!r}")
+
+    def at_op(self, value):
+        tok = self.peek()
+        return tok is not None and tok.kind == "op" and tok.value == value
+
+    def at_end(self):
+        return self.pos >= len(self.tokens)
+
+    def text_between(self, start_pos, end_pos):
+        start = self.tokens[start_pos].pos
+        end = self.tokens[end_pos - 1].pos + len(str(self.tokens[end_pos - 1].value))
+        return " ".join(self.source[start:end].split())
+
+    def _binary_op(self, tok):
+        if tok is None:
+            return None
+        if tok.kind == "op" and tok.value in PRECEDENCE:
+            return tok.value
+        if tok.kind == "ident" and tok.value.upper() in ("AND", "OR", "IN", "IS", "NOT"):
+            return tok.value.upper()
+        return None
+
+    def expression(self, min_prec=0):
+        left = self.prefix()
+        while True:
+            op = self._binary_op(self.peek())
+            if op is None or PRECEDENCE[op] <= min_prec:
+                return left
+            self.next()
+            if op == "IS":
+                negated = False
+                if self.peek() is not None and self.peek().is_kw("NOT"):
+                    self.next()
+                    negated = True
+                if not self.next().is_kw("NULL"):
+                    raise ESQLError("Expected NULL after IS")
+                left = IsNull(left, negated)
+            elif op == "NOT":
+                if not self.next().is_kw("IN"):
+                    raise ESQLError("Expected IN after NOT")
+                left = InList(left, self._list(), negated=True)
+            elif op == "IN":
+                left = InList(left, self._list())
+            elif op in ("AND", "OR"):
+                right = self.expression(PRECEDENCE[op])
+                operands = (left.operands if isinstance(left, Logical) and left.op == op else [left])
+                left = Logical(op, operands + [right])
+            else:
+                left = Binary(op, left, self.expression(PRECEDENCE[op]))
+
+    def _list(self):
+        self.expect_op("(")
+        items = [self.expression()]
+        while self.at_op(","):
+            self.next()
+            items.append(self.expression())
+        self.expect_op(")")
+        return items
+
+    def prefix(self):
+        tok = self.next()
+        if tok.kind == "number":
+            value = float(tok.value) if any(c in tok.value for c in ".eE") else int(tok.value)
+            unit = self.peek()
+            if unit is not None and unit.kind == "ident" and unit.value.lower() in DURATION_UNITS:
+                self.next()
+                return Literal(DURATION_UNITS[unit.value.lower()] * value)
+            return Literal(value)
+        if tok.kind == "string":
+            return Literal(tok.value)
+        if tok.kind == "param":
+            if tok.value not in self.params:
+                raise ESQLError(f"Missing value for parameter ?{tok.value} (use --param {tok.value}=...)")
+            return Literal(self.params[tok.value])
+        if tok.kind == "op" and tok.value == "(":
+            inner = self.expression()
+            self.expect_op(")")
+            return inner
+        if tok.kind == "op" and tok.value == "-":
+            return Negate(self.expression(6))
+        if tok.kind == "ident":
+            word = tok.value.upper()
+            if word == "NOT":
+                return Not(self.expression(3))
+            if word == "NULL":
+                return Literal(None)
+            if word in ("TRUE", "FALSE"):
+                return Literal(word == "TRUE")
+            if self.at_op("("):
+                return self._call(word)
+            return Field(tok.value)
+        raise ESQLError(f"Unexpected {tok.value!r} at offset {tok.pos}")
+
+    def _call(self, name):
+        self.expect_op("(")
+        args = []
+        if not self.at_op(")"):
+            args.append(self._star_or_expr())
+            while self.at_op(","):
+                self.next()
+                args.append(self._star_or_expr())
+        self.expect_op(")")
+        if name in AGGREGATE_FUNCTIONS:
+            return AggCall(name, args)
+        return Call(name, args, self.now)
+
+    def _star_or_expr(self):
+        if self.at_op("*"):
+            self.next()
+            return Literal("*")
+        return self.expression()
+
+    def named_expression(self):
+        """`name = expr` or a bare expr named by its source text."""
+        tok, nxt = self.peek(), self.peek(1)
+        if tok is not None and tok.kind == "ident" and nxt is not None and nxt.kind == "op" and nxt.value == "=":
+            self.pos += 2
+            return tok.value, self.expression()
+        start = self.pos
+        expr = self.expression()
+        return self.text_between(start, self.pos), expr
+
+class AggCall(Expr):
+    """Aggregate call; only valid directly in STATS."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def refs(self):
+        return set().union(set(), *(a.refs() for a in self.args))
+
+    def compile(self):
+        raise ESQLError(f"{self.name}() is only allowed as a top-level STATS aggregation")
+
+# ============================================================
+# Aggregation states (picklable, mergeable)
+# ============================================================
+
+class CountState:
+    __slots__ = ("n",)
+
+    def __init__(self):
+        self.n = 0
+
+    def add(self, v):
+        if v is not None:
+            self.n += 1
+
+    def merge(self, other):
+        self.n += other.n
+
+    def result(self):
+        return self.n
+
+class SumState:
+    __slots__ = ("total", "seen")
+
+    def __init__(self):
+        self.total = 0
+        self.seen = False
+
+    def add(self, v):
+        if v is not None:
+            self.total += v
+            self.seen = True
+
+    def merge(self, other):
+        self.total += other.total
+        self.seen = self.seen or other.seen
+
+    def result(self):
+        return self.total if self.seen else None
+
+class AvgState:
+    __slots__ = ("total", "n")
+
+    def __init__(self):
+        self.total = 0.0
+        self.n = 0
+
+    def add(self, v):
+        if v is not None:
+            self.total += v
+            self.n += 1
+
+    def merge(self, other):
+        self.total += other.total
+        self.n += other.n
+
+    def result(self):
+        return self.total / self.n if self.n else None
+
+class MinState:
+    __slots__ = ("v",)
+
+    def __init__(self):
+        self.v = None
+
+    def add(self, v):
+        if v is not None and (self.v is None or v < self.v):
+            self.v = v
+
+    def merge(self, other):
+        self.add(other.v)
+
+    def result(self):
+        return self.v
+
+class MaxState(MinState):
+    __slots__ = ()
+
+    def add(self, v):
+        if v is not None and (self.v is None or v > self.v):
+            self.v = v
+
+class DistinctState:
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, v):
+        if v is not None:
+            if isinstance(v, list):
+                self.values.update(v)
+            else:
+                self.values.add(v)
+
+    def merge(self, other):
+        self.values |= other.values
+
+    def result(self):
+        return len(self.values)
+
+class PercentileState:
+    """Exact percentile over collected values (fine for per-group sample sizes here)."""
+    __slots__ = ("values", "pct")
+
+    def __init__(self, pct=50.0):
+        self.values = []
+        self.pct = pct
+
+    def add(self, v):
+        if v is not None:
+            self.values.append(v)
+
+    def merge(self, other):
+        self.values.extend(other.values)
+
+    def result(self):
+        if not self.values:
+            return None
+        vals = sorted(self.values)
+        k = (len(vals) - 1) * self.pct / 100.0
+        lo, hi = math.floor(k), math.ceil(k)
+        return vals[lo] + (vals[hi] - vals[lo]) * (k - lo)
+
+AGG_STATES = {
+    "COUNT": CountState, "SUM": SumState, "AVG": AvgState, "MIN": MinState,
+    "MAX": MaxState, "COUNT_DISTINCT": DistinctState, "MEDIAN": PercentileState,
+    "PERCENTILE": PercentileState,
+}
+
+class Aggregation:
+    def __init__(self, name, call):
+        self.name = name
+        self.func = call.name
+        self.count_star = self.func == "COUNT" and (not call.args or (call.args[0].const and call.args[0].compile()(None) == "*"))
+        self.value = None if self.count_star else call.args[0].compile()
+        self.pct = None
+        if self.func == "PERCENTILE":
+            if len(call.args) < 2 or not call.args[1].const:
+                raise ESQLError("PERCENTILE(field, p) needs a constant percentile")
+            self.pct = float(call.args[1].compile()(None))
+        self.refs = set() if self.count_star else call.args[0].refs()
+
+    def new_state(self):
+        if self.count_star:
+            return CountState()
+        if self.pct is not None:
+            return PercentileState(self.pct)
+        return AGG_STATES[self.func]()
+
+# ============================================================
+# Query plan
+# ============================================================
+
+class Query:
+    """A parsed ES|QL query: source indices, a row-wise prefix, an optional STATS and a table-wise suffix."""
+
+    def __init__(self, text, params=None, now=None):
+        self.text = text
+        self.params = params or {}
+        self.now = now or datetime.now(timezone.utc)
+        self.indices = []
+        self.row_ops = []      # before STATS: ("where", fn) / ("eval", [(name, fn)])
+        self.stats = None      # (aggregations, [(name, fn)])
+        self.table_ops = []    # after STATS (or everything after FROM if no STATS)
+        self.prefilters = []   # raw-line substring checks derived from the first WHERE
+        self.refs = set()      # fields read before STATS (None: every field is needed)
+        self._parse()
+
+    def _parser(self, tokens):
+        return ExprParser(tokens, self.params, self.now, self.text)
+
+    def _parse(self):
+        commands = split_commands(tokenize(self.text))
+        if not commands or not commands[0][0].is_kw("FROM"):
+            raise ESQLError("Query must start with FROM")
+        # Index names contain hyphens and wildcards, so glue the FROM tokens back together
+        sources = "".join(str(t.value) for t in commands[0][1:])
+        self.indices = [name for name in sources.split(",") if name]
+        for cmd in commands[1:]:
+            name = cmd[0].value.upper()
+            parser = self._parser(cmd[1:])
+            op = self._parse_command(name, parser)
+            if not parser.at_end():
+                raise ESQLError(f"Unexpected {parser.peek().value!r} in {name}")
+            if op[0] == "stats":
+                if self.stats is not None:
+                    raise ESQLError("Only one STATS command is supported")
+                self.stats = op[1]
+            elif self.stats is None and op[0] in ("where", "eval"):
+                self.row_ops.append(op)
+                if op[0] == "where" and not self.prefilters and not any(o[0] == "eval" for o in self.row_ops):
+                    self.prefilters = literal_prefilters(op[2])
+            else:
+                self.table_ops.append(op)
+        if self.stats is None:
+            self.refs = None
+
+    def _parse_command(self, name, p):
+        before_stats = self.stats is None
+        if name == "WHERE":
+            expr = p.expression()
+            if before_stats:
+                self.refs |= expr.refs()
+            return ("where", expr.compile(), expr)
+        if name == "EVAL":
+            items = [p.named_expression()]
+            while p.at_op(","):
+                p.next()
+                items.append(p.named_expression())
+            if before_stats:
+                self.refs |= set().union(*(e.refs() for _, e in items))
+            return ("eval", [(n, e.compile()) for n, e in items])
+        if name == "STATS":
+            aggs = []
+            while not p.at_end() and not p.peek().is_kw("BY"):
+                agg_name, expr = p.named_expression()
+                if not isinstance(expr, AggCall):
+                    raise ESQLError(f"STATS item {agg_name!r} must be a single aggregate call")
+                aggs.append(Aggregation(agg_name, expr))
+                self.refs |= aggs[-1].refs
+                if p.at_op(","):
+                    p.next()
+            groups = []
+            if not p.at_end() and p.peek().is_kw("BY"):
+                p.next()
+                groups.append(p.named_expression())
+                while p.at_op(","):
+                    p.next()
+                    groups.append(p.named_expression())
+            self.refs |= set().union(set(), *(e.refs() for _, e in groups))
+            return ("stats", (aggs, [(n, e.compile()) for n, e in groups]))
+        if name == "SORT":
+            keys = []
+            while True:
+                expr = p.expression()
+                desc, nulls_first = False, None
+                if not p.at_end() and p.peek().is_kw("ASC", "DESC"):
+                    desc = p.next().value.upper() == "DESC"
+                if not p.at_end() and p.peek().is_kw("NULLS"):
+                    p.next()
+                    nulls_first = p.next().value.upper() == "FIRST"
+                keys.append((expr.compile(), desc, desc if nulls_first is None else nulls_first))
+                if not p.at_op(","):
+                    break
+                p.next()
+            return ("sort", keys)
+        if name == "LIMIT":
+            tok = p.next()
+            if tok.kind != "number":
+                raise ESQLError("LIMIT needs a number")
+            return ("limit", int(tok.value))
+        if name in ("KEEP", "DROP"):
+            fields = [p.next().value]
+            while p.at_op(","):
+                p.next()
+                fields.append(p.next().value)
+            return (name.lower(), fields)
+        raise ESQLError(f"Unsupported command {name}")
+
+def literal_prefilters(expr):
+    """Raw-line substrings every matching row must contain, from top-level `field == "literal"` conjuncts.
+
+    A line that lacks the JSON encoding of the literal cannot match, so it is
+    skipped without being parsed. Only plain ASCII literals are used, since
+    their encoding is the same however the file was written.
+    """
+    conjuncts = expr.operands if isinstance(expr, Logical) and expr.op == "AND" else [expr]
+    needles = []
+    for c in conjuncts:
+        options = None
+        if isinstance(c, Binary) and c.op == "==" and isinstance(c.left, Field) and isinstance(c.right, Literal):
+            options = [c.right.value]
+        elif isinstance(c, InList) and not c.negated and isinstance(c.operand, Field) and all(isinstance(o, Literal) for o in c.options):
+            options = [o.value for o in c.options]
+        if options and all(isinstance(v, str) and v.isascii() and json.dumps(v)[1:-1] == v for v in options):
+            needles.append(tuple(json.dumps(v).encode() for v in options))
+    return needles
+
+# ============================================================
+# Execution
+# ============================================================
+
+def resolve_files(indices, data_dir, columnar=False):
+    """Map index names (or patterns like opsguard-*) to (path, format) generator outputs."""
+    files = []
+    for index in indices:
+        names = [n for n in INDEX_FILES if n == index or (index.endswith("*") and n.startswith(index[:-1]))]
+        if not names:
+            raise ESQLError(f"Unknown index {index!r}; known: {', '.join(INDEX_FILES)}")
+        for name in names:
+            stem = INDEX_FILES[name]
+            if columnar:
+                path = os.path.join(data_dir, "columnar", stem)
+                if not os.path.exists(os.path.join(path, "_meta.json")):
+                    raise ESQLError(f"No columnar store for {name} in {path} (generate with --columnar)")
+                files.append((path, "columnar"))
+                continue
+            for candidate, fmt in ((f"{stem}.json", "ndjson"), (f"{stem}.json.gz", "ndjson"),
+                                   (f"{stem}_bulk.ndjson", "bulk"), (f"{stem}_bulk.ndjson.gz", "bulk")):
+                path = os.path.join(data_dir, candidate)
+                if os.path.exists(path):
+                    files.append((path, fmt))
+                    break
+            else:
+                raise ESQLError(f"No data file for {name} in {data_dir} (expected {stem}.json)")
+    return files
+
+def split_ranges(path, parts):
+    """Split a plain file into newline-aligned byte ranges."""
+    size = os.path.getsize(path)
+    if parts <= 1 or size < (1 << 20):
+        return [(0, size)]
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            f.readline()
+            pos = f.tell()
+            if pos > bounds[-1] and pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def iter_lines(path, start=0, end=None):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rb') as f:
+        if start:
+            f.seek(start)
+        pos = start
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            yield line
+
+def is_action_line(doc):
+    return len(doc) == 1 and next(iter(doc)) in ("index", "create", "update", "delete")
+
+def iter_ndjson_docs(query, path, bulk, start=0, end=None):
+    return parse_lines(query, iter_lines(path, start, end), bulk)
+
+def parse_lines(query, lines, bulk=False):
+    """Parse NDJSON document lines, skipping those the prefilters rule out (and bulk action lines)."""
+    needles = query.prefilters
+    loads = json.loads
+    for line in lines:
+        if needles and not all(any(n in line for n in group) for group in needles):
+            continue
+        if not line.strip():
+            continue
+        row = loads(line)
+        if bulk and is_action_line(row):
+            continue
+        yield row
+
+def iter_columnar_docs(query, path):
+    """Rows holding just the referenced columns, zipped straight off the mmapped store."""
+    with ColumnarTable(path) as table:
+        names = table.names if query.refs is None else [n for n in table.names if n in query.refs]
+        for values in table.scan(names):
+            yield dict(zip(names, values))
+
+def iter_rows(query, path, fmt, start=0, end=None):
+    """Yield rows that survive the prefilters and the row-wise commands."""
+    if fmt == "columnar":
+        docs = iter_columnar_docs(query, path)
+    else:
+        docs = iter_ndjson_docs(query, path, fmt == "bulk", start, end)
+    return filter_rows(query, docs)
+
+def filter_rows(query, docs):
+    ops = query.row_ops
+    for row in docs:
+        keep = True
+        for op in ops:
+            if op[0] == "where":
+                if op[1](row) is not True:
+                    keep = False
+                    break
+            else:
+                for name, fn in op[1]:
+                    row[name] = fn(row)
+        if keep:
+            yield row
+
+def aggregate(query, rows):
+    """Streaming hash aggregation: group key tuple -> list of aggregation states."""
+    aggs, groups = query.stats
+    group_fns = [fn for _, fn in groups]
+    plan = [(agg.value, agg.count_star) for agg in aggs]
+    table = {}
+    for row in rows:
+        key = tuple(fn(row) for fn in group_fns)
+        key = tuple(tuple(k) if isinstance(k, list) else k for k in key)
+        states = table.get(key)
+        if states is None:
+            states = table[key] = [agg.new_state() for agg in aggs]
+        for state, (value, count_star) in zip(states, plan):
+            if count_star:
+                state.n += 1
+            else:
+                state.add(value(row))
+    return table
+
+def _scan_partial(args):
+    """Process-pool task: aggregate one byte range of one file."""
+    text, params, now_iso, path, fmt, start, end = args
+    query = Query(text, params, datetime.fromisoformat(now_iso))
+    return aggregate(query, iter_rows(query, path, fmt, start, end))
+
+def merge_tables(target, other):
+    for key, states in other.items():
+        mine = target.get(key)
+        if mine is None:
+            target[key] = states
+        else:
+            for a, b in zip(mine, states):
+                a.merge(b)
+    return target
+
+def sort_rows(rows, keys):
+    """Stable multi-key sort honouring ASC/DESC and NULLS FIRST/LAST per key."""
+    for fn, desc, nulls_first in reversed(keys):
+        present = [r for r in rows if fn(r) is not None]
+        missing = [r for r in rows if fn(r) is None]
+        present.sort(key=lambda r: _sort_key(fn(r)), reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+def _sort_key(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+def apply_table_ops(rows, ops):
+    for op in ops:
+        kind = op[0]
+        if kind == "where":
+            rows = [r for r in rows if op[1](r) is True]
+        elif kind == "eval":
+            for r in rows:
+                for name, fn in op[1]:
+                    r[name] = fn(r)
+        elif kind == "sort":
+            rows = sort_rows(rows, op[1])
+        elif kind == "limit":
+            rows = rows[:op[1]]
+        elif kind == "keep":
+            rows = [{k: r.get(k) for k in op[1]} for r in rows]
+        elif kind == "drop":
+            rows = [{k: v for k, v in r.items() if k not in op[1]} for r in rows]
+    return rows
+
+def _stream_top_k(rows, ops):
+    """Without STATS: fold a leading SORT + LIMIT into a heap so the stream is never materialised."""
+    if len(ops) >= 2 and ops[0][0] == "sort" and ops[1][0] == "limit" and len(ops[0][1]) == 1:
+        fn, desc, _ = ops[0][1][0]
+        k = ops[1][1]
+        keyed = ((_sort_key(fn(r)), i, r) for i, r in enumerate(rows) if fn(r) is not None)
+        top = heapq.nlargest(k, keyed, key=lambda t: t[0]) if desc else heapq.nsmallest(k, keyed, key=lambda t: t[0])
+        return [r for _, _, r in top], ops[2:]
+    if ops and ops[0][0] == "limit":
+        out = []
+        for r in rows:
+            if len(out) >= ops[0][1]:
+                break
+            out.append(r)
+        return out, ops[1:]
+    return list(rows), ops
+
+def column_type(values):
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, bool):
+            return "boolean"
+        if isinstance(v, int):
+            return "long"
+        if isinstance(v, float):
+            return "double"
+        if isinstance(v, datetime):
+            return "date"
+        if isinstance(v, str):
+            return "date" if _looks_like_date(v) else "keyword"
+        return "object"
+    return "null"
+
+def _looks_like_date(value):
+    return len(value) >= 19 and value[4] == "-" and value[10] == "T" and to_datetime(value) is not None
+
+def _output_value(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, timedelta):
+        return str(v)
+    return v
+
+def execute(query, data_dir=DEFAULT_DATA_DIR, workers=1, columnar=False):
+    """Run a parsed Query and return an ES|QL-style {"columns": [...], "values": [...]} result."""
+    files = resolve_files(query.indices, data_dir, columnar)
+    if query.stats is not None:
+        tasks = []
+        for path, fmt in files:
+            ranges = [(0, None)] if fmt == "columnar" or path.endswith(".gz") else split_ranges(path, workers)
+            tasks += [(query.text, query.params, query.now.isoformat(), path, fmt, s, e) for s, e in ranges]
+        table = {}
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for partial in pool.map(_scan_partial, tasks):
+                    merge_tables(table, partial)
+        else:
+            for path, fmt, start, end in ((t[3], t[4], t[5], t[6]) for t in tasks):
+                merge_tables(table, aggregate(query, iter_rows(query, path, fmt, start, end)))
+        return finish(query, table=table)
+    return finish(query, rows=(row for path, fmt in files for row in iter_rows(query, path, fmt)))
+
+def execute_lines(query, lines):
+    """Run a parsed Query over in-memory NDJSON document lines (e.g. the mock server's store)."""
+    rows = filter_rows(query, parse_lines(query, lines))
+    if query.stats is not None:
+        return finish(query, table=aggregate(query, rows))
+    return finish(query, rows=rows)
+
+def finish(query, table=None, rows=None):
+    """Apply the table-wise commands to a STATS table or a row stream and build the result."""
+    if query.stats is not None:
+        aggs, groups = query.stats
+        if not groups and not table:
+            table[()] = [agg.new_state() for agg in aggs]
+        names = [agg.name for agg in aggs] + [name for name, _ in groups]
+        rows = [dict(zip(names, [s.result() for s in states] + list(key))) for key, states in table.items()]
+        ops = query.table_ops
+    else:
+        rows, ops = _stream_top_k(rows, query.table_ops)
+        names = []
+        for r in rows:
+            for k in r:
+                if k not in names:
+                    names.append(k)
+    for op in ops:
+        if op[0] == "eval":
+            names += [n for n, _ in op[1] if n not in names]
+        elif op[0] == "keep":
+            names = list(op[1])
+        elif op[0] == "drop":
+            names = [n for n in names if n not in op[1]]
+    rows = apply_table_ops(rows, ops)
+    if not any(op[0] == "limit" for op in ops):
+        rows = rows[:DEFAULT_LIMIT]
+    columns = [{"name": n, "type": column_type(r.get(n) for r in rows)} for n in names]
+    return {"columns": columns, "values": [[_output_value(r.get(n)) for n in names] for r in rows]}
+
+def strip_comments(text):
+    return "\n".join(line for line in text.splitlines() if not line.lstrip().startswith("--"))
+
+def load_tool(path):
+    """Read an elastic/tools/*.esql file and return its query text."""
+    with open(path) as f:
+        return strip_comments(f.read())
+
+def run_query(text, data_dir=DEFAULT_DATA_DIR, params=None, now=None, workers=1, columnar=False):
+    return execute(Query(text, params, now), data_dir, workers, columnar)
+
+def format_table(result):
+    names = [c["name"] for c in result["columns"]]
+    cells = [[("null" if v is None else str(round(v, 2)) if isinstance(v, float) else str(v)) for v in row]
+             for row in result["values"]]
+    widths = [max([len(n)] + [len(r[i]) for r in cells]) for i, n in enumerate(names)]
+    lines = ["  ".join(n.ljust(w) for n, w in zip(names, widths)),
+             "  ".join("-" * w for w in widths)]
+    lines += ["  ".join(c.ljust(w) for c, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+def parse_param(text):
+    name, _, value = text.partition("=")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI offline ES|QL engine")
+    parser.add_argument("tool", nargs="?", help="Path to an .esql tool file")
+    parser.add_argument("--query", help="Inline ES|QL query instead of a tool file")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                        help="Generator output directory (default: generated-data)")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="Value for a ?NAME placeholder (repeatable)")
+    parser.add_argument("--now", default=None,
+                        help="ISO timestamp to use for NOW() (default: current time)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for parallel scanning of large files (default: 1)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Scan <data-dir>/columnar/ stores (generator --columnar) instead of NDJSON")
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    args = parser.parse_args()
+
+    if not args.tool and not args.query:
+        parser.error("give a tool file or --query")
+    text = args.query or load_tool(args.tool)
+    now = None
+    if args.now:
+        now = datetime.fromisoformat(args.now)
+        now = now if now.tzinfo else now.replace(tzinfo=timezone.utc)
+    try:
+        result = run_query(text, args.data_dir, dict(parse_param(p) for p in args.param), now, args.workers,
+                           args.columnar)
+    except ESQLError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if args.format == "json":
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_table(result))
+        print(f"\n({len(result['values'])} rows)")
+
+if __name__ == "__main__":
+    main()
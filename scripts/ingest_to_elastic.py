@@ -6,20 +6,43 @@ Fixes:
   - Index names use 'opsguard-*' prefix (avoids logs-*/metrics-* data stream)
   - DELETE 404 is silently ignored
   - Proper error handling and chunked bulk ingestion
+  - Bulk files are streamed pair-by-pair, so memory is bounded by chunk size
+  - Concurrent _bulk requests with a bounded in-flight window (--workers)
+  - Keep-alive connection pool so TLS handshakes are paid once per connection
+  - _bulk requests sized by byte budget, adapted to latency and 429 rejections
+  - Per-item retry with jittered backoff; permanent failures go to a dead-letter file
+  - Optional checkpoints (--checkpoint / --resume) with deterministic _ids
+  - Reads .ndjson.gz inputs directly; --gzip compresses _bulk request bodies
+  - Optional per-minute rollups (--rollup) written to opsguard-rollup-1m
+  - Optional baseline anomaly detection on the stream (--detect)
+  - Optional streaming business impact: loss/hour, SLA breach, projected loss (--impact)
+  - Optional deployment change-point correlation on the log stream (--correlate)
+  - Optional log template mining with per-minute counts in opsguard-log-templates-1m (--templates)
+  - Optional per-phase and per-request timing report (--timings, --timings-json, --timings-index)
+  - JSON via data/fast_json.py (orjson when installed); action lines rewritten once per file
+  - Optional mapping-driven pre-flight validation (--validate reject|repair)
+  - Optional hourly/daily time partitions behind the index aliases, with retention (--partition, --retention)
 """
 
-import os, json, time, sys, urllib.request, urllib.error
+import os, json, time, sys, gzip, random, argparse, collections, hashlib, heapq, itertools, threading, http.client, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from rollup import MinuteRollup, ROLLUP_INDEX
+from anomaly_detector import AnomalyDetector
+from business_impact import BusinessImpact
+from deploy_correlator import DeployCorrelator
+from log_templates import TemplateMiner, TEMPLATE_INDEX
+from instrumentation import Instrumentation
+from doc_validator import load_validators
+from partitions import Partitioner, PARTITIONED_INDICES, GRANULARITIES, drop_partitions, parse_retention, raw_timestamp
 
 ES_URL = os.environ.get("ES_URL", "")
 API_KEY = os.environ.get("ES_API_KEY", "")
 
-if not ES_URL:
-    ES_URL = input("Enter your Elasticsearch URL (e.g. https://my-project.es.region.gcp.elastic.cloud): ").strip()
-if not API_KEY:
-    API_KEY = input("Enter your Elastic API Key: ").strip()
-
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+sys.path.insert(0, os.path.join(BASE_DIR, "data"))
+import fast_json  # noqa: E402
 MAPPINGS_DIR = os.path.join(BASE_DIR, "elastic", "index-mappings")
 
 # NEW index names that don't clash with Serverless data streams
@@ -33,76 +56,629 @@ INDEX_MAP = {
     "audit-opsguard-actions": "opsguard-audit",
 }
 
-def es_request(method, endpoint, data=None, content_type="application/json", retries=3):
+# Index → mapping file in elastic/index-mappings; workflow indices need no mapping.
+# History uses the full incidents-history.json mapping (semantic_text for vector search).
+INDEX_MAPPINGS = {
+    "opsguard-incidents": "logs-incidents.json",
+    "opsguard-metrics": "metrics-system.json",
+    "opsguard-business": "business-metrics.json",
+    ROLLUP_INDEX: "rollup-1m.json",
+    TEMPLATE_INDEX: "log-templates-1m.json",
+    "opsguard-history": "incidents-history.json",
+    "opsguard-active": None,
+    "opsguard-notifications": None,
+    "opsguard-audit": None,
+}
+
+BULK_MAX_DOCS_PER_CHUNK = 5000
+
+def load_mapping(index):
+    """The PUT body for an index: its mapping file minus settings (Serverless has no shard settings)."""
+    mapping_file = INDEX_MAPPINGS.get(index)
+    if mapping_file is None:
+        return None
+    with open(os.path.join(MAPPINGS_DIR, mapping_file)) as f:
+        mapping = json.load(f)
+    mapping.pop("settings", None)
+    return mapping
+
+class AdaptiveBatcher:
+    """Sizes `_bulk` requests by payload bytes and tunes the budget from server feedback.
+
+    AIMD-style: the byte budget grows while responses come back under the
+    target latency with no rejections, shrinks gently when latency drifts
+    above target, and halves as soon as the cluster pushes back with 429 /
+    es_rejected_execution_exception items. A 413 caps both the budget and its
+    ceiling at half the refused request, so growth never climbs back to it.
+    """
+
+    def __init__(self, initial_bytes=1_000_000, min_bytes=64_000, max_bytes=10_000_000,
+                 target_latency=1.0, max_docs=BULK_MAX_DOCS_PER_CHUNK):
+        self.min_bytes = min_bytes
+        self.max_bytes = max(max_bytes, min_bytes)
+        self.budget_bytes = min(max(initial_bytes, min_bytes), self.max_bytes)
+        self.target_latency = target_latency
+        self.max_docs = max_docs
+        self.adjustments = {"grow": 0, "shrink": 0, "backoff": 0, "too_large": 0}
+
+    def observe(self, latency, item_count, rejected_count):
+        """Feed back one response: wall-clock latency and how many items were rejected."""
+        if rejected_count > 0:
+            factor, reason = 0.5, "backoff"
+        elif latency > self.target_latency * 1.5:
+            factor, reason = 0.8, "shrink"
+        elif latency < self.target_latency and item_count > 0:
+            factor, reason = 1.25, "grow"
+        else:
+            return
+        budget = min(max(int(self.budget_bytes * factor), self.min_bytes), self.max_bytes)
+        if budget != self.budget_bytes:
+            self.budget_bytes = budget
+            self.adjustments[reason] += 1
+
+    def too_large(self, request_bytes):
+        """Feed back a 413: a request of `request_bytes` exceeded the server's limit."""
+        limit = max(request_bytes // 2, self.min_bytes)
+        self.max_bytes = min(self.max_bytes, limit)
+        self.budget_bytes = min(self.budget_bytes, self.max_bytes)
+        self.adjustments["too_large"] += 1
+
+    def summary(self):
+        adj = self.adjustments
+        too_large = f", {adj['too_large']} too large" if adj["too_large"] else ""
+        return (f"budget {self.budget_bytes // 1024} KiB "
+                f"({adj['grow']} grows, {adj['shrink']} shrinks, {adj['backoff']} backoffs{too_large})")
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections, reused per host.
+
+    Each request borrows an idle connection for its (scheme, host, port) or
+    opens a new one, and returns it afterwards unless the server asked to
+    close. A request that fails on a reused socket (the server dropped an
+    idle keep-alive) is replayed once on a fresh connection.
+    """
+
+    def __init__(self, timeout=30, max_idle_per_host=16):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "opened": 0, "reused": 0, "stale": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _acquire(self, host_key):
+        with self._lock:
+            if self._idle[host_key]:
+                self.stats["reused"] += 1
+                return self._idle[host_key].pop(), True
+            self.stats["opened"] += 1
+        scheme, host, port = host_key
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return conn_cls(host, port, timeout=self.timeout), False
+
+    def _release(self, host_key, conn):
+        with self._lock:
+            if len(self._idle[host_key]) < self.max_idle_per_host:
+                self._idle[host_key].append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, body=None, headers=None):
+        """Send a request and return (status, response body bytes)."""
+        parsed = urllib.parse.urlsplit(url)
+        host_key = (parsed.scheme, parsed.hostname, parsed.port)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        self._count("requests")
+
+        while True:
+            conn, reused = self._acquire(host_key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                payload = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    self._count("stale")
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(host_key, conn)
+            return resp.status, payload
+
+    def close(self):
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+    def summary(self):
+        st = self.stats
+        return (f"{st['requests']} requests over {st['opened']} connections "
+                f"({st['reused']} reused, {st['stale']} stale reconnects)")
+
+POOL = ConnectionPool()
+
+RETRYABLE_STATUSES = {0, 429, 503}   # 0: no HTTP response (connection error)
+GZIP_LEVEL = 5
+
+class TransferStats:
+    """Thread-safe tally of request bytes before and after gzip."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+    def add(self, raw, sent):
+        with self._lock:
+            self.raw_bytes += raw
+            self.sent_bytes += sent
+
+    def summary(self):
+        ratio = self.raw_bytes / self.sent_bytes if self.sent_bytes else 0
+        return f"{self.raw_bytes / 1e6:.1f} MB → {self.sent_bytes / 1e6:.1f} MB ({ratio:.1f}x)"
+
+TRANSFER_STATS = TransferStats()
+TIMINGS = Instrumentation()   # enabled by --timings / --timings-json / --timings-index
+
+def endpoint_kind(method, endpoint):
+    """Span name for a request: the API (`_bulk`, `_count`) or `<index>` for index-level calls."""
+    api = endpoint.rsplit("/", 1)[-1].split("?", 1)[0]
+    return f"es {method} {api if api.startswith('_') else '<index>'}"
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full-jitter exponential backoff: a random wait up to base * 2**attempt, capped."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def es_request(method, endpoint, data=None, content_type="application/json", retries=3, compress=False):
+    if not TIMINGS.enabled:
+        return _es_request(method, endpoint, data, content_type, retries, compress)[:2]
+    start = time.perf_counter()
+    status, res, sent, attempts = _es_request(method, endpoint, data, content_type, retries, compress)
+    TIMINGS.record(endpoint_kind(method, endpoint), time.perf_counter() - start, sent * attempts,
+                   retries=attempts - 1, error=res is None)
+    return status, res
+
+def _es_request(method, endpoint, data, content_type, retries, compress):
+    """es_request's body; also returns the request size in bytes and how many attempts were made."""
     url = f"{ES_URL}/{endpoint}"
     headers = {"Authorization": f"ApiKey {API_KEY}", "Content-Type": content_type}
     body = None
     if data:
-        body = json.dumps(data).encode('utf-8') if isinstance(data, dict) else data.encode('utf-8') if isinstance(data, str) else data
+        body = fast_json.dumps(data) if isinstance(data, dict) else data.encode('utf-8') if isinstance(data, str) else data
+    if body and compress:
+        raw_size = len(body)
+        with TIMINGS.span("es.gzip", raw_size):
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+        TRANSFER_STATS.add(raw_size, len(body))
+    sent = len(body) if body else 0
 
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(url, data=body, headers=headers, method=method)
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                return resp.status, json.loads(resp.read().decode('utf-8'))
-        except urllib.error.HTTPError as e:
-            body_text = e.read().decode('utf-8')
-            if e.code == 404:
-                return 404, {"status": "not_found"}
-            if e.code == 400 and "resource_already_exists" in body_text:
-                return 200, {"status": "already_exists"}
-            if attempt == retries - 1:
-                print(f"    ❌ HTTP {e.code}: {body_text[:150]}")
-                return e.code, None
+            status, payload = POOL.request(method, url, body=body, headers=headers)
+            if status < 400:
+                with TIMINGS.span("es.decode_response", len(payload)):
+                    return status, fast_json.loads(payload) if payload else {}, sent, attempt + 1
+            body_text = payload.decode('utf-8', errors='replace')
+            if status == 404:
+                return 404, {"status": "not_found"}, sent, attempt + 1
+            if status == 400 and "resource_already_exists" in body_text:
+                return 200, {"status": "already_exists"}, sent, attempt + 1
+            if attempt == retries - 1 or (status < 500 and status not in RETRYABLE_STATUSES):
+                # client errors (400, 413, ...) fail the same way on every attempt
+                print(f"    ❌ HTTP {status}: {body_text[:150]}")
+                return status, None, sent, attempt + 1
         except Exception as e:
             if attempt == retries - 1:
                 print(f"    ❌ Error: {str(e)[:100]}")
-                return 0, None
-        time.sleep(2)
+                return 0, None, sent, attempt + 1
+        with TIMINGS.span("es.retry_sleep"):
+            time.sleep(backoff_delay(attempt + 1))
+
+def create_indices(partitioner=None):
+    with TIMINGS.span("phase create_indices"):
+        _create_indices(partitioner)
 
-def create_indices():
+def _create_indices(partitioner=None):
     print("\n" + "="*50)
     print("📦 STEP 1: Creating Indices (Serverless Compatible)")
     print("="*50)
 
-    mapping_files = {
-        "opsguard-incidents": "logs-incidents.json",
-        "opsguard-metrics": "metrics-system.json",
-        "opsguard-business": "business-metrics.json",
-    }
-
-    for idx_name, mapping_file in mapping_files.items():
+    for idx_name in INDEX_MAPPINGS:
+        if partitioner is not None and idx_name in partitioner.indices:
+            continue
         print(f"\n  Creating {idx_name}...")
+        if idx_name in PARTITIONED_INDICES:
+            # A partitioned run left an alias of this name, which would block the PUT
+            dropped = drop_partitions(es_request, idx_name)
+            if dropped:
+                print(f"    🗑️  Dropped {dropped} partitions of {idx_name}")
         es_request("DELETE", idx_name)  # ignore 404
+        status, _ = es_request("PUT", idx_name, data=load_mapping(idx_name))
+        print(f"    {'✅ OK' if status in [200, 201] else '❌ FAILED'}")
+    if partitioner is not None:
+        print(f"\n  Partitioning {', '.join(partitioner.indices)} ({partitioner.granularity}); "
+              f"existing partitions are kept...")
+        partitioner.prepare(replace_single=True)  # every other index is recreated too
 
-        path = os.path.join(MAPPINGS_DIR, mapping_file)
-        with open(path) as f:
-            mapping = json.load(f)
+def rewrite_index(action_line, old_index, new_index):
+    """Point a single bulk action line at the new index name."""
+    old_a, new_a = f'"_index": "{old_index}"'.encode(), f'"_index": "{new_index}"'.encode()
+    old_b, new_b = f'"_index":"{old_index}"'.encode(), f'"_index":"{new_index}"'.encode()
+    return action_line.replace(old_a, new_a).replace(old_b, new_b)
 
-        # Ensure no shard/replica settings
-        mapping.pop("settings", None)
+def with_doc_id(action_line, doc_line):
+    """Give an action line a content-derived `_id`, so replaying it overwrites instead of duplicating."""
+    action = fast_json.loads(action_line)
+    meta = next(iter(action.values()))
+    meta.setdefault("_id", hashlib.sha1(doc_line.rstrip(b"\n")).hexdigest())
+    return fast_json.dumps_line(action)
 
-        status, _ = es_request("PUT", idx_name, data=mapping)
-        print(f"    {'✅ OK' if status in [200, 201] else '❌ FAILED'}")
+def tap_docs(pairs, index, observers):
+    """Pass bulk pairs through unchanged, showing each parsed doc to every observer's add(index, doc)."""
+    for pair in pairs:
+        with TIMINGS.span("ingest.observe"):
+            doc = fast_json.loads(pair[1])
+            for observer in observers:
+                observer.add(index, doc)
+        yield pair
 
-    # History index — uses full incidents-history.json mapping (semantic_text for vector search)
-    print(f"\n  Creating opsguard-history...")
-    es_request("DELETE", "opsguard-history")
-    history_path = os.path.join(MAPPINGS_DIR, "incidents-history.json")
-    with open(history_path) as f:
-        history_mapping = json.load(f)
-    history_mapping.pop("settings", None)  # Serverless doesn't support shard settings
-    status, _ = es_request("PUT", "opsguard-history", data=history_mapping)
-    print(f"    {'✅ OK' if status in [200, 201] else '❌ FAILED'}")
-
-    # Workflow indices (no mapping needed)
-    for idx in ["opsguard-active", "opsguard-notifications", "opsguard-audit"]:
-        print(f"\n  Creating {idx}...")
-        es_request("DELETE", idx)
-        status, _ = es_request("PUT", idx)
-        print(f"    {'✅ OK' if status in [200, 201] else '❌ FAILED'}")
+def validate_docs(pairs, index, validator, repair, on_reject, observers=()):
+    """Check each doc against its index mapping before it is sent; observers see the same parse.
+
+    Valid docs pass through unchanged. In repair mode, fixable fields are
+    rewritten and unfixable ones dropped, and the doc is re-encoded (under
+    a deterministic `_id` the action keeps the id of the original line).
+    Docs that Elasticsearch would still refuse go to on_reject(pair,
+    problems) instead of downstream, and observers never see them.
+    """
+    for pair in pairs:
+        with TIMINGS.span("ingest.validate"):
+            doc, problems = validator.validate(fast_json.loads(pair[1]), repair)
+            if doc is None:
+                on_reject(pair, problems)
+                continue
+            if problems:
+                pair = (pair[0], fast_json.dumps_line(doc), pair[2])
+        if observers:
+            with TIMINGS.span("ingest.observe"):
+                for observer in observers:
+                    observer.add(index, doc)
+        yield pair
+
+def route_partitions(pairs, index, partitioner, on_unroutable):
+    """Point each action at the time partition of its doc's @timestamp, creating partitions on first use.
+
+    Docs already past retention are dropped here, since their partition
+    would be expired straight away. Docs without a usable @timestamp, or
+    whose partition could not be created, go to on_unroutable(pair, reason).
+    """
+    rewritten = {}
+    for action, doc, end in pairs:
+        with TIMINGS.span("ingest.partition"):
+            timestamp = raw_timestamp(doc)
+            name, expired = partitioner.route(index, timestamp)
+            if expired:
+                continue
+            if name is None:
+                on_unroutable((action, doc, end), f"no usable @timestamp ({str(timestamp)[:40]})")
+                continue
+            if not partitioner.ensure(index, name):
+                on_unroutable((action, doc, end), f"partition [{name}] could not be created")
+                continue
+            key = (action, name)
+            new_action = rewritten.get(key)
+            if new_action is None:
+                if len(rewritten) >= 1024:
+                    rewritten.clear()
+                new_action = rewritten[key] = rewrite_index(action, index, name)
+        yield new_action, doc, end
+
+def iter_bulk_pairs(filepath, old_index, new_index, start_offset=0, deterministic_ids=False):
+    """Lazily yield (action, doc, end_offset) from a bulk NDJSON file.
+
+    Only one pair is held at a time, so memory does not grow with file size.
+    end_offset is the byte position just past the doc line, which is where a
+    resumed run would pick up. `.gz` files are decompressed on the fly and
+    their offsets refer to the uncompressed stream. Generated files repeat
+    one action line per index, so each distinct line is rewritten only once.
+    """
+    rewritten = {}
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, 'rb') as f:
+        f.seek(start_offset)
+        for action in f:
+            if not action.strip():
+                continue
+            doc = f.readline()
+            if not doc:
+                print(f"    ⚠️  Dangling action line at end of {os.path.basename(filepath)}, skipping")
+                break
+            if not doc.endswith(b"\n"):
+                doc += b"\n"
+            new_action = rewritten.get(action)
+            if new_action is None:
+                if len(rewritten) >= 1024:
+                    rewritten.clear()
+                new_action = rewritten[action] = rewrite_index(action, old_index, new_index)
+            action = new_action
+            if deterministic_ids:
+                action = with_doc_id(action, doc)
+            yield action, doc, f.tell()
+
+class ChunkRecord:
+    """Settlement state of one first-attempt chunk, used to move the checkpoint watermark."""
+    __slots__ = ("end_offset", "unsettled", "acked")
+
+    def __init__(self, end_offset, size):
+        self.end_offset = end_offset
+        self.unsettled = size
+        self.acked = 0
+
+class BulkItem:
+    """One action/doc pair on its way to `_bulk`, remembering its file, chunk and attempt count."""
+    __slots__ = ("action", "doc", "progress", "end_offset", "record", "attempt")
+
+    def __init__(self, action, doc, progress, end_offset=0, record=None, attempt=0):
+        self.action = action
+        self.doc = doc
+        self.progress = progress
+        self.end_offset = end_offset
+        self.record = record
+        self.attempt = attempt
+
+    @property
+    def size(self):
+        return len(self.action) + len(self.doc)
+
+def iter_bulk_chunks(items, batcher):
+    """Group BulkItems into chunks that fit the batcher's current byte budget.
+
+    The budget is re-read for every chunk, so feedback from responses that
+    have already come back shapes the next request.
+    """
+    chunk = []
+    size = 0
+    for item in items:
+        chunk.append(item)
+        size += item.size
+        if size >= batcher.budget_bytes or len(chunk) >= batcher.max_docs:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+def send_bulk(chunk, compress=False):
+    """POST one chunk of BulkItems and return (status, response, latency in seconds)."""
+    with TIMINGS.span("ingest.encode") as span:
+        body = b"".join(part for item in chunk for part in (item.action, item.doc))
+        span.add_bytes(len(body))
+    start = time.monotonic()
+    status, res = es_request("POST", "_bulk", data=body, content_type="application/x-ndjson", compress=compress)
+    return status, res, time.monotonic() - start
+
+def is_rejection(item_result):
+    return (item_result.get("status") == 429
+            or item_result.get("error", {}).get("type") == "es_rejected_execution_exception")
+
+class RetryQueue:
+    """Failed bulk items waiting out their backoff, ordered by when they become ready."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item, delay):
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item))
 
-def ingest_data():
+    def seconds_until_ready(self):
+        return max(0.0, self._heap[0][0] - time.monotonic()) if self._heap else None
+
+    def pop_ready(self, budget_bytes, max_docs, coalesce=0.25):
+        """Take ready items, oldest deadline first, up to one chunk's worth.
+
+        Items due within `coalesce` seconds are taken early so jittered
+        retries share a request instead of trickling out one by one.
+        """
+        now = time.monotonic() + coalesce
+        chunk = []
+        size = 0
+        while self._heap and self._heap[0][0] <= now and size < budget_bytes and len(chunk) < max_docs:
+            item = heapq.heappop(self._heap)[2]
+            chunk.append(item)
+            size += item.size
+        return chunk
+
+class DeadLetterWriter:
+    """Appends permanently failed documents to an NDJSON file, opened on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._f = None
+
+    def write(self, item, status, error):
+        if self._f is None:
+            self._f = open(self.path, 'a')
+        try:
+            source = json.loads(item.doc)
+        except ValueError:
+            source = item.doc.decode('utf-8', errors='replace').rstrip("\n")
+        record = {
+            "_index": item.progress.index,
+            "file": item.progress.filename,
+            "status": status,
+            "error": error,
+            "attempts": item.attempt + 1,
+            "source": source,
+        }
+        self._f.write(json.dumps(record) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+class FileProgress:
+    """Per-file accounting for chunks that may complete out of order.
+
+    First-attempt chunks are appended to a ledger in file order. A chunk is
+    settled once every item in it is acknowledged or dead-lettered, and the
+    committed offset only moves past a chunk once it and everything before
+    it have settled, retries included.
+    """
+
+    def __init__(self, filename, index, committed_offset=0, committed_acked=0):
+        self.filename = filename
+        self.index = index
+        self.ingested = committed_acked
+        self.failed = 0
+        self.announced = False
+        self.ledger = collections.deque()
+        self.committed_offset = committed_offset
+        self.committed_acked = committed_acked
+
+    def announce(self):
+        if not self.announced:
+            print(f"\n  📄 {self.filename} → {self.index}")
+            self.announced = True
+
+    def settle(self, item, acked):
+        if acked:
+            self.ingested += 1
+        else:
+            self.failed += 1
+        if item.record is not None:
+            item.record.unsettled -= 1
+            item.record.acked += acked
+
+    def advance(self):
+        """Move the committed watermark over fully settled chunks; True if it moved."""
+        moved = False
+        while self.ledger and self.ledger[0].unsettled == 0:
+            record = self.ledger.popleft()
+            self.committed_offset = record.end_offset
+            self.committed_acked += record.acked
+            moved = True
+        return moved
+
+class Checkpoint:
+    """Per-file resume points (byte offset + acknowledged docs) persisted as JSON.
+
+    Entries remember the file's size and mtime, so a regenerated file is
+    ingested from the start instead of from a stale offset.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.files = json.load(f).get("files", {})
+
+    @staticmethod
+    def _fingerprint(filepath):
+        st = os.stat(filepath)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def start_for(self, filename, filepath):
+        """Return (offset, acked, done) to resume filename from."""
+        entry = self.files.get(filename)
+        if not entry:
+            return 0, 0, False
+        fp = self._fingerprint(filepath)
+        if entry.get("size") != fp["size"] or entry.get("mtime_ns") != fp["mtime_ns"]:
+            print(f"\n  ⚠️  {filename} changed since the last checkpoint, starting it over")
+            return 0, 0, False
+        return entry["offset"], entry["acked"], entry.get("done", False)
+
+    def record(self, progress, filepath, done=False):
+        self.files[progress.filename] = {
+            "offset": progress.committed_offset,
+            "acked": progress.committed_acked,
+            "done": done,
+            **self._fingerprint(filepath),
+        }
+        self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"files": self.files, "updated_at": time.time()}, f, indent=2)
+        os.replace(tmp, self.path)
+
+def ingest_data(*args, **kwargs):
+    with TIMINGS.span("phase ingest_data"):
+        _ingest_data(*args, **kwargs)
+
+def _ingest_data(workers=4, max_in_flight=None, batcher=None, max_retries=5,
+                 retry_conflicts=False, dead_letter_path=None, checkpoint=None, compress=False, rollup=None,
+                 detector=None, validate=None, impact=None, correlator=None, partitioner=None, templates=None):
+    """Bulk-load every generated file with up to max_in_flight concurrent `_bulk` requests.
+
+    Chunks from all files share one worker pool, but results are drained in
+    submission order so progress lines and per-file totals read exactly as
+    they would for a sequential run. Reading pauses while the in-flight
+    window is full, which keeps memory flat. Chunk sizes come from the
+    AdaptiveBatcher, which is fed each response's latency and rejections.
+
+    Only the items that failed with a retryable status (429, 503 and, with
+    retry_conflicts, 409) are re-queued; they ride along in later chunks
+    after a jittered exponential backoff. Items that fail permanently or run
+    out of attempts are written to the dead-letter file.
+
+    With a Checkpoint, each file resumes from its committed offset, the
+    watermark is saved after every batch that advances it, and every action
+    gets a content-derived `_id` so docs replayed after a crash overwrite
+    rather than duplicate.
+
+    Each bulk file may also be stored as `<name>.gz`; with compress=True
+    the request bodies are gzipped as well.
+
+    With a MinuteRollup, every doc read is also folded into per-minute
+    aggregates, which are bulk-loaded into opsguard-rollup-1m after the raw
+    files. An AnomalyDetector sees the same docs and reports events to its
+    sink, a BusinessImpact keeps per-service loss and SLA figures, a
+    DeployCorrelator links log change points to deployments, and a
+    TemplateMiner turns log messages into templates whose per-minute counts
+    go to opsguard-log-templates-1m as their minutes close, a full batch at
+    a time between file chunks, with the rest after the last file. On resume,
+    the already-committed part of each file is re-read
+    (not re-sent) so rollups and baselines still cover the whole input.
+
+    With validate="reject" or "repair", every doc is first checked against
+    its index mapping (doc_validator.py). Docs that would be refused are
+    dead-lettered with status 400 and a `local_validation` error without
+    ever being sent; in repair mode, fixable fields are coerced first.
+
+    With a Partitioner, docs of the time-series indices are sent to the
+    hourly or daily partition of their @timestamp behind the index alias
+    (partitions.py), created on first use; docs past retention are skipped
+    and docs that cannot be routed are dead-lettered. Actions then get
+    content-derived `_id`s too, since partitions outlive a run and
+    re-ingesting the same files must overwrite rather than duplicate.
+
+    With TIMINGS enabled, reading, validation, partitioning, observers, waiting on in-flight requests,
+    response handling, retry back-off and checkpoint saves are each timed.
+    """
     print("\n" + "="*50)
     print("📊 STEP 2: Ingesting Data via Bulk API")
     print("="*50)
@@ -115,57 +691,268 @@ def ingest_data():
         ("incidents_history_bulk.ndjson", "incidents-opsguard-history", "opsguard-history"),
     ]
 
+    batcher = batcher or AdaptiveBatcher()
+    workers = max(1, workers)
+    max_in_flight = max(1, max_in_flight or workers * 2)
+    retryable = RETRYABLE_STATUSES | ({409} if retry_conflicts else set())
+    retry_queue = RetryQueue()
+    dead_letters = DeadLetterWriter(dead_letter_path or os.path.join(DATA_DIR, "dead-letter.ndjson"))
     total_ok = 0
     total_fail = 0
+    total_retried = 0
+    total_invalid = 0
+    total_repaired = 0
+    total_unroutable = 0
+    validators = load_validators(INDEX_MAPPINGS, MAPPINGS_DIR) if validate else {}
 
+    present = []
     for filename, old_index, new_index in bulk_tasks:
         filepath = os.path.join(DATA_DIR, filename)
+        if not os.path.exists(filepath) and os.path.exists(filepath + ".gz"):
+            filename, filepath = filename + ".gz", filepath + ".gz"
         if not os.path.exists(filepath):
             print(f"\n  ⚠️  {filename} not found, skipping")
             continue
+        present.append((filepath, filename, old_index, new_index))
+
+    in_flight = collections.deque()
+    filepaths = {filename: filepath for filepath, filename, _, _ in present}
+    progresses = []
+    observers = [o for o in (rollup, detector, impact, correlator, templates) if o is not None]
+
+    def settle(item, status, error, retry=None):
+        nonlocal total_fail, total_retried
+        if (status in retryable if retry is None else retry) and item.attempt < max_retries:
+            item.attempt += 1
+            retry_queue.push(item, backoff_delay(item.attempt))
+            total_retried += 1
+            return "retry"
+        item.progress.settle(item, False)
+        total_fail += 1
+        dead_letters.write(item, status, error)
+        return "dead"
+
+    def reject(progress, pair, error):
+        nonlocal total_fail
+        item = BulkItem(pair[0], pair[1], progress, end_offset=pair[2])
+        progress.settle(item, False)
+        total_fail += 1
+        dead_letters.write(item, 400, error)
+
+    def invalid(progress, pair, problems):
+        nonlocal total_invalid
+        total_invalid += 1
+        reject(progress, pair, {
+            "type": "local_validation",
+            "reason": "; ".join(f"{path}: {reason}" for path, reason, fixed in problems if not fixed)[:500],
+        })
+
+    def unroutable(progress, pair, reason):
+        nonlocal total_unroutable
+        total_unroutable += 1
+        reject(progress, pair, {"type": "partition_routing", "reason": reason})
+
+    def drain_one():
+        chunk, future = in_flight.popleft()
+        with TIMINGS.span("ingest.wait"):
+            status, res, latency = future.result()
+        with TIMINGS.span("ingest.handle_response"):
+            handle_response(chunk, status, res, latency)
+
+    def handle_response(chunk, status, res, latency):
+        nonlocal total_ok
+        first = chunk[0]
+        is_retry_chunk = first.attempt > 0
+        if not is_retry_chunk:
+            first.progress.announce()
 
-        print(f"\n  📄 {filename} → {new_index}")
-
-        with open(filepath) as f:
-            content = f.read()
-
-        # Replace old index name with new
-        content = content.replace(f'"_index": "{old_index}"', f'"_index": "{new_index}"')
-        # Also replace alternate formats
-        content = content.replace(f'"_index":"{old_index}"', f'"_index":"{new_index}"')
-
-        lines = content.strip().split('\n')
-        total_docs = len(lines) // 2
-        chunk_size = 400  # 200 docs per chunk
-        ingested = 0
-
-        for i in range(0, len(lines), chunk_size):
-            chunk_lines = lines[i:i + chunk_size]
-            chunk = "\n".join(chunk_lines) + "\n"
-
-            status, res = es_request("POST", "_bulk", data=chunk, content_type="application/x-ndjson")
-
-            if status == 200 and res:
-                errors = res.get("errors", False)
-                items = res.get("items", [])
-                ok_count = sum(1 for it in items if list(it.values())[0].get("status", 0) in [200, 201])
-                fail_count = len(items) - ok_count
-                ingested += ok_count
-                total_ok += ok_count
-                total_fail += fail_count
-                if fail_count > 0:
-                    first_err = next((list(it.values())[0].get("error", {}) for it in items if list(it.values())[0].get("status", 0) not in [200, 201]), {})
-                    print(f"    ⚠️  {ok_count} ok, {fail_count} failed: {str(first_err)[:120]}")
+        ok_count = requeued = dead = rejected = 0
+        first_err = None
+        if status == 200 and res:
+            results = res.get("items", [])
+            for item, entry in zip(chunk, results):
+                # each item is {"<op type>": {...}}; take the one value without building a list
+                for result in entry.values():
+                    break
+                item_status = result.get("status", 0)
+                if item_status in (200, 201):
+                    item.progress.settle(item, True)
+                    ok_count += 1
+                    continue
+                rejected += is_rejection(result)
+                first_err = first_err or result.get("error", {})
+                if settle(item, item_status, result.get("error")) == "retry":
+                    requeued += 1
                 else:
-                    print(f"    ✅ {ingested}/{total_docs} docs ingested")
-            else:
-                print(f"    ❌ Chunk failed (status {status})")
+                    dead += 1
+            if len(results) < len(chunk):
+                # Items the response has no result for were not confirmed: retry them, don't drop them
+                missing = {"type": "missing_bulk_result",
+                           "reason": f"{len(chunk) - len(results)} of {len(chunk)} items had no result"}
+                first_err = first_err or missing
+                for item in chunk[len(results):]:
+                    if settle(item, 0, missing) == "retry":
+                        requeued += 1
+                    else:
+                        dead += 1
+            batcher.observe(latency, len(results), rejected)
+        else:
+            # Whole request failed after es_request's own retries. 429/503/no response are transient.
+            # A 413 refuses the request, not its documents: shrink the budget and re-pack them into
+            # smaller chunks (a lone document over the limit is dead-lettered). Anything else is permanent.
+            if status == 429:
+                batcher.observe(latency, len(chunk), len(chunk))
+            elif status == 413:
+                batcher.too_large(sum(item.size for item in chunk))
+            first_err = f"chunk failed (status {status})"
+            retry = status in retryable or (status == 413 and len(chunk) > 1)
+            for item in chunk:
+                if settle(item, status, first_err, retry) == "retry":
+                    requeued += 1
+                else:
+                    dead += 1
+        total_ok += ok_count
+        if checkpoint is not None:
+            for progress in {item.progress for item in chunk}:
+                if progress.advance():
+                    with TIMINGS.span("ingest.checkpoint"):
+                        checkpoint.record(progress, filepaths[progress.filename])
+
+        label = "🔁 retry: " if is_retry_chunk else ""
+        if requeued or dead:
+            print(f"    ⚠️  {label}{ok_count} ok, {requeued} queued for retry, {dead} failed: {str(first_err)[:120]}")
+        elif is_retry_chunk:
+            print(f"    {label}{ok_count} recovered")
+        else:
+            print(f"    ✅ {first.progress.ingested} docs ingested")
+
+    def submit(chunk):
+        while len(in_flight) >= max_in_flight:
+            drain_one()
+        in_flight.append((chunk, pool.submit(send_bulk, chunk, compress)))
+
+    def submit_ready_retries():
+        while True:
+            chunk = retry_queue.pop_ready(batcher.budget_bytes, batcher.max_docs)
+            if not chunk:
+                return
+            submit(chunk)
+
+    template_progress = None
+
+    def submit_templates():
+        # Keyed by minute, service and template id, so simply rewritten on resume (no ledger)
+        nonlocal template_progress
+        if template_progress is None:
+            template_progress = FileProgress("log templates", TEMPLATE_INDEX)
+        items = (BulkItem(action, doc, template_progress) for action, doc in templates.bulk_lines())
+        for chunk in iter_bulk_chunks(items, batcher):
+            submit_ready_retries()
+            submit(chunk)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for filepath, filename, old_index, new_index in present:
+            offset, acked, done = checkpoint.start_for(filename, filepath) if checkpoint else (0, 0, False)
+            if observers and (done or offset):
+                for _, doc, end in iter_bulk_pairs(filepath, old_index, new_index):
+                    if not done and end > offset:
+                        break
+                    doc = fast_json.loads(doc)
+                    if new_index in validators:
+                        doc = validators[new_index].validate(doc, validate == "repair")[0]
+                        if doc is None:
+                            continue
+                    for observer in observers:
+                        observer.add(new_index, doc)
+            if done:
+                print(f"\n  ⏭️  {filename} already ingested ({acked} docs), skipping")
+                continue
+            if offset:
+                print(f"\n  ⏩ {filename}: resuming at byte {offset:,} ({acked} docs already acknowledged)")
+            progress = FileProgress(filename, new_index, offset, acked)
+            progresses.append(progress)
+            pairs = iter_bulk_pairs(filepath, old_index, new_index, start_offset=offset,
+                                    deterministic_ids=checkpoint is not None or partitioner is not None)
+            validator = validators.get(new_index)
+            if validator is not None:
+                repaired_before = validator.stats["repaired"]
+                pairs = validate_docs(pairs, new_index, validator, validate == "repair",
+                                      lambda pair, problems, progress=progress: invalid(progress, pair, problems),
+                                      observers)
+            elif observers:
+                pairs = tap_docs(pairs, new_index, observers)
+            if partitioner is not None and new_index in partitioner.indices:
+                pairs = route_partitions(pairs, new_index, partitioner,
+                                         lambda pair, reason, progress=progress: unroutable(progress, pair, reason))
+            items = (BulkItem(action, doc, progress, end_offset=end) for action, doc, end in pairs)
+            for chunk in TIMINGS.timed_iter(iter_bulk_chunks(items, batcher), "ingest.read_chunk"):
+                record = ChunkRecord(chunk[-1].end_offset, len(chunk))
+                progress.ledger.append(record)
+                for item in chunk:
+                    item.record = record
+                submit_ready_retries()
+                submit(chunk)
+                if templates is not None and len(templates) >= batcher.max_docs:
+                    submit_templates()
+            if validator is not None:
+                total_repaired += validator.stats["repaired"] - repaired_before
+        if rollup is not None and len(rollup):
+            # Rollups are keyed by bucket, so they are simply rewritten on resume (no ledger)
+            progress = FileProgress(f"rollups ({rollup.docs_seen:,} docs → {len(rollup):,} buckets)", ROLLUP_INDEX)
+            items = (BulkItem(action, doc, progress) for action, doc in rollup.bulk_lines())
+            for chunk in iter_bulk_chunks(items, batcher):
+                submit_ready_retries()
+                submit(chunk)
+        if templates is not None:
+            templates.flush()
+            if len(templates):
+                submit_templates()
+        if detector is not None:
+            detector.flush()
+        if correlator is not None:
+            correlator.flush()
+        while in_flight or retry_queue:
+            submit_ready_retries()
+            if in_flight:
+                drain_one()
+            elif retry_queue:
+                with TIMINGS.span("ingest.retry_backoff"):
+                    time.sleep(retry_queue.seconds_until_ready())
+    dead_letters.close()
+    if checkpoint is not None:
+        for progress in progresses:
+            progress.advance()
+            checkpoint.record(progress, filepaths[progress.filename], done=not progress.ledger)
 
     print(f"\n{'='*50}")
     print(f"📊 SUMMARY: {total_ok} docs ingested, {total_fail} failed")
+    print(f"📦 Batching: {batcher.summary()}")
+    if compress:
+        print(f"🗜️  Gzip: {TRANSFER_STATS.summary()}")
+    if total_retried:
+        print(f"🔁 Retries: {total_retried} item resubmissions")
+    if validate:
+        print(f"🧹 Validation ({validate}): {total_repaired} docs repaired, {total_invalid} rejected before sending")
+    if partitioner is not None:
+        print(f"🗂️  Partitions: {partitioner.summary()}"
+              + (f"; {total_unroutable} docs unroutable" if total_unroutable else ""))
+    if dead_letters.count:
+        print(f"🪦 Dead letters: {dead_letters.count} docs → {dead_letters.path}")
+    if detector is not None:
+        print(f"🚨 Anomalies: {detector.summary()}")
+    if impact is not None:
+        print(f"💰 Impact: {impact.summary()}")
+    if correlator is not None:
+        print(f"🚀 Deployments: {correlator.summary()}")
+    if templates is not None:
+        print(f"🧩 Templates: {templates.summary()}")
     print(f"{'='*50}")
 
 def verify():
+    with TIMINGS.span("phase verify"):
+        _verify()
+
+def _verify():
     print("\n" + "="*50)
     print("🔍 STEP 3: Verification")
     print("="*50)
@@ -177,13 +964,142 @@ def verify():
         else:
             print(f"  {idx}: ❌ couldn't verify")
 
-if __name__ == "__main__":
+def report_timings(json_path=None, index=None):
+    print("\n" + "="*50)
+    print("⏱️  Timings")
+    print("="*50)
+    print(TIMINGS.report())
+    if json_path:
+        TIMINGS.write_json(json_path)
+        print(f"  Written to {json_path}")
+    if index:
+        action = fast_json.action_line(index)
+        body = b"".join(action + fast_json.dumps_line(doc) for doc in TIMINGS.audit_docs())
+        status, res = es_request("POST", "_bulk", data=body, content_type="application/x-ndjson")
+        ok = status == 200 and res and not res.get("errors")
+        print(f"  {'✅' if ok else '❌'} Timing documents (run {TIMINGS.run_id}) → {index}")
+
+def main():
+    global ES_URL, API_KEY, DATA_DIR
+    parser = argparse.ArgumentParser(description="OpsGuard AI Elastic Cloud Ingester")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent _bulk requests across and within files (default: 4)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Max chunks queued or sending at once (default: 2x workers)")
+    parser.add_argument("--batch-bytes", type=int, default=1_000_000,
+                        help="Initial _bulk payload budget in bytes (default: 1000000)")
+    parser.add_argument("--min-batch-bytes", type=int, default=64_000,
+                        help="Smallest payload budget the batcher may shrink to")
+    parser.add_argument("--max-batch-bytes", type=int, default=10_000_000,
+                        help="Largest payload budget the batcher may grow to")
+    parser.add_argument("--target-latency", type=float, default=1.0,
+                        help="Bulk response time in seconds the batcher aims for (default: 1.0)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Resubmissions per document for retryable failures (default: 5)")
+    parser.add_argument("--retry-conflicts", action="store_true",
+                        help="Also retry documents rejected with 409 version conflicts")
+    parser.add_argument("--dead-letter", default=None,
+                        help="NDJSON file for permanently failed docs (default: <data dir>/dead-letter.ndjson)")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="Record per-file resume points and use deterministic _ids")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the last checkpoint without recreating indices (implies --checkpoint)")
+    parser.add_argument("--checkpoint-file", default=None,
+                        help="Checkpoint location (default: <data dir>/.ingest-checkpoint.json)")
+    parser.add_argument("--gzip", action="store_true",
+                        help="Send _bulk bodies with Content-Encoding: gzip")
+    parser.add_argument("--rollup", action="store_true",
+                        help=f"Also write per-minute service/host aggregates to {ROLLUP_INDEX}")
+    parser.add_argument("--detect", action="store_true",
+                        help="Run the baseline anomaly detector over ingested docs (events: <data dir>/anomalies.ndjson)")
+    parser.add_argument("--impact", action="store_true",
+                        help="Track loss/hour, SLA breach and projected loss per service while ingesting")
+    parser.add_argument("--correlate", action="store_true",
+                        help="Link error-rate/latency change points in the logs to deployments while ingesting")
+    parser.add_argument("--templates", action="store_true",
+                        help=f"Mine log message templates while ingesting; per-minute counts go to {TEMPLATE_INDEX}")
+    parser.add_argument("--data-dir", default=None,
+                        help="Generator output directory to ingest (default: generated-data)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Time every phase and Elasticsearch request and print a report at the end")
+    parser.add_argument("--timings-json", default=None, metavar="PATH",
+                        help="Also write the timing report as JSON (implies --timings)")
+    parser.add_argument("--timings-index", nargs="?", const=INDEX_MAP["audit-opsguard-actions"], default=None,
+                        help="Also index one document per timed span (default index: opsguard-audit; implies --timings)")
+    parser.add_argument("--validate", choices=["reject", "repair"], default=None,
+                        help="Check docs against the index mappings before sending; dead-letter (reject) "
+                             "or coerce and drop bad fields (repair)")
+    parser.add_argument("--partition", choices=list(GRANULARITIES), default=None,
+                        help=f"Route {', '.join(PARTITIONED_INDICES)} docs into hourly or daily indices behind "
+                             "aliases of those names, kept across runs (default: one index each, recreated)")
+    parser.add_argument("--retention", type=parse_retention, default=None,
+                        help="With --partition, drop partitions older than this, e.g. 48h or 7d (default: keep all)")
+    args = parser.parse_args()
+    if args.retention is not None and not args.partition:
+        parser.error("--retention needs --partition")
+
+    if args.data_dir:
+        DATA_DIR = os.path.abspath(args.data_dir)
     if not os.path.exists(DATA_DIR):
         print(f"❌ Data not found. Run: python3 data/sample-data-generator.py --output-dir generated-data --bulk")
         sys.exit(1)
 
+    if not ES_URL:
+        ES_URL = input("Enter your Elasticsearch URL (e.g. https://my-project.es.region.gcp.elastic.cloud): ").strip()
+    if not API_KEY:
+        API_KEY = input("Enter your Elastic API Key: ").strip()
+
     print("🛡️  OpsGuard AI — Elastic Cloud Serverless Ingester v2")
-    create_indices()
-    ingest_data()
+    if args.timings or args.timings_json or args.timings_index:
+        TIMINGS.enable()
+    checkpoint = None
+    if args.checkpoint or args.resume:
+        checkpoint_path = args.checkpoint_file or os.path.join(DATA_DIR, ".ingest-checkpoint.json")
+        if not args.resume and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        checkpoint = Checkpoint(checkpoint_path)
+
+    partitioner = Partitioner(es_request, load_mapping, args.partition, args.retention) if args.partition else None
+    if args.resume:
+        print("\n⏩ Resuming from checkpoint — existing indices are kept")
+        if partitioner is not None:
+            single = partitioner.prepare()
+            if single:
+                print(f"❌ {', '.join(single)} already exist as single indices; "
+                      f"rerun without --resume to replace them with partitions")
+                sys.exit(1)
+    else:
+        create_indices(partitioner)
+    detector = anomalies = None
+    if args.detect:
+        anomalies = open(os.path.join(DATA_DIR, "anomalies.ndjson"), 'w')
+        detector = AnomalyDetector(sink=lambda event: anomalies.write(json.dumps(event) + "\n"))
+    impact = BusinessImpact() if args.impact else None
+    correlator = DeployCorrelator() if args.correlate else None
+    templates = TemplateMiner() if args.templates else None
+    batcher = AdaptiveBatcher(initial_bytes=args.batch_bytes, min_bytes=args.min_batch_bytes,
+                              max_bytes=args.max_batch_bytes, target_latency=args.target_latency)
+    ingest_data(workers=args.workers, max_in_flight=args.max_in_flight, batcher=batcher,
+                max_retries=args.max_retries, retry_conflicts=args.retry_conflicts,
+                dead_letter_path=args.dead_letter, checkpoint=checkpoint, compress=args.gzip,
+                rollup=MinuteRollup() if args.rollup else None, detector=detector,
+                validate=args.validate, impact=impact, correlator=correlator, partitioner=partitioner,
+                templates=templates)
+    if anomalies is not None:
+        anomalies.close()
+        print(f"🚨 Anomaly events written to {anomalies.name}")
+    if impact is not None:
+        print("\n" + impact.report())
+    if correlator is not None:
+        print("\n" + correlator.report())
+    if templates is not None:
+        print("\n" + templates.report())
     verify()
+    if TIMINGS.enabled:
+        report_timings(args.timings_json, args.timings_index)
+    POOL.close()
+    print(f"\n🔌 Connections: {POOL.summary()}")
     print("\n🎉 Done! Your data is live on Elastic Cloud.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Ingest Instrumentation
+Per-phase timers for the ingester: wall time, call count, bytes, retries and
+a log₂ latency histogram for every named span (a phase such as
+`ingest.read`, or one Elasticsearch endpoint such as `es POST _bulk`).
+
+Disabled (the default), `span()` hands back one shared no-op context
+manager and `record()` returns immediately, so instrumented call sites cost
+an attribute lookup and a call. Enabled, spans are thread-safe and can be
+printed as a report, written as JSON, or turned into `opsguard-audit`-style
+documents for bulk indexing.
+"""
+
+import json, math, time, uuid, threading
+from datetime import datetime, timezone
+
+HISTOGRAM_BUCKETS = 24      # bucket i holds durations in [2**(i-1), 2**i) µs; the last one is open-ended
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_bytes(self, n):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class SpanStats:
+    """Accumulated timings for one span name."""
+    __slots__ = ("count", "seconds", "max_seconds", "bytes", "retries", "errors", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.retries = 0
+        self.errors = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds, nbytes=0, retries=0, error=False):
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.bytes += nbytes
+        self.retries += retries
+        self.errors += error
+        micros = seconds * 1e6
+        bucket = 0 if micros < 1 else min(HISTOGRAM_BUCKETS - 1, int(math.log2(micros)) + 1)
+        self.buckets[bucket] += 1
+
+    def quantile(self, q):
+        """Upper bound of the histogram bucket holding the q-quantile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min((2 ** i) / 1e6, self.max_seconds)
+        return self.max_seconds
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "seconds": round(self.seconds, 6),
+            "mean_ms": round(self.seconds / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "errors": self.errors,
+            "histogram_us": {f"<{2 ** i}": n for i, n in enumerate(self.buckets) if n},
+        }
+
+class _Span:
+    __slots__ = ("_instr", "_name", "_start", "_bytes")
+
+    def __init__(self, instr, name, nbytes):
+        self._instr = instr
+        self._name = name
+        self._bytes = nbytes
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self._instr.record(self._name, time.perf_counter() - self._start, self._bytes, error=exc_type is not None)
+        return False
+
+    def add_bytes(self, n):
+        self._bytes += n
+
+class Instrumentation:
+    """Thread-safe registry of SpanStats by name; a no-op unless enabled."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+
+    def span(self, name, nbytes=0):
+        """Context manager timing one occurrence of `name`."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, nbytes)
+
+    def record(self, name, seconds, nbytes=0, retries=0, error=False):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.add(seconds, nbytes, retries, error)
+
+    def timed_iter(self, iterable, name):
+        """Wrap an iterator so the time spent producing each item is recorded under `name`."""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(iter(iterable), name)
+
+    def _timed_iter(self, it, name):
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter() - start)
+            yield item
+
+    def to_dict(self):
+        with self._lock:
+            spans = {name: stats.to_dict() for name, stats in sorted(self._spans.items())}
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "spans": spans,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def audit_docs(self, agent="opsguard-ingester"):
+        """One `opsguard-audit`-style document per span, sharing this run's id and timestamp."""
+        report = self.to_dict()
+        timestamp = datetime.now(timezone.utc).isoformat()
+        for name, stats in report["spans"].items():
+            stats = dict(stats)
+            stats["histogram_us"] = json.dumps(stats["histogram_us"])
+            yield {"action": "ingest_timing", "timestamp": timestamp, "agent": agent,
+                   "run_id": report["run_id"], "span": name, **stats}
+
+    def report(self):
+        """Human-readable table: one line per span, slowest total first."""
+        report = self.to_dict()
+        rows = sorted(report["spans"].items(), key=lambda kv: -kv[1]["seconds"])
+        lines = [f"{'span':<28} {'count':>8} {'total s':>9} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8} "
+                 f"{'max ms':>9} {'MB':>8} {'retries':>7}"]
+        for name, s in rows:
+            lines.append(f"{name:<28} {s['count']:>8,} {s['seconds']:>9.3f} {s['mean_ms']:>9.3f} {s['p50_ms']:>8.3f} "
+                         f"{s['p99_ms']:>8.3f} {s['max_ms']:>9.3f} {s['bytes'] / 1e6:>8.2f} {s['retries']:>7}")
+        lines.append(f"wall time {report['wall_seconds']:.3f}s (spans overlap: phases contain requests, "
+                     f"and workers run concurrently)")
+        return "\n".join(lines)
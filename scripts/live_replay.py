@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Live Scenario Replay
+Streams the incident scenario into Elasticsearch continuously, so the
+`NOW() - 1 hour` windows in the ES|QL tools and the dashboard never go
+empty. Meant for demos and soak tests of the agents under sustained load.
+
+Each cycle replays the generator's timeline minute by minute: normal
+operation, the v2.4.2 bad deploy at T-45 and the escalation from T-40 to
+T-0, then starts over on the good version. The scale-mode fleet is used
+(--services, --hosts, --events-per-minute), so the default fleet matches
+generate_scenario_data() and larger ones scale the same story up.
+
+Pacing:
+  --speed N   a scenario minute lasts 60/N wall seconds (default 1 = real time)
+  --rate R    hard ceiling in docs/s (token bucket); without an explicit
+              --events-per-minute the fleet is sized so a normal minute
+              produces R docs/s. Incident minutes produce more, and the
+              scenario clock then falls behind; the lag is reported.
+
+Docs are stamped from the wall clock when their scenario minute starts (up
+to a minute in the past, never in the future), whatever the speed.
+
+Documents go through the ingester's bulk path: byte-budgeted chunks from
+the AdaptiveBatcher, a bounded in-flight window of concurrent `_bulk`
+requests, and per-item retry of 429/503 with jittered backoff. A full
+window or a long retry backlog blocks generation (backpressure). Chunks are
+also flushed after --flush-interval seconds so low rates stay live.
+
+With --partition hourly|daily the logs, metrics and business docs go to
+time partitions behind aliases of the index names (partitions.py), so a
+long soak rolls over to a new index every hour or day, and --retention
+drops whole partitions as they age out instead of the indices growing
+without bound.
+
+Usage:
+  python3 scripts/live_replay.py                                 # real time, scenario fleet
+  python3 scripts/live_replay.py --speed 6 --rate 500            # 20-minute cycles at ~500 docs/s
+  python3 scripts/live_replay.py --services 40 --hosts 30 --rate 5000 --duration 3600
+  python3 scripts/live_replay.py --partition hourly --retention 24h       # rolling 24h of hourly indices
+"""
+
+import os, sys, time, signal, argparse, importlib.util, collections
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import ingest_to_elastic as ingest
+from ingest_to_elastic import (AdaptiveBatcher, BulkItem, RetryQueue, RETRYABLE_STATUSES, backoff_delay,
+                               is_rejection, send_bulk, es_request, load_mapping)
+from partitions import Partitioner, GRANULARITIES, drop_partitions, parse_retention
+
+sys.path.insert(0, os.path.join(ingest.BASE_DIR, "data"))
+from fast_json import action_line, dumps_line  # noqa: E402
+
+CYCLE_MINUTES = 120         # generate_scenario_data() covers T-120min .. T-0
+STAMP_LAG = 30              # seconds; the generators jitter timestamps by at most ±25 s
+REPORT_EVERY = 10.0
+
+def load_generator():
+    spec = importlib.util.spec_from_file_location(
+        "sample_data_generator", os.path.join(ingest.BASE_DIR, "data", "sample-data-generator.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def scenario_phase(minutes_ago):
+    if minutes_ago > 45:
+        return "normal"
+    if minutes_ago == 45:
+        return "bad deploy (v2.4.2)"
+    if minutes_ago > 40:
+        return "deployed"
+    return "escalation"
+
+class TokenBucket:
+    """Allows `rate` tokens per second on average, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate / 10)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def wait_time(self, n=1):
+        """Take n tokens; return how long to sleep before using them (0 if available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class ReplayStats:
+    def __init__(self):
+        self.generated = 0
+        self.ok = 0
+        self.failed = 0
+        self.retried = 0
+        self.requests = 0
+        self.recent = collections.deque()       # (monotonic time, docs acknowledged) for the live rate
+
+    def acked(self, n):
+        self.ok += n
+        now = time.monotonic()
+        self.recent.append((now, n))
+        while self.recent and self.recent[0][0] < now - 60:
+            self.recent.popleft()
+
+    def rate(self):
+        if len(self.recent) < 2:
+            return 0.0
+        span = self.recent[-1][0] - self.recent[0][0]
+        return sum(n for _, n in self.recent) / span if span > 0 else 0.0
+
+class BulkStreamer:
+    """Chunks documents by the batcher's byte budget and keeps a bounded window of `_bulk` requests in flight."""
+
+    def __init__(self, workers=4, max_in_flight=None, batcher=None, max_retries=5, flush_interval=1.0,
+                 max_retry_backlog=50_000, compress=False):
+        self.batcher = batcher or AdaptiveBatcher()
+        self.max_in_flight = max(1, max_in_flight or workers * 2)
+        self.max_retries = max_retries
+        self.flush_interval = flush_interval
+        self.max_retry_backlog = max_retry_backlog
+        self.compress = compress
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.in_flight = collections.deque()
+        self.retry_queue = RetryQueue()
+        self.stats = ReplayStats()
+        self.chunk = []
+        self.chunk_bytes = 0
+        self.chunk_started = 0.0
+        self.blocked = 0.0                      # seconds the producer spent waiting on the cluster
+
+    def add(self, action, doc):
+        if not self.chunk:
+            self.chunk_started = time.monotonic()
+        item = BulkItem(action, doc, None)
+        self.chunk.append(item)
+        self.chunk_bytes += item.size
+        self.stats.generated += 1
+        if self.chunk_bytes >= self.batcher.budget_bytes or len(self.chunk) >= self.batcher.max_docs:
+            self.flush()
+
+    def tick(self):
+        """Flush a partial chunk that has waited long enough, and collect finished requests."""
+        if self.chunk and time.monotonic() - self.chunk_started >= self.flush_interval:
+            self.flush()
+        while self.in_flight and self.in_flight[0][1].done():
+            self._drain_one()
+        self._submit_ready_retries()
+
+    def flush(self):
+        if self.chunk:
+            chunk, self.chunk, self.chunk_bytes = self.chunk, [], 0
+            self._submit(chunk)
+
+    def _submit(self, chunk):
+        start = time.monotonic()
+        while len(self.in_flight) >= self.max_in_flight or len(self.retry_queue) > self.max_retry_backlog:
+            if self.in_flight:
+                self._drain_one()
+            else:
+                time.sleep(self.retry_queue.seconds_until_ready())
+                self._submit_ready_retries(block=False)
+        self.blocked += time.monotonic() - start
+        self.in_flight.append((chunk, self.pool.submit(send_bulk, chunk, self.compress)))
+        self.stats.requests += 1
+
+    def _submit_ready_retries(self, block=True):
+        while True:
+            chunk = self.retry_queue.pop_ready(self.batcher.budget_bytes, self.batcher.max_docs)
+            if not chunk:
+                return
+            if block:
+                self._submit(chunk)
+            else:
+                self.in_flight.append((chunk, self.pool.submit(send_bulk, chunk, self.compress)))
+
+    def _retry_or_drop(self, item, status, retry=None):
+        if (status in RETRYABLE_STATUSES if retry is None else retry) and item.attempt < self.max_retries:
+            item.attempt += 1
+            self.retry_queue.push(item, backoff_delay(item.attempt))
+            self.stats.retried += 1
+        else:
+            self.stats.failed += 1
+
+    def _drain_one(self):
+        chunk, future = self.in_flight.popleft()
+        status, res, latency = future.result()
+        if status == 200 and res:
+            ok = rejected = 0
+            results = res.get("items", [])
+            for item, entry in zip(chunk, results):
+                for result in entry.values():
+                    break
+                item_status = result.get("status", 0)
+                if item_status in (200, 201):
+                    ok += 1
+                    continue
+                rejected += is_rejection(result)
+                self._retry_or_drop(item, item_status)
+            for item in chunk[len(results):]:      # no result in the response: not confirmed
+                self._retry_or_drop(item, 0)
+            self.batcher.observe(latency, len(results), rejected)
+            self.stats.acked(ok)
+        else:
+            # as in ingest_to_elastic: only 429/503/no response are retried; a 413 re-packs smaller
+            if status == 429:
+                self.batcher.observe(latency, len(chunk), len(chunk))
+            elif status == 413:
+                self.batcher.too_large(sum(item.size for item in chunk))
+            retry = status in RETRYABLE_STATUSES or (status == 413 and len(chunk) > 1)
+            for item in chunk:
+                self._retry_or_drop(item, status, retry)
+
+    def close(self, timeout=30.0):
+        """Send what is buffered and wait for it (and due retries) for up to `timeout` seconds."""
+        self.flush()
+        deadline = time.monotonic() + timeout
+        while (self.in_flight or self.retry_queue) and time.monotonic() < deadline:
+            self._submit_ready_retries(block=False)
+            if self.in_flight:
+                self._drain_one()
+            elif self.retry_queue:
+                time.sleep(min(self.retry_queue.seconds_until_ready(), max(0.0, deadline - time.monotonic())))
+        self.stats.failed += len(self.retry_queue) + sum(len(chunk) for chunk, _ in self.in_flight)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def ensure_indices(indices, recreate=False, partitioner=None):
+    """Create missing indices with their mappings (all of them with recreate); return {index: doc count}.
+
+    Partitioned indices are not created here; the partitioner finds their
+    existing partitions (all dropped first with recreate) and makes new
+    ones as docs arrive. A single index in the way of a partition alias is
+    only dropped with recreate; otherwise the replay stops.
+    """
+    counts = {}
+    for index in indices:
+        if partitioner is not None and index in partitioner.indices:
+            if recreate:
+                drop_partitions(es_request, index)
+            continue
+        if recreate:
+            es_request("DELETE", index)
+        else:
+            status, res = es_request("GET", f"{index}/_count")
+            if status == 200 and res:
+                counts[index] = res.get("count", 0)
+                continue
+        status, _ = es_request("PUT", index, data=load_mapping(index))
+        print(f"  {'✅' if status in (200, 201) else '❌'} Created {index}")
+        counts[index] = 0
+    if partitioner is not None:
+        single = partitioner.prepare(replace_single=recreate)
+        if single:
+            print(f"❌ {', '.join(single)} already exist as single indices; "
+                  f"rerun with --recreate to replace them with partitions")
+            sys.exit(1)
+    return counts
+
+def calibrate_events_per_minute(generator, services, placement, rate, speed):
+    """events_per_minute that makes a normal scenario minute produce `rate` docs per wall second."""
+    now = datetime.now(timezone.utc)
+    docs_at_1x = sum(1 for _ in generator.iter_scale_minute(now, CYCLE_MINUTES, services, placement, 1.0))
+    docs_at_1x += sum(1 for _ in generator.iter_scale_minute(now, CYCLE_MINUTES - 1, services, placement, 1.0))
+    wanted = rate * 60 / speed
+    return max(0.01, wanted / (docs_at_1x / 2))
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI live scenario replay")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Scenario minutes per wall minute (default: 1 = real time)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Docs/s ceiling; also sizes the fleet's event rate unless --events-per-minute is set")
+    parser.add_argument("--events-per-minute", type=float, default=None,
+                        help="Multiplier on per-host metrics/logs per scenario minute (default: 1.0)")
+    parser.add_argument("--services", type=int, default=8, help="Services in the fleet (default: 8)")
+    parser.add_argument("--hosts", type=int, default=6, help="Hosts in the fleet (default: 6)")
+    parser.add_argument("--cycle-minutes", type=int, default=CYCLE_MINUTES,
+                        help="Scenario minutes per cycle, ending with the 45-minute incident (default: 120)")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Stop after this many wall seconds (default: run until interrupted)")
+    parser.add_argument("--cycles", type=int, default=0, help="Stop after this many cycles (default: no limit)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent _bulk requests (default: 4)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Max chunks queued or sending before generation blocks (default: 2x workers)")
+    parser.add_argument("--batch-bytes", type=int, default=1_000_000,
+                        help="Initial _bulk payload budget in bytes (default: 1000000)")
+    parser.add_argument("--target-latency", type=float, default=1.0,
+                        help="Bulk response time in seconds the batcher aims for (default: 1.0)")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="Send a partial chunk after this many seconds (default: 1.0)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Resubmissions per document for 429/503 before it is dropped (default: 5)")
+    parser.add_argument("--gzip", action="store_true", help="Send _bulk bodies with Content-Encoding: gzip")
+    parser.add_argument("--recreate", action="store_true",
+                        help="Delete and recreate the scenario indices first (default: create only missing ones)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible streams")
+    parser.add_argument("--partition", choices=list(GRANULARITIES), default=None,
+                        help="Write logs, metrics and business docs to hourly or daily partitions behind aliases")
+    parser.add_argument("--retention", type=parse_retention, default=None,
+                        help="With --partition, drop partitions older than this, e.g. 24h or 7d (default: keep all)")
+    args = parser.parse_args()
+
+    if args.cycle_minutes <= 45:
+        parser.error("--cycle-minutes must be over 45 so the cycle holds the whole incident")
+    if args.retention is not None and not args.partition:
+        parser.error("--retention needs --partition")
+    if not ingest.ES_URL:
+        ingest.ES_URL = input("Enter your Elasticsearch URL (e.g. https://my-project.es.region.gcp.elastic.cloud): ").strip()
+    if not ingest.API_KEY:
+        ingest.API_KEY = input("Enter your Elastic API Key: ").strip()
+
+    generator = load_generator()
+    if args.seed is not None:
+        generator.random.seed(args.seed)
+    services, hosts = generator.build_fleet(args.services, args.hosts)
+    placement = generator.service_placement(services, hosts)
+    events_per_minute = args.events_per_minute
+    if events_per_minute is None:
+        events_per_minute = (calibrate_events_per_minute(generator, services, placement, args.rate, args.speed)
+                             if args.rate else 1.0)
+    slot = 60.0 / args.speed
+
+    print("🛡️  OpsGuard AI — Live Scenario Replay")
+    print(f"   {len(services)} services on {len(hosts)} hosts, x{events_per_minute:.2f} events/min, "
+          f"speed x{args.speed:g} ({slot:.1f}s per scenario minute)"
+          + (f", ceiling {args.rate:,.0f} docs/s" if args.rate else ""))
+    partitioner = Partitioner(es_request, load_mapping, args.partition, args.retention) if args.partition else None
+    counts = ensure_indices([generator.BULK_INDEX_MAP[dt] for dt in generator.DATA_TYPES], recreate=args.recreate,
+                            partitioner=partitioner)
+    partitioned = {dt: index for dt, index in generator.BULK_INDEX_MAP.items()
+                   if partitioner is not None and index in partitioner.indices}
+
+    actions = {dt: action_line(index) for dt, index in generator.BULK_INDEX_MAP.items()}
+    batcher = AdaptiveBatcher(initial_bytes=args.batch_bytes, target_latency=args.target_latency)
+    streamer = BulkStreamer(workers=args.workers, max_in_flight=args.max_in_flight, batcher=batcher,
+                            max_retries=args.max_retries, flush_interval=args.flush_interval, compress=args.gzip)
+    bucket = TokenBucket(args.rate) if args.rate else None
+
+    if not counts.get(generator.BULK_INDEX_MAP["incidents_history"]):
+        # The diagnosis tools search past incidents; seed them once
+        for incident in generator.generate_historical_incidents(datetime.now(timezone.utc)):
+            streamer.add(actions["incidents_history"], dumps_line(incident))
+
+    stop = False
+    def request_stop(*_):
+        nonlocal stop
+        stop = True
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    started = time.monotonic()
+    deadline = started + args.duration if args.duration else None
+    next_report = started + REPORT_EVERY
+    cycle = 0
+    minute_index = 0                            # scenario minutes started since launch; schedules slot starts
+    lag = 0.0
+    phase = None
+    try:
+        while not stop and (not args.cycles or cycle < args.cycles):
+            cycle += 1
+            for minutes_ago in range(args.cycle_minutes, 0, -1):
+                scheduled = started + minute_index * slot
+                now_mono = time.monotonic()
+                while now_mono < scheduled and not stop:
+                    streamer.tick()
+                    time.sleep(min(0.05, scheduled - now_mono))
+                    now_mono = time.monotonic()
+                if stop or (deadline and now_mono >= deadline):
+                    stop = True
+                    break
+                lag = now_mono - scheduled
+                minute_index += 1
+                if scenario_phase(minutes_ago) != phase:
+                    phase = scenario_phase(minutes_ago)
+                    print(f"  🎬 cycle {cycle}, T-{minutes_ago}min: {phase}")
+
+                # Anchor so this minute's timestamps land in the last minute of wall-clock time
+                anchor = datetime.now(timezone.utc) + timedelta(minutes=minutes_ago, seconds=-STAMP_LAG)
+                for data_type, doc in generator.iter_scale_minute(anchor, minutes_ago, services, placement,
+                                                                  events_per_minute):
+                    if bucket is not None:
+                        wait = bucket.wait_time()
+                        if wait > 0.005:
+                            streamer.tick()
+                            time.sleep(wait)
+                    action = actions[data_type]
+                    if data_type in partitioned:
+                        index = partitioned[data_type]
+                        name, expired = partitioner.route(index, doc.get("@timestamp"))
+                        if name is None or expired or not partitioner.ensure(index, name):
+                            streamer.stats.failed += 1
+                            continue
+                        action = action_line(name)
+                    streamer.add(action, dumps_line(doc))
+                    if stop or deadline and not streamer.stats.generated & 255 and time.monotonic() >= deadline:
+                        stop = True
+                        break
+                streamer.tick()
+
+                if time.monotonic() >= next_report:
+                    next_report += REPORT_EVERY
+                    st = streamer.stats
+                    print(f"    ⏱️  {st.ok:,} docs acked ({st.rate():,.0f}/s), {st.failed} dropped, "
+                          f"{st.retried} retried, lag {lag:.1f}s, {len(streamer.in_flight)} in flight, "
+                          f"{batcher.budget_bytes // 1024} KiB batches")
+    finally:
+        print("\n  ⏹️  Stopping — flushing buffered docs...")
+        streamer.close()
+        ingest.POOL.close()
+
+    st = streamer.stats
+    elapsed = time.monotonic() - started
+    print(f"\n{'='*50}")
+    print(f"📊 SUMMARY: {st.ok:,} docs acked, {st.failed} dropped, {st.retried} retries "
+          f"in {elapsed:.0f}s ({st.ok / max(elapsed, 1e-9):,.0f} docs/s)")
+    print(f"🎬 Scenario: {minute_index} minutes over {cycle} cycle(s), final lag {lag:.1f}s, "
+          f"{streamer.blocked:.1f}s blocked on backpressure")
+    print(f"📦 Batching: {batcher.summary()}")
+    if partitioner is not None:
+        print(f"🗂️  Partitions: {partitioner.summary()}")
+    print(f"🔌 Connections: {ingest.POOL.summary()}")
+    print(f"{'='*50}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Log Template Mining
+Collapses log messages into templates, so millions of lines read as a few
+dozen patterns with counts instead of raw text. correlate-logs.esql and
+detect-error-spikes.esql only group on structured fields; a novel error
+shows up here as a new template the minute it starts.
+
+Streaming Drain (He et al., ICWS 2017). Tokens containing a digit are
+masked as <*> up front (ids, ms values, pool counts, versions). A message
+then walks a fixed-depth prefix tree: token count, then its first
+`depth - 2` tokens, with at most `max_children` branches per node before
+new tokens share the <*> branch. The leaf holds candidate templates, and
+the most similar one (share of equal non-wildcard tokens, at least
+`sim_threshold`) absorbs the message; positions that differ become <*>.
+Otherwise the message starts a new template. The default depth of 3
+routes on the first token only: the second is often a variable without
+digits ("Service payment-service returned ..."), and routing on it would
+split one template per service. The tree and the number of
+templates (least recently seen are evicted) are bounded, and masked
+messages seen before skip the tree entirely, which is what keeps it at
+line rate.
+
+Each template has an integer id; parse() returns (id, parameters), where
+the parameters are the message tokens at the <*> positions. Per service
+and minute, template counts (and how many of them were ERROR/CRITICAL) are
+written as documents to opsguard-log-templates-1m. Like deploy_correlator.py,
+a service's minute closes once a log LATE_MINUTES newer arrives for it:
+its counts are handed out by docs()/bulk_lines() and dropped, so only the
+open minutes stay in memory. Logs for an already closed minute are dropped
+and counted as late; flush() closes everything at the end of the stream.
+
+Used inline by `ingest_to_elastic.py --templates`, or over generated files:
+  python3 scripts/log_templates.py --data-dir generated-data
+  python3 scripts/log_templates.py --benchmark      # accuracy vs the generator's LOG_MESSAGES, msgs/s
+  python3 scripts/log_templates.py --benchmark --synthetic 1000000
+  python3 scripts/esql_engine.py --query 'FROM opsguard-log-templates-1m | STATS n = SUM(doc_count) BY template.pattern | SORT n DESC'
+"""
+
+import os, re, json, time, argparse, collections
+from datetime import datetime
+
+from rollup import minute_bucket
+from anomaly_detector import iter_docs
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+LOG_INDEX = "opsguard-incidents"
+TEMPLATE_INDEX = "opsguard-log-templates-1m"
+ERROR_LEVELS = {"ERROR", "CRITICAL"}
+LATE_MINUTES = 2          # a minute closes once a log 2 minutes newer arrives for its service
+WILDCARD = "<*>"
+
+_VARIABLE = re.compile(r"\S*\d\S*")      # any token with a digit is a parameter
+
+class LogCluster:
+    """One template: its tokens (<*> for parameters), how many messages it absorbed, and where it lives."""
+    __slots__ = ("id", "tokens", "size", "last_seen", "leaf", "alive")
+
+    def __init__(self, cluster_id, tokens, leaf):
+        self.id = cluster_id
+        self.tokens = tokens
+        self.size = 0
+        self.last_seen = 0
+        self.leaf = leaf
+        self.alive = True
+
+    @property
+    def pattern(self):
+        return " ".join(self.tokens)
+
+class _Node:
+    __slots__ = ("children", "clusters")
+
+    def __init__(self):
+        self.children = {}
+        self.clusters = []
+
+class TemplateMiner:
+    """Streaming Drain over log messages; also an ingest observer via add(index, doc)."""
+
+    def __init__(self, depth=3, sim_threshold=0.4, max_children=100, max_clusters=1000, max_cache=65536):
+        if depth < 3:
+            raise ValueError("depth must be at least 3 (root, token count, leaf)")
+        self.prefix = depth - 2
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_cache = max_cache
+        self.root = _Node()
+        self.clusters = {}          # id → LogCluster
+        self.next_id = 1
+        self.evicted = 0
+        self.messages = 0
+        self._cache = {}            # masked message → LogCluster
+        self.open = {}              # service → {epoch minute: (minute, {LogCluster: [messages, errors]})}
+        self.newest = {}            # service → newest epoch minute seen
+        self.closed = []            # count documents of closed minutes, not yet handed out
+        self._minutes = {}          # minute → epoch minute
+        self.emitted = 0
+        self.late = 0
+        self.docs_seen = 0
+
+    def match(self, message):
+        """The template a message belongs to, learning (or widening) templates as needed."""
+        self.messages += 1
+        masked = _VARIABLE.sub(WILDCARD, message)
+        cluster = self._cache.get(masked)
+        if cluster is None or not cluster.alive:
+            cluster = self._learn(masked.split())
+            if len(self._cache) >= self.max_cache:
+                self._cache.clear()
+            self._cache[masked] = cluster
+        cluster.size += 1
+        cluster.last_seen = self.messages
+        return cluster
+
+    def parse(self, message):
+        """(template id, parameters): the message tokens at the template's <*> positions."""
+        cluster = self.match(message)
+        return cluster.id, [token for token, t in zip(message.split(), cluster.tokens) if t == WILDCARD]
+
+    def _learn(self, tokens):
+        leaf = self._leaf(tokens)
+        best = None
+        best_sim = best_params = -1
+        n = len(tokens) or 1
+        for cluster in leaf.clusters:
+            same = params = 0
+            for t, token in zip(cluster.tokens, tokens):
+                if t == WILDCARD:
+                    params += 1
+                elif t == token:
+                    same += 1
+            sim = same / n
+            if sim > best_sim or (sim == best_sim and params > best_params):
+                best, best_sim, best_params = cluster, sim, params
+        if best is not None and best_sim >= self.sim_threshold:
+            if any(t != token and t != WILDCARD for t, token in zip(best.tokens, tokens)):
+                # widening a template changes what it matches: cached routes to it stay valid
+                best.tokens = [t if t == token else WILDCARD for t, token in zip(best.tokens, tokens)]
+            return best
+        cluster = LogCluster(self.next_id, tokens, leaf)
+        self.next_id += 1
+        leaf.clusters.append(cluster)
+        self.clusters[cluster.id] = cluster
+        if len(self.clusters) > self.max_clusters:
+            self._evict()
+        return cluster
+
+    def _leaf(self, tokens):
+        """The leaf node for a token sequence, creating the path (with the <*> fallback) as needed."""
+        node = self.root.children.get(len(tokens))
+        if node is None:
+            node = self.root.children[len(tokens)] = _Node()
+        for token in tokens[:self.prefix]:
+            children = node.children
+            child = children.get(token)
+            if child is None:
+                if token != WILDCARD and len(children) < self.max_children - (WILDCARD not in children):
+                    child = children[token] = _Node()
+                else:
+                    child = children.get(WILDCARD)
+                    if child is None:
+                        child = children[WILDCARD] = _Node()
+            node = child
+        return node
+
+    def _evict(self):
+        """Drop the least recently seen tenth of the templates."""
+        by_age = sorted(self.clusters.values(), key=lambda c: c.last_seen)
+        for cluster in by_age[:max(1, len(by_age) // 10)]:
+            cluster.alive = False
+            cluster.leaf.clusters.remove(cluster)
+            del self.clusters[cluster.id]
+            self.evicted += 1
+
+    def add(self, index, doc):
+        if index != LOG_INDEX:
+            return
+        message = doc.get("message")
+        if not isinstance(message, str):
+            return
+        minute = minute_bucket(doc.get("@timestamp"))
+        if minute is None:
+            return
+        self.docs_seen += 1
+        service = doc.get("service.name")
+        epoch = self._minutes.get(minute)
+        if epoch is None:
+            if len(self._minutes) >= self.max_cache:
+                self._minutes.clear()
+            epoch = self._minutes[minute] = int(datetime.fromisoformat(minute).timestamp() // 60)
+        buckets = self.open.get(service)
+        if buckets is None:
+            buckets = self.open[service] = {}
+        newest = self.newest.get(service)
+        if newest is None or epoch > newest:
+            self.newest[service] = epoch
+            for open_minute in sorted(m for m in buckets if m < epoch - LATE_MINUTES):
+                self._close(service, buckets.pop(open_minute))
+        elif epoch < newest - LATE_MINUTES and epoch not in buckets:
+            self.late += 1                 # its minute was already written
+            return
+        bucket = buckets.get(epoch)
+        if bucket is None:
+            bucket = buckets[epoch] = (minute, {})
+        cluster = self.match(message)
+        counts = bucket[1].get(cluster)
+        if counts is None:
+            counts = bucket[1][cluster] = [0, 0]
+        counts[0] += 1
+        if doc.get("log.level") in ERROR_LEVELS:
+            counts[1] += 1
+
+    def _close(self, service, bucket):
+        minute, counts = bucket
+        for cluster in sorted(counts, key=lambda c: c.id):
+            messages, errors = counts[cluster]
+            self.closed.append({
+                "@timestamp": minute,
+                "service.name": service,
+                "template.id": cluster.id,
+                "template.pattern": cluster.pattern,
+                "doc_count": messages,
+                "logs.errors": errors,
+            })
+        self.emitted += len(counts)
+
+    def flush(self):
+        """Close every still-open minute (end of stream)."""
+        pending = sorted((epoch, service or "", service) for service, buckets in self.open.items() for epoch in buckets)
+        for epoch, _, service in pending:
+            self._close(service, self.open[service].pop(epoch))
+
+    def __len__(self):
+        return len(self.closed)
+
+    def docs(self):
+        """Template count documents of the minutes closed so far, each handed out once."""
+        closed, self.closed = self.closed, []
+        yield from closed
+
+    def bulk_lines(self, index=TEMPLATE_INDEX):
+        """(action, doc) byte lines with key-derived `_id`s."""
+        for doc in self.docs():
+            doc_id = f"{doc['@timestamp']}|{doc['service.name']}|{doc['template.id']}"
+            action = {"index": {"_index": index, "_id": doc_id}}
+            yield (json.dumps(action) + "\n").encode('utf-8'), (json.dumps(doc) + "\n").encode('utf-8')
+
+    def templates(self):
+        """Live templates, most frequent first."""
+        return sorted(self.clusters.values(), key=lambda c: -c.size)
+
+    def summary(self):
+        return (f"{self.messages:,} messages → {len(self.clusters)} templates"
+                + (f" ({self.evicted} evicted)" if self.evicted else "")
+                + f", {self.emitted:,} service/minute counts"
+                + (f", {self.late:,} late logs dropped" if self.late else ""))
+
+    def report(self, limit=15):
+        """The most frequent templates with their counts and share of messages."""
+        total = max(self.messages, 1)
+        lines = [f"{'id':>5} {'messages':>10} {'share':>6}  template"]
+        for cluster in self.templates()[:limit]:
+            lines.append(f"{cluster.id:>5} {cluster.size:>10,} {cluster.size * 100 / total:>5.1f}%  {cluster.pattern}")
+        return "\n".join(lines)
+
+def load_generator():
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(
+        "generator", os.path.join(BASE_DIR, "data", "sample-data-generator.py"))
+    generator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(generator)
+    return generator
+
+def known_templates(generator):
+    """Regexes for the generator's LOG_MESSAGES templates, as (name, compiled pattern)."""
+    patterns = []
+    for level, templates in generator.LOG_MESSAGES.items():
+        for template in templates:
+            parts = re.split(r"\{\w+\}", template)
+            regex = "(.+?)".join(re.escape(part) for part in parts)
+            patterns.append((f"{level}: {template}", re.compile(f"^{regex}$")))
+    return patterns
+
+def label_messages(messages, generator):
+    """Ground truth for generated messages: the LOG_MESSAGES template each one was formatted from."""
+    patterns = known_templates(generator)
+    # messages outside LOG_MESSAGES (the deployment line) are each their own group
+    return [next((name for name, regex in patterns if regex.match(message)), f"other: {message}")
+            for message in messages]
+
+def synthetic_messages(generator, count, services=40, hosts=30, seed=0):
+    """(messages, truth): every LOG_MESSAGES template formatted with random values over a synthetic fleet."""
+    rng = generator.random.Random(seed)
+    fleet, machines = generator.build_fleet(services, hosts)
+    templates = [(f"{level}: {t}", t) for level, ts in generator.LOG_MESSAGES.items() for t in ts]
+    messages, truth = [], []
+    for _ in range(count):
+        name, template = rng.choice(templates)
+        host = rng.choice(machines)["name"]
+        messages.append(template.format(
+            time=rng.randint(10, 30000), service=rng.choice(fleet)["name"], active=rng.randint(10, 100), max=100,
+            ratio=rng.randint(80, 99), user_id=f"usr-{rng.randint(1000, 9999)}",
+            order_id=f"ord-{rng.randint(100000, 999999)}", usage=round(rng.uniform(75, 99), 1),
+            attempt=rng.randint(1, 3), endpoint=rng.choice(generator.URL_PATHS),
+            error_code=rng.choice(generator.ERROR_CODES), status=rng.choice([500, 502, 503, 504]),
+            retries=rng.randint(1, 5), container=f"ctr-{host}", host=host))
+        truth.append(name)
+    return messages, truth
+
+def grouping_accuracy(truth, predicted):
+    """Share of messages whose mined template holds exactly the messages of their true template."""
+    members = collections.defaultdict(set)
+    owners = collections.defaultdict(set)
+    for t, p in zip(truth, predicted):
+        members[p].add(t)
+        owners[t].add(p)
+    correct = sum(1 for t, p in zip(truth, predicted) if len(members[p]) == 1 and len(owners[t]) == 1)
+    return correct / max(len(truth), 1)
+
+def benchmark(messages, truth, miner):
+    """Mine the messages and score the grouping against their true templates, plus messages/s."""
+    start = time.perf_counter()
+    predicted = [miner.match(message).id for message in messages]
+    elapsed = time.perf_counter() - start
+    return {
+        "messages": len(messages),
+        "true_templates": len(set(truth)),
+        "mined_templates": len(set(predicted)),
+        "grouping_accuracy": round(grouping_accuracy(truth, predicted), 4),
+        "messages_per_second": round(len(messages) / elapsed) if elapsed > 0 else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI log template mining")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="Generator output directory (default: generated-data)")
+    parser.add_argument("--output", default=None,
+                        help="Template count NDJSON to write (default: <data dir>/log_templates_1m.json)")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="Prefix tree depth; the first depth-2 tokens route a message (default: 3)")
+    parser.add_argument("--sim-threshold", type=float, default=0.4,
+                        help="Share of equal tokens needed to join a template (default: 0.4)")
+    parser.add_argument("--max-clusters", type=int, default=1000,
+                        help="Templates kept before the least recently seen are evicted (default: 1000)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Score grouping accuracy against the generator's LOG_MESSAGES and measure speed")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="With --benchmark, use N messages formatted from LOG_MESSAGES over a 40-service fleet "
+                             "instead of the generated logs")
+    parser.add_argument("--top", type=int, default=15, help="Templates to list (default: 15)")
+    args = parser.parse_args()
+
+    miner = TemplateMiner(depth=args.depth, sim_threshold=args.sim_threshold, max_clusters=args.max_clusters)
+    if args.benchmark:
+        generator = load_generator()
+        if args.synthetic:
+            messages, truth = synthetic_messages(generator, args.synthetic)
+        else:
+            messages = [doc["message"] for doc in iter_docs(args.data_dir, "logs")
+                        if isinstance(doc.get("message"), str)]
+            truth = label_messages(messages, generator)
+        print(json.dumps(benchmark(messages, truth, miner), indent=2))
+        print(miner.report(args.top))
+        return
+
+    start = time.time()
+    for doc in iter_docs(args.data_dir, "logs"):
+        miner.add(LOG_INDEX, doc)
+    miner.flush()
+    elapsed = time.time() - start
+    output = args.output or os.path.join(args.data_dir, "log_templates_1m.json")
+    with open(output, 'w') as f:
+        for doc in miner.docs():
+            f.write(json.dumps(doc) + "\n")
+    print(miner.report(args.top))
+    rate = miner.docs_seen / elapsed if elapsed > 0 else 0
+    print(f"🧩 {miner.summary()} → {output} — {rate:,.0f} docs/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Mock Elasticsearch
+A localhost stand-in for the Elasticsearch endpoints the ingester, the tools
+and the dashboard call, so ingestion can be load-tested and profiled without
+a cloud cluster:
+  PUT/DELETE /<index>           create (mapping and "aliases" kept) / drop an index
+  POST /_bulk, /<index>/_bulk   index/create/delete, optionally gzip-encoded
+  GET /<index>/_count, /_count  document counts (comma lists, * patterns and aliases)
+  GET /_cat/indices[/<index>]   text table, or JSON with ?format=json
+  POST /_query                  ES|QL via scripts/esql_engine.py over the stored docs
+
+`_bulk` can inject latency and per-item 429 rejections, answers 413 above
+--max-content-length (like http.max_content_length), and records request
+latencies, documents and bytes for the benchmark harness. Documents are kept
+as their raw JSON lines in zlib-compressed 1 MiB blocks, so millions of them
+fit in a few hundred MB; an `_id` map is only built for docs sent with one.
+CORS is allowed, so the dashboard can point at the mock too.
+
+Usage:
+  python3 scripts/mock_es.py --port 9200 --latency 0.02 --reject-rate 0.01
+  ES_URL=http://127.0.0.1:9200 ES_API_KEY=mock python3 scripts/ingest_to_elastic.py
+
+  with MockElasticsearch(latency=0.02, reject_rate=0.01) as es:   # in-process
+      os.environ["ES_URL"] = es.url
+"""
+
+import sys, json, gzip, time, zlib, random, signal, argparse, threading, urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK_BYTES = 1 << 20
+
+class MockStats:
+    """Thread-safe counters for what the server has received."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bulk_requests = 0
+        self.bytes_received = 0
+        self.docs_indexed = 0
+        self.items_rejected = 0
+        self.bulk_latencies = []
+
+    def record_bulk(self, wire_bytes, indexed, rejected, latency):
+        with self._lock:
+            self.bulk_requests += 1
+            self.bytes_received += wire_bytes
+            self.docs_indexed += indexed
+            self.items_rejected += rejected
+            self.bulk_latencies.append(latency)
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def summary(self):
+        return (f"{self.requests:,} requests, {self.bulk_requests:,} _bulk, {self.docs_indexed:,} docs indexed, "
+                f"{self.items_rejected:,} rejected, {self.bytes_received / 1e6:.1f} MB received")
+
+class DocStore:
+    """Append-only document log for one index.
+
+    Raw JSON lines fill a tail buffer that is zlib-compressed and sealed
+    every BLOCK_BYTES. Re-sending an `_id` appends the new version and marks
+    the old slot dead, and deletes only mark slots dead, so sealed blocks
+    never change.
+    """
+
+    def __init__(self, mapping=None, compress=True):
+        self.mapping = mapping or {}
+        self.compress = compress
+        self.blocks = []            # sealed blocks: (zlib bytes or raw bytes, slots in block)
+        self.tail = bytearray()
+        self.tail_slots = 0
+        self.live = bytearray()     # one byte per slot: 1 live, 0 overwritten/deleted
+        self.ids = {}               # _id → slot, for docs sent with an _id
+        self.count = 0
+        self.deleted = 0
+        self.raw_bytes = 0
+
+    def add(self, doc, doc_id=None):
+        """Store one doc line; returns "created" or "updated"."""
+        result = "created"
+        slot = len(self.live)
+        if doc_id is not None:
+            old = self.ids.get(doc_id)
+            if old is not None and self.live[old]:
+                self.live[old] = 0
+                self.count -= 1
+                result = "updated"
+            self.ids[doc_id] = slot
+        if not doc.endswith(b"\n"):
+            doc += b"\n"
+        self.live.append(1)
+        self.count += 1
+        self.raw_bytes += len(doc)
+        self.tail += doc
+        self.tail_slots += 1
+        if len(self.tail) >= BLOCK_BYTES:
+            data = zlib.compress(bytes(self.tail), 1) if self.compress else bytes(self.tail)
+            self.blocks.append((data, self.tail_slots))
+            self.tail = bytearray()
+            self.tail_slots = 0
+        return result
+
+    def delete(self, doc_id):
+        slot = self.ids.pop(doc_id, None)
+        if slot is None or not self.live[slot]:
+            return False
+        self.live[slot] = 0
+        self.count -= 1
+        self.deleted += 1
+        return True
+
+    def iter_lines(self):
+        """Yield the live doc lines in insertion order, decompressing one block at a time."""
+        slot = 0
+        live = self.live
+        for data, n in self.blocks + [(None, self.tail_slots)]:
+            data = bytes(self.tail) if data is None else zlib.decompress(data) if self.compress else data
+            for line in data.splitlines(keepends=True)[:n]:
+                if live[slot]:
+                    yield line
+                slot += 1
+
+    def memory_bytes(self):
+        return (sum(len(data) for data, _ in self.blocks) + len(self.tail) + len(self.live)
+                + len(self.ids) * 100)
+
+class MockElasticsearch:
+    """Threaded HTTP/1.1 server on 127.0.0.1 with keep-alive, started and stopped explicitly or as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, latency_jitter=0.0, reject_rate=0.0, seed=0,
+                 store=True, max_content_length=0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.reject_rate = reject_rate
+        self.max_content_length = max_content_length
+        self.store = store
+        self.stats = MockStats()
+        self.indices = {}            # index name → DocStore
+        self.aliases = {}            # alias → set of index names
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def resolve(self, expression, aliases=True):
+        """Index names matching a comma list of names, * patterns and (for reads) aliases; all for _all / empty."""
+        with self._lock:
+            names = list(self.indices)
+            members = {alias: sorted(m) for alias, m in self.aliases.items()} if aliases else {}
+        if expression in ("", "_all", "*"):
+            return names
+        out = []
+        for part in expression.split(","):
+            if part.endswith("*"):
+                out += [n for n in names if n.startswith(part[:-1]) and n not in out]
+            elif part in names and part not in out:
+                out.append(part)
+            elif part in members:
+                out += [n for n in members[part] if n not in out]
+        return out
+
+    def drop(self, name):
+        """Remove an index and its alias memberships (caller holds the lock)."""
+        self.indices.pop(name, None)
+        for alias in [a for a, m in self.aliases.items() if name in m]:
+            self.aliases[alias].discard(name)
+            if not self.aliases[alias]:
+                del self.aliases[alias]
+
+    def _reject(self):
+        if not self.reject_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.reject_rate
+
+    def bulk(self, body, default_index=None):
+        """Process an NDJSON `_bulk` body; returns the response dict and (indexed, rejected) counts."""
+        items = []
+        indexed = rejected = 0
+        lines = iter(body.splitlines())
+        for line in lines:
+            if not line.strip():
+                continue
+            op, meta = next(iter(json.loads(line).items()))
+            doc = None if op == "delete" else next(lines, b"")
+            index = meta.get("_index", default_index) or ""
+            doc_id = meta.get("_id")
+            with self._lock:
+                members = self.aliases.get(index)
+            if members:
+                if len(members) > 1:
+                    items.append({op: {"_index": index, "_id": doc_id, "status": 400, "error": {
+                        "type": "illegal_argument_exception",
+                        "reason": f"no write index is defined for alias [{index}]. The write index may be "
+                                  "explicitly disabled using is_write_index=false or the alias points to "
+                                  "multiple indices without one being designated as a write index"}}})
+                    continue
+                index = next(iter(members))
+            if self._reject():
+                rejected += 1
+                items.append({op: {"_index": index, "_id": doc_id, "status": 429, "error": {
+                    "type": "es_rejected_execution_exception",
+                    "reason": "rejected execution of coordinating operation (injected by mock)"}}})
+                continue
+            with self._lock:
+                store = self.indices.get(index)
+                if store is None:
+                    store = self.indices[index] = DocStore()
+                if op == "delete":
+                    found = store.delete(doc_id)
+                    items.append({op: {"_index": index, "_id": doc_id, "status": 200 if found else 404,
+                                       "result": "deleted" if found else "not_found"}})
+                    continue
+                if op == "create" and doc_id is not None and doc_id in store.ids and store.live[store.ids[doc_id]]:
+                    items.append({op: {"_index": index, "_id": doc_id, "status": 409, "error": {
+                        "type": "version_conflict_engine_exception",
+                        "reason": f"[{doc_id}]: version conflict, document already exists"}}})
+                    continue
+                if self.store:
+                    result = store.add(doc, doc_id)
+                else:
+                    store.count += 1
+                    result = "created"
+            indexed += 1
+            status = 201 if result == "created" else 200
+            items.append({op: {"_index": index, "_id": doc_id, "status": status, "result": result}})
+        return {"took": 1, "errors": any("error" in next(iter(i.values())) for i in items), "items": items}, \
+            indexed, rejected
+
+    def query(self, body):
+        """Run an ES|QL `_query` request body over the stored documents."""
+        import esql_engine
+        params = body.get("params") or {}
+        if isinstance(params, list):
+            merged = {}
+            for p in params:
+                if isinstance(p, dict):
+                    merged.update(p)
+            params = merged
+        query = esql_engine.Query(body.get("query", ""), params)
+        names = []
+        for expression in query.indices:
+            names += [n for n in self.resolve(expression) if n not in names]
+        if not names:
+            raise esql_engine.ESQLError(f"Unknown index [{','.join(query.indices)}]")
+        with self._lock:
+            stores = [self.indices[n] for n in names if n in self.indices]
+        lines = (line for store in stores for line in store.iter_lines())
+        return esql_engine.execute_lines(query, lines)
+
+    def cat_indices(self, names=None):
+        with self._lock:
+            return [{"health": "green", "status": "open", "index": name,
+                     "docs.count": str(store.count), "docs.deleted": str(store.deleted),
+                     "store.size": f"{store.memory_bytes() / 1024:.1f}kb"}
+                    for name, store in sorted(self.indices.items()) if names is None or name in names]
+
+def _error(kind, reason, status):
+    return {"error": {"type": kind, "reason": reason}, "status": status}
+
+def _make_handler(es):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True   # headers and body go out in separate writes; avoid the delayed-ACK stall
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, content_type="application/json"):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            data = gzip.decompress(raw) if self.headers.get("Content-Encoding") == "gzip" else raw
+            return raw, data
+
+        def _route(self):
+            url = urllib.parse.urlsplit(self.path)
+            parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/") if p]
+            return parts, dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Authorization, Content-Type, Content-Encoding")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_PUT(self):
+            es.stats.count_request()
+            _, data = self._body()
+            parts, _ = self._route()
+            if len(parts) != 1:
+                self._send(404, _error("unsupported_endpoint", self.path, 404))
+                return
+            index = parts[0]
+            body = json.loads(data) if data.strip() else {}
+            with es._lock:
+                if index in es.indices:
+                    self._send(400, _error("resource_already_exists_exception", f"index [{index}] already exists", 400))
+                    return
+                if index in es.aliases:
+                    self._send(400, _error("invalid_index_name_exception",
+                                           f"Invalid index name [{index}], an alias with the same name already exists", 400))
+                    return
+                taken = [alias for alias in body.get("aliases") or {} if alias in es.indices]
+                if taken:
+                    self._send(400, _error("invalid_alias_name_exception",
+                                           f"Invalid alias name [{taken[0]}]: an index or data stream exists with the same name as the alias", 400))
+                    return
+                es.indices[index] = DocStore(body)
+                for alias in body.get("aliases") or {}:
+                    es.aliases.setdefault(alias, set()).add(index)
+            self._send(200, {"acknowledged": True, "shards_acknowledged": True, "index": index})
+
+        def do_DELETE(self):
+            es.stats.count_request()
+            parts, _ = self._route()
+            names = es.resolve(parts[0], aliases=False) if len(parts) == 1 else []
+            if not names:
+                self._send(404, _error("index_not_found_exception", f"no such index [{self.path}]", 404))
+                return
+            with es._lock:
+                for name in names:
+                    es.drop(name)
+            self._send(200, {"acknowledged": True})
+
+        def do_GET(self):
+            es.stats.count_request()
+            parts, params = self._route()
+            if parts[:2] == ["_cat", "indices"] and len(parts) <= 3:
+                names = es.resolve(parts[2]) if len(parts) == 3 else None
+                if names == [] and "*" not in parts[2]:
+                    self._send(404, _error("index_not_found_exception", f"no such index [{parts[2]}]", 404))
+                    return
+                rows = es.cat_indices(names)
+                if params.get("format") == "json":
+                    self._send(200, rows)
+                else:
+                    lines = [" ".join(r.values()) for r in rows]
+                    if "v" in params:
+                        lines.insert(0, " ".join(rows[0].keys()) if rows else "")
+                    self._send(200, ("\n".join(lines) + "\n").encode(), "text/plain")
+                return
+            if parts and parts[-1] == "_count" and len(parts) <= 2:
+                expression = parts[0] if len(parts) == 2 else ""
+                names = es.resolve(expression)
+                if expression and not names:
+                    self._send(404, _error("index_not_found_exception", f"no such index [{expression}]", 404))
+                    return
+                with es._lock:
+                    count = sum(es.indices[n].count for n in names if n in es.indices)
+                self._send(200, {"count": count, "_shards": {"total": len(names), "successful": len(names)}})
+                return
+            if not parts:
+                self._send(200, {"name": "opsguard-mock", "version": {"number": "8.x-mock"},
+                                 "tagline": "You Know, for Search"})
+                return
+            self._send(404, _error("unsupported_endpoint", self.path, 404))
+
+        def do_POST(self):
+            es.stats.count_request()
+            start = time.monotonic()
+            raw, data = self._body()
+            parts, _ = self._route()
+            if parts and parts[-1] == "_bulk" and len(parts) <= 2:
+                if es.max_content_length and len(data) > es.max_content_length:
+                    self._send(413, b"", content_type="text/plain")
+                    return
+                response, indexed, rejected = es.bulk(data, parts[0] if len(parts) == 2 else None)
+                delay = es.latency + (random.uniform(0, es.latency_jitter) if es.latency_jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+                self._send(200, response)
+                es.stats.record_bulk(len(raw), indexed, rejected, time.monotonic() - start)
+                return
+            if parts == ["_query"]:
+                import esql_engine
+                try:
+                    self._send(200, es.query(json.loads(data or b"{}")))
+                except (esql_engine.ESQLError, ValueError) as e:
+                    self._send(400, _error("verification_exception", str(e), 400))
+                return
+            if parts and parts[-1] == "_count":
+                self.do_GET()
+                return
+            self._send(404, _error("unsupported_endpoint", self.path, 404))
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI mock Elasticsearch server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds to wait before answering each _bulk (default: 0)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="Extra random wait of up to this many seconds per _bulk (default: 0)")
+    parser.add_argument("--reject-rate", type=float, default=0.0,
+                        help="Fraction of _bulk items rejected with 429 (default: 0)")
+    parser.add_argument("--max-content-length", type=int, default=0,
+                        help="Answer 413 to _bulk bodies larger than this many bytes (default: 0 = no limit)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="Count documents without keeping them (_query then sees nothing)")
+    args = parser.parse_args()
+
+    es = MockElasticsearch(args.host, args.port, latency=args.latency, latency_jitter=args.latency_jitter,
+                           reject_rate=args.reject_rate, store=not args.no_store,
+                           max_content_length=args.max_content_length)
+    print(f"🧪 OpsGuard AI — Mock Elasticsearch listening on {es.url}")
+    print(f"   export ES_URL={es.url} ES_API_KEY=mock")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        es.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        es._server.server_close()
+        print(f"\n📊 {es.stats.summary()}")
+        for row in es.cat_indices():
+            print(f"   {row['index']:<28} {int(row['docs.count']):>10,} docs  {row['store.size']:>12}")
+
+if __name__ == "__main__":
+    main()
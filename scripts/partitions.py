@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Time-Partitioned Indices
+Routes the time-series indices (opsguard-incidents, -metrics, -business) by
+@timestamp into hourly or daily backing indices behind an alias of the
+original name, instead of one index that is dropped and recreated per run:
+  opsguard-incidents-2026.10.16-20   hourly partition (UTC hour)
+  opsguard-incidents-2026.10.16      daily partition (UTC day)
+Tools, the dashboard and `_count` keep using `opsguard-incidents` — the
+alias spans every partition — while `NOW() - 1 hour` queries only have to
+touch the newest ones (Elasticsearch skips shards whose @timestamp range
+cannot match). Partitions can also be targeted directly with a pattern
+such as `opsguard-incidents-2026.10.16*`.
+
+A partition is created on first use with the index's mapping file and the
+alias in the same PUT. Retention drops whole partitions once their period
+ends before now − retention, so expiry never deletes documents one by one;
+docs that already fall outside retention are not sent at all. Serverless
+has no ILM rollover for plain indices, so rollover is done client-side:
+a new period simply routes to a new partition.
+
+Used inline by `ingest_to_elastic.py --partition hourly|daily [--retention 7d]`
+and `live_replay.py --partition ...`, or on its own:
+  python3 scripts/partitions.py --data-dir generated-data --partition hourly   # docs per partition, offline
+  python3 scripts/partitions.py --list                                         # partitions on the cluster
+  python3 scripts/partitions.py --retention 7d                                 # drop expired partitions
+"""
+
+import os, re, json, time, argparse, collections
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+# Indices whose documents carry @timestamp and are partitioned; history and workflow indices stay single
+PARTITIONED_INDICES = ("opsguard-incidents", "opsguard-metrics", "opsguard-business")
+
+# granularity → (partition name suffix format, period in seconds, length of the ISO prefix that fixes the partition)
+GRANULARITIES = {
+    "hourly": ("%Y.%m.%d-%H", 3600, 13),     # 2026-10-16T20
+    "daily": ("%Y.%m.%d", 86400, 10),        # 2026-10-16
+}
+
+# Generator output file stem per partitioned index (offline mode)
+PARTITION_INPUTS = {"opsguard-incidents": "logs", "opsguard-metrics": "metrics", "opsguard-business": "business_metrics"}
+
+_TIMESTAMP_KEY = b'"@timestamp":'
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([mhdw])\s*$")
+_DURATION_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_retention(text):
+    """Seconds in a retention like "48h", "7d" or "2w" (argparse type)."""
+    match = _DURATION.match(str(text).lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid retention {text!r} (expected e.g. 90m, 48h, 7d, 2w)")
+    return float(match.group(1)) * _DURATION_SECONDS[match.group(2)]
+
+def raw_timestamp(doc_line):
+    """The @timestamp of an encoded doc, read without parsing the rest of it (full parse as a fallback)."""
+    i = doc_line.find(_TIMESTAMP_KEY)
+    if i >= 0:
+        start = i + len(_TIMESTAMP_KEY)
+        while doc_line[start:start + 1] == b" ":
+            start += 1
+        if doc_line[start:start + 1] == b'"':
+            end = doc_line.find(b'"', start + 1)
+            if end > 0 and b"\\" not in doc_line[start + 1:end]:
+                return doc_line[start + 1:end].decode()
+    try:
+        doc = json.loads(doc_line)
+    except ValueError:
+        return None
+    return doc.get("@timestamp") if isinstance(doc, dict) else None
+
+def partition_start(timestamp, granularity):
+    """UTC start of the partition period holding an ISO timestamp or epoch millis (None if unparseable)."""
+    period = GRANULARITIES[granularity][1]
+    if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        epoch = timestamp / 1000
+    elif isinstance(timestamp, str):
+        try:
+            dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        epoch = dt.timestamp()
+    else:
+        return None
+    return datetime.fromtimestamp(epoch - epoch % period, timezone.utc)
+
+def partition_name(index, start, granularity):
+    return f"{index}-{start.strftime(GRANULARITIES[granularity][0])}"
+
+def parse_partition(index, name):
+    """(start, granularity) of a partition name of `index`, or None if it is not one."""
+    prefix = index + "-"
+    if not name.startswith(prefix):
+        return None
+    suffix = name[len(prefix):]
+    for granularity, (fmt, _, _) in GRANULARITIES.items():
+        try:
+            start = datetime.strptime(suffix, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if start.strftime(fmt) == suffix:
+            return start, granularity
+    return None
+
+def list_partitions(request, index):
+    """Names of the existing partitions of `index`, oldest first (explicit names; wildcard DELETE is off in 8.x)."""
+    status, res = request("GET", f"_cat/indices/{index}-*?format=json&h=index")
+    if status != 200 or not isinstance(res, list):
+        return []
+    found = [(parse_partition(index, row.get("index", "")), row.get("index")) for row in res]
+    return [name for parsed, name in sorted((p, n) for p, n in found if p is not None)]
+
+def drop_partitions(request, index):
+    """Delete every partition of `index` (before it is recreated as a single index); returns how many."""
+    names = list_partitions(request, index)
+    for name in names:
+        request("DELETE", name)
+    return len(names)
+
+class Partitioner:
+    """Maps (index, @timestamp) to a partition, creating partitions lazily and expiring old ones.
+
+    `request` is es_request and `load_mapping` the ingester's mapping loader
+    (passed in so this module does not import the ingester). Routing is
+    cached per index and ISO prefix (hour or day) for UTC timestamps, so
+    the common case is one slice and one dict lookup per document.
+    """
+
+    def __init__(self, request, load_mapping, granularity="daily", retention=None, indices=PARTITIONED_INDICES,
+                 clock=time.time):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"unknown granularity {granularity!r} (expected one of {', '.join(GRANULARITIES)})")
+        self.request = request
+        self.load_mapping = load_mapping
+        self.granularity = granularity
+        self.retention = retention
+        self.indices = tuple(indices)
+        self.clock = clock
+        self.period = GRANULARITIES[granularity][1]
+        self.key_length = GRANULARITIES[granularity][2]
+        self.known = {index: set() for index in self.indices}   # partitions that exist on the cluster
+        self.routed = collections.Counter()                      # partition → docs routed this run
+        self.created = []
+        self.failed = set()
+        self.expired = []
+        self.docs_expired = 0
+        self._routes = {}
+
+    def prepare(self, replace_single=False):
+        """Find existing partitions and expire old ones; returns the single indices in the way (empty if none).
+
+        An alias cannot share its name with an index, so a single-index run's
+        index blocks partitioning. It is only dropped with `replace_single`;
+        otherwise nothing is changed and the caller decides what to do.
+        """
+        single = []
+        for index in self.indices:
+            status, res = self.request("GET", f"_cat/indices/{index}?format=json&h=index")
+            if status == 200 and isinstance(res, list) and any(row.get("index") == index for row in res):
+                single.append(index)
+        if single and not replace_single:
+            return single
+        for index in single:
+            print(f"  ⚠️  {index} is a single index; dropping it for the partition alias")
+            self.request("DELETE", index)
+        for index in self.indices:
+            self.known[index].update(list_partitions(self.request, index))
+        self.expire()
+        return []
+
+    def cutoff(self):
+        """Epoch seconds before which a partition's whole period is past retention (None: keep everything)."""
+        return None if self.retention is None else self.clock() - self.retention
+
+    def route(self, index, timestamp):
+        """(partition name, expired) for a doc's @timestamp; (None, False) if it cannot be routed."""
+        utc = isinstance(timestamp, str) and (timestamp.endswith("+00:00") or timestamp.endswith("Z"))
+        key = (index, timestamp[:self.key_length]) if utc else None
+        route = self._routes.get(key) if utc else None
+        if route is None:
+            start = partition_start(timestamp, self.granularity)
+            if start is None:
+                return None, False
+            cutoff = self.cutoff()
+            name = partition_name(index, start, self.granularity)
+            route = (name, cutoff is not None and start.timestamp() + self.period <= cutoff)
+            if utc:
+                if len(self._routes) >= 4096:
+                    self._routes.clear()
+                self._routes[key] = route
+        if route[1]:
+            self.docs_expired += 1
+            return route
+        self.routed[route[0]] += 1
+        return route
+
+    def ensure(self, index, name):
+        """Create partition `name` of `index` with its mapping and the alias unless it exists; False if it cannot be.
+
+        A partition whose PUT failed is not retried for every doc: its docs
+        should be dead-lettered instead of auto-creating an unmapped index
+        outside the alias.
+        """
+        known = self.known.setdefault(index, set())
+        if name in known:
+            return True
+        if name in self.failed:
+            return False
+        body = dict(self.load_mapping(index) or {})
+        body["aliases"] = {index: {}}
+        status, res = self.request("PUT", name, data=body)
+        if status not in (200, 201):
+            print(f"    ❌ Could not create partition {name} (status {status})")
+            self.failed.add(name)
+            return False
+        known.add(name)
+        if (res or {}).get("status") != "already_exists":    # else created meanwhile by another writer
+            self.created.append(name)
+            print(f"    🗂️  Created partition {name}")
+            self.expire()                    # a new period began: roll the oldest ones off
+        return True
+
+    def expire(self):
+        """Drop every partition whose period ended before the retention cutoff; returns the dropped names."""
+        cutoff = self.cutoff()
+        if cutoff is None:
+            return []
+        dropped = []
+        for index, names in self.known.items():
+            for name in sorted(names):
+                parsed = parse_partition(index, name)
+                if parsed is None:
+                    continue
+                start, granularity = parsed
+                if start.timestamp() + GRANULARITIES[granularity][1] > cutoff:
+                    continue
+                status, _ = self.request("DELETE", name)
+                if status in (200, 404):
+                    names.discard(name)
+                    dropped.append(name)
+                    print(f"    🗑️  Dropped expired partition {name}")
+        self.expired += dropped
+        # routes cached before the cutoff moved may now be past retention
+        self._routes.clear()
+        return dropped
+
+    def summary(self):
+        live = sum(len(names) for names in self.known.values())
+        text = (f"{self.granularity} — {len(self.routed)} partitions written, {len(self.created)} created, "
+                f"{live} live")
+        if self.retention is not None:
+            text += (f", {len(self.expired)} dropped past {_format_duration(self.retention)} retention, "
+                     f"{self.docs_expired:,} expired docs not sent")
+        return text
+
+def _format_duration(seconds):
+    for unit in ("w", "d", "h", "m"):
+        if seconds >= _DURATION_SECONDS[unit] and seconds % _DURATION_SECONDS[unit] == 0:
+            return f"{seconds / _DURATION_SECONDS[unit]:g}{unit}"
+    return f"{seconds:g}s"
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI time-partitioned indices")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="Generator output directory to plan partitions for (default: generated-data)")
+    parser.add_argument("--partition", choices=list(GRANULARITIES), default="daily",
+                        help="Partition period (default: daily)")
+    parser.add_argument("--retention", type=parse_retention, default=None,
+                        help="With ES_URL set, drop partitions older than this (e.g. 48h, 7d)")
+    parser.add_argument("--list", action="store_true",
+                        help="List the partitions of each index on the cluster at ES_URL")
+    args = parser.parse_args()
+
+    if args.list or args.retention is not None:
+        import ingest_to_elastic as ingest
+        if not ingest.ES_URL or not ingest.API_KEY:
+            parser.error("--list and --retention need ES_URL and ES_API_KEY")
+        partitioner = Partitioner(ingest.es_request, ingest.load_mapping, args.partition, args.retention)
+        for index in PARTITIONED_INDICES:
+            partitioner.known[index].update(list_partitions(ingest.es_request, index))
+        dropped = partitioner.expire()
+        for index, names in partitioner.known.items():
+            print(f"{index}: {len(names)} partitions" + (f" ({min(names)} … {max(names)})" if names else ""))
+        if args.retention is not None:
+            print(f"🗑️  {len(dropped)} expired partitions dropped")
+        ingest.POOL.close()
+        return
+
+    from anomaly_detector import iter_docs
+    partitioner = Partitioner(None, None, args.partition)
+    start = time.time()
+    docs = 0
+    for index, stem in PARTITION_INPUTS.items():
+        for doc in iter_docs(args.data_dir, stem):
+            docs += 1
+            if partitioner.route(index, doc.get("@timestamp"))[0] is None:
+                partitioner.routed["(unroutable)"] += 1
+    elapsed = time.time() - start
+    for name, count in sorted(partitioner.routed.items()):
+        print(f"  {name:<40} {count:>10,} docs")
+    rate = docs / elapsed if elapsed > 0 else 0
+    print(f"🗂️  {docs:,} docs → {len(partitioner.routed)} {args.partition} partitions — {rate:,.0f} docs/s")
+
+if __name__ == "__main__":
+    main()
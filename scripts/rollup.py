@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+OpsGuard AI — Per-Minute Rollups
+Pre-aggregates raw telemetry into one document per minute × source × service
+(× host), so dashboards and tools read O(minutes × services) rows instead of
+every raw document.
+
+Each numeric field becomes `<name>.sum/.count/.min/.max`, which can be
+re-aggregated over any window (AVG = SUM(x.sum) / SUM(x.count)). Log levels
+become counters. Rollup `_id`s are derived from the bucket key, so
+re-ingesting overwrites instead of duplicating.
+
+Used inline by `ingest_to_elastic.py --rollup` (→ opsguard-rollup-1m), or
+offline to write a local store the ES|QL engine can query:
+  python3 scripts/rollup.py --data-dir generated-data
+  python3 scripts/esql_engine.py --query 'FROM opsguard-rollup-1m | STATS cpu = SUM(cpu.sum) / SUM(cpu.count) BY service.name'
+"""
+
+import os, json, gzip, argparse
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "generated-data")
+
+ROLLUP_INDEX = "opsguard-rollup-1m"
+
+# Raw index → how its documents are rolled up
+ROLLUP_SPECS = {
+    "opsguard-metrics": {
+        "source": "metrics",
+        "by_host": True,
+        "fields": {
+            "system.cpu.usage_percent": "cpu",
+            "system.memory.usage_percent": "memory",
+            "system.load.1m": "load_1m",
+        },
+    },
+    "opsguard-incidents": {
+        "source": "logs",
+        "by_host": True,
+        "fields": {"response_time_ms": "response_time_ms"},
+        "levels": {"ERROR": ("logs.errors",), "CRITICAL": ("logs.errors", "logs.critical"), "WARNING": ("logs.warnings",)},
+    },
+    "opsguard-business": {
+        "source": "business",
+        "by_host": False,
+        "fields": {
+            "transactions.count": "transactions",
+            "transactions.success_count": "successes",
+            "transactions.failure_count": "failures",
+            "revenue.amount_usd": "revenue",
+            "revenue.baseline_hourly_usd": "baseline_hourly",
+            "active_users": "active_users",
+        },
+    },
+}
+
+# Generator output file stem per raw index (offline mode)
+ROLLUP_INPUTS = {
+    "opsguard-incidents": "logs",
+    "opsguard-metrics": "metrics",
+    "opsguard-business": "business_metrics",
+}
+
+def minute_bucket(timestamp):
+    """Floor an ISO timestamp to its UTC minute, as an ISO string (None if unparseable)."""
+    if not isinstance(timestamp, str):
+        return None
+    if len(timestamp) >= 16 and (timestamp.endswith("+00:00") or timestamp.endswith("Z")):
+        return timestamp[:16] + ":00+00:00"
+    try:
+        dt = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).replace(second=0, microsecond=0).isoformat()
+
+class MinuteRollup:
+    """Incremental per-minute aggregates; feed docs with add(), read them back with docs()."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.docs_seen = 0
+
+    def add(self, index, doc):
+        spec = ROLLUP_SPECS.get(index)
+        if spec is None:
+            return
+        minute = minute_bucket(doc.get("@timestamp"))
+        if minute is None:
+            return
+        key = (minute, spec["source"], doc.get("service.name"), doc.get("host.name") if spec["by_host"] else None)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {"doc_count": 0, "stats": {}, "counters": {}}
+        bucket["doc_count"] += 1
+        stats = bucket["stats"]
+        for field, name in spec["fields"].items():
+            value = doc.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            s = stats.get(name)
+            if s is None:
+                stats[name] = [value, 1, value, value]
+            else:
+                s[0] += value
+                s[1] += 1
+                if value < s[2]:
+                    s[2] = value
+                if value > s[3]:
+                    s[3] = value
+        levels = spec.get("levels")
+        if levels:
+            counters = bucket["counters"]
+            for counter in levels.get(doc.get("log.level"), ()):
+                counters[counter] = counters.get(counter, 0) + 1
+        self.docs_seen += 1
+
+    def add_line(self, index, line):
+        """Add one raw NDJSON document line (bytes or str)."""
+        if index in ROLLUP_SPECS:
+            self.add(index, json.loads(line))
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def docs(self):
+        """Rollup documents in (minute, source, service, host) order."""
+        for key in sorted(self.buckets, key=lambda k: tuple("" if v is None else v for v in k)):
+            minute, source, service, host = key
+            bucket = self.buckets[key]
+            doc = {"@timestamp": minute, "rollup.source": source, "service.name": service}
+            if host is not None:
+                doc["host.name"] = host
+            doc["doc_count"] = bucket["doc_count"]
+            for name, (total, count, low, high) in bucket["stats"].items():
+                doc[f"{name}.sum"] = round(total, 4)
+                doc[f"{name}.count"] = count
+                doc[f"{name}.min"] = low
+                doc[f"{name}.max"] = high
+            for counter, n in bucket["counters"].items():
+                doc[counter] = n
+            yield doc
+
+    def bulk_lines(self, index=ROLLUP_INDEX):
+        """(action, doc) byte lines with key-derived `_id`s."""
+        for doc in self.docs():
+            doc_id = "|".join(str(doc.get(k, "")) for k in ("@timestamp", "rollup.source", "service.name", "host.name"))
+            action = {"index": {"_index": index, "_id": doc_id}}
+            yield (json.dumps(action) + "\n").encode('utf-8'), (json.dumps(doc) + "\n").encode('utf-8')
+
+def rollup_files(data_dir):
+    """Roll up the generator's plain NDJSON output (`<type>.json` or `.json.gz`)."""
+    rollup = MinuteRollup()
+    for index, stem in ROLLUP_INPUTS.items():
+        path = os.path.join(data_dir, f"{stem}.json")
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            path += ".gz"
+        if not os.path.exists(path):
+            print(f"  ⚠️  {os.path.basename(path)} not found, skipping")
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    rollup.add_line(index, line)
+    return rollup
+
+def main():
+    parser = argparse.ArgumentParser(description="OpsGuard AI per-minute rollups")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="Generator output directory (default: generated-data)")
+    parser.add_argument("--output", default=None,
+                        help="Rollup NDJSON to write (default: <data dir>/rollup_1m.json)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.data_dir, "rollup_1m.json")
+    rollup = rollup_files(args.data_dir)
+    with open(output, 'w') as f:
+        for doc in rollup.docs():
+            f.write(json.dumps(doc) + "\n")
+    ratio = rollup.docs_seen / max(len(rollup), 1)
+    print(f"✅ Rolled up {rollup.docs_seen:,} docs into {len(rollup):,} minute buckets ({ratio:.1f}x) → {output}")
+
+if __name__ == "__main__":
+    main()